@@ -1,8 +1,11 @@
 from autogen_core.base import MessageContext
 from autogen_core.components import RoutedAgent
 from security.log_chain import log_action
+from utils.log import get_logger
 from py_models.messages import DataMessage
 
+logger = get_logger(__name__)
+
 
 class AgentSecBaseAgent(RoutedAgent):
     """Base class for agents with routing and security features."""
@@ -24,5 +27,5 @@ class AgentSecBaseAgent(RoutedAgent):
             message: The message received by the agent.
             ctx (MessageContext): The context of the message.
         """
-        log_action(self.agent_id, f"Unhandled message: {message}")
-        print(f"Unhandled message received by {self.agent_id}: {message}")
\ No newline at end of file
+        log_action(self.agent_id, "Unhandled message: %s", message)
+        logger.warning("Unhandled message received by %s: %s", self.agent_id, message)
\ No newline at end of file
@@ -1,20 +1,23 @@
-import logging
 from typing import Optional
 from agents.agent_base import AgentSecBaseAgent
 from autogen_core.components import rpc, event
 from autogen_core.base import MessageContext, AgentId
-from security.signature_tools import verify_signature
+from security.signature_tools import verify_signature_async
 from security.log_chain import log_action
 from security.policies import security_policy
+from security.policies.policy_rules import PolicyRuleEngine
+from security.policies.verdict_cache import VerdictCache
+from security.content_scanner import ContentScanner, get_content_scanner
+from agents.edge_agents.edge_pool import EdgeAgentPool
 from py_models.messages import InstructionMessage, DataMessage, VerificationResponse, ExternalMessage
 from autogen_core.components import message_handler
 from autogen_core.components.models import ChatCompletionClient, SystemMessage
 
 # Import the DataManager from utils.fetch
 from utils.fetch import DataManager
+from utils.log import get_logger
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class AuditorAgent(AgentSecBaseAgent):
     """
@@ -27,17 +30,29 @@ class AuditorAgent(AgentSecBaseAgent):
         self, 
         agent_id: str, 
         model_client: ChatCompletionClient, 
-        edge_agent_id: str, 
+        edge_agent_id: Optional[AgentId],
         core_agent_id: str, 
         description: str = "Auditor agent for verifying instructions and inspecting data.",
-        agent_name: str = "auditor_agent"
+        agent_name: str = "auditor_agent",
+        policy_rules: Optional[PolicyRuleEngine] = None,
+        content_scanner: Optional[ContentScanner] = None,
+        edge_pool: Optional[EdgeAgentPool] = None,
+        verdict_cache: Optional[VerdictCache] = None
     ):
         super().__init__(description=description)
         self.agent_id = agent_id
         self.agent_name = agent_name
         self.model_client = model_client
         self.edge_agent_id = edge_agent_id  # Link to EdgeAgent
+        # Instructions are load-balanced across the edge pool; a single edge agent is a pool of one
+        self.edge_pool = edge_pool or EdgeAgentPool([edge_agent_id])
         self.core_agent_id = core_agent_id  # Link to CoreAgent
+        # Deterministic pre-filter with the patient names in the data store; only ambiguous instructions reach the model
+        self.policy_rules = policy_rules or PolicyRuleEngine.from_data_store()
+        # Model verdicts keyed by the exact instruction and the policy hash
+        self.verdict_cache = verdict_cache or VerdictCache()
+        # Multi-pattern scanner for inbound data and external messages (configs/content_rules.json)
+        self.content_scanner = content_scanner or get_content_scanner()
 
         # Initialize the DataManager
         self.data_manager = DataManager(agent_id=self.agent_id, agent_name=self.agent_name)
@@ -50,7 +65,7 @@ class AuditorAgent(AgentSecBaseAgent):
             )
         ]
 
-        logger.info(f"AuditorAgent initialized with ID: {self.agent_id}")
+        logger.info("AuditorAgent initialized with ID: %s", self.agent_id)
 
     @rpc
     async def handle_instruction(self, message: InstructionMessage, ctx: MessageContext) -> None:
@@ -64,26 +79,32 @@ class AuditorAgent(AgentSecBaseAgent):
             message (InstructionMessage): Instruction received from the CoreAgent.
             ctx (MessageContext): Message context.
         """
-        logger.info(f"{self.agent_id}: Instruction received from CoreAgent: {message.message}")
-        log_action(self.agent_id, f"Verifying instruction: {message}")
+        logger.info("%s: Instruction received from CoreAgent: %s", self.agent_id, message.message)
+        log_action(self.agent_id, "Verifying instruction: %s", message)
 
         # Verify signature of the instruction
-        if not verify_signature(message):
-            logger.warning(f"{self.agent_id}: Signature verification failed for instruction: {message.message}")
-            log_action(self.agent_id, f"Instruction rejected due to invalid signature: {message}")
+        if not await verify_signature_async(message):
+            logger.warning("%s: Signature verification failed for instruction: %s", self.agent_id, message.message)
+            log_action(self.agent_id, "Instruction rejected due to invalid signature: %s", message)
             return
 
         # Verify instruction against security policies
-        if not await self.verify_instruction(message):
-            logger.warning(f"{self.agent_id}: Instruction failed security verification: {message.message}")
+        verification = await self.verify_instruction(message)
+        if not verification.verified:
+            logger.warning("%s: Instruction failed security verification: %s", self.agent_id, message.message)
             return
 
-        logger.info(f"{self.agent_id}: Instruction passed verification and security checks.")
-        log_action(self.agent_id, f"Instruction verified and forwarding: {message}")
+        logger.info("%s: Instruction passed verification and security checks.", self.agent_id)
+        log_action(self.agent_id, "Instruction verified and forwarding: %s", message)
 
-        # Relay instruction to the EdgeAgent
-        response = await self.send_message(message, self.edge_agent_id)
-        logger.info(f"{self.agent_id}: Instruction relayed to EdgeAgent. Response: {response}")
+        # Relay instruction to an EdgeAgent in the pool; with consistent hashing, a client session stays on one agent
+        response = await self.edge_pool.send(
+            self,
+            message,
+            session_key=message.session_id,
+            cancellation_token=ctx.cancellation_token
+        )
+        logger.info("%s: Instruction relayed to EdgeAgent. Response: %s", self.agent_id, response)
 
     @event
     async def handle_data(self, message: DataMessage, ctx: MessageContext) -> Optional[DataMessage]:
@@ -96,24 +117,36 @@ class AuditorAgent(AgentSecBaseAgent):
             message (DataMessage): Data message received from the EdgeAgent.
             ctx (MessageContext): Message context.
         """
-        logger.info(f"{self.agent_id}: Data received from EdgeAgent: {message.message}")
-        log_action(self.agent_id, f"Inspecting data: {message}")
+        logger.info("%s: Data received from EdgeAgent: %s", self.agent_id, message.message)
+        log_action(self.agent_id, "Inspecting data: %s", message)
 
         # Inspect data for malicious content
         if not self.inspect_data(message):
-            logger.warning(f"{self.agent_id}: Malicious content detected in data: {message.message}")
+            logger.warning("%s: Malicious content detected in data: %s", self.agent_id, message.message)
             return None
 
-        logger.info(f"{self.agent_id}: Data passed inspection.")
-        log_action(self.agent_id, f"Data verified and forwarding: {message}")
+        logger.info("%s: Data passed inspection.", self.agent_id)
+        log_action(self.agent_id, "Data verified and forwarding: %s", message)
 
         # Relay data to the CoreAgent
-        response = await self.send_message(message, self.core_agent_id)
-        logger.info(f"{self.agent_id}: Data relayed to CoreAgent. Response: {response.content}")
+        response = await self.send_message(message, self.core_agent_id, cancellation_token=ctx.cancellation_token)
+        logger.info("%s: Data relayed to CoreAgent. Response: %s", self.agent_id, response.content)
         return response
 
     async def verify_instruction(self, message: InstructionMessage) -> VerificationResponse:
-        logger.debug(f"{self.agent_id}: Verifying instruction content: {message.message}")
+        logger.debug("%s: Verifying instruction content: %s", self.agent_id, message.message)
+
+        # Let the compiled policy rules decide clear-cut cases without a model call
+        rule_verdict = self.policy_rules.evaluate(message.message)
+        if rule_verdict is not None:
+            logger.info("%s: Verification result (policy rules): %s", self.agent_id, rule_verdict)
+            return rule_verdict
+
+        # Identical instructions under an unchanged policy reuse the earlier model verdict
+        cached_verdict = self.verdict_cache.get(message.message)
+        if cached_verdict is not None:
+            logger.info("%s: Verification result (cached): %s", self.agent_id, cached_verdict)
+            return cached_verdict
 
         # Construct verification context
         verification_context = {
@@ -139,11 +172,12 @@ class AuditorAgent(AgentSecBaseAgent):
             if not isinstance(response, VerificationResponse):
                 raise ValueError("Invalid response format from model.")
 
-            logger.info(f"{self.agent_id}: Verification result: {response}")
+            logger.info("%s: Verification result: %s", self.agent_id, response)
+            self.verdict_cache.put(message.message, response)
             return response
 
         except Exception as e:
-            logger.error(f"{self.agent_id}: Error during verification: {e}")
+            logger.error("%s: Error during verification: %s", self.agent_id, e)
             return VerificationResponse(verified=False, message=f"[ERROR]: Verification failed due to: {str(e)}")
 
     def inspect_data(self, message: DataMessage) -> bool:
@@ -156,9 +190,11 @@ class AuditorAgent(AgentSecBaseAgent):
         Returns:
             bool: True if the data is safe, False otherwise.
         """
-        logger.debug(f"{self.agent_id}: Inspecting data: {message.message}")
-        # Placeholder for malicious content detection logic
-        return "malicious" not in message.message.lower()
+        logger.debug("%s: Inspecting data: %s", self.agent_id, message.message)
+        matched_rules = self.content_scanner.scan(message.message)
+        if matched_rules:
+            log_action(self.agent_id, "Content rules matched in data: %s", matched_rules)
+        return not matched_rules
     
     def inspect_external_message(self, message: ExternalMessage) -> bool:
         """
@@ -170,12 +206,14 @@ class AuditorAgent(AgentSecBaseAgent):
         Returns:
             bool: True if the data is safe, False otherwise.
         """
-        logger.debug(f"{self.agent_id}: Inspecting data: {message.content}")
-        # Placeholder for malicious content detection logic
-        return "malicious" not in message.content.lower()
-    
+        logger.debug("%s: Inspecting data: %s", self.agent_id, message.content)
+        matched_rules = self.content_scanner.scan(message.content)
+        if matched_rules:
+            log_action(self.agent_id, "Content rules matched in external message: %s", matched_rules)
+        return not matched_rules
+
     @message_handler
-    async def handle_external_message(self, message: ExternalMessage, ctx: MessageContext) -> ExternalMessage:
+    async def handle_external_message(self, message: ExternalMessage, ctx: MessageContext) -> Optional[ExternalMessage]:
         """
         Inspect and verify the external message for policy compliance.
 
@@ -183,17 +221,20 @@ class AuditorAgent(AgentSecBaseAgent):
             message (ExternalMessage): The external message to inspect.
             ctx (MessageContext): The message context.
         Returns:
-            ExternalMessage: Forward the verified message to the CoreAgent.
+            Optional[ExternalMessage]: The message forwarded to the CoreAgent, or None if it was rejected.
         """
         # Log and inspect the incoming message
-        logger.info(f"AuditorAgent inspecting message: {message.content}")
+        logger.info("AuditorAgent inspecting message: %s", message.content)
+
+        # Messages matching a content rule (e.g. prompt injection, exfiltration) never reach the CoreAgent
+        if not self.inspect_external_message(message=message):
+            logger.warning("%s: External message rejected by content rules: %s", self.agent_id, message.correlation_id)
+            log_action(self.agent_id, "External message rejected: %s", message.correlation_id)
+            return None
 
-        # Simulate a verification process
-        self.inspect_external_message(message=message)
-        
         # If message is verified, forward it to the CoreAgent
-        logger.info(f"Message passed security checks: {message.content}")
-        await self.send_message(message, self.core_agent_id)
+        logger.info("Message passed security checks: %s", message.content)
+        await self.send_message(message, self.core_agent_id, cancellation_token=ctx.cancellation_token)
 
         # Return the message for logging or further processing
         return message
\ No newline at end of file
@@ -1,21 +1,20 @@
-import logging
 from typing import Optional
 
 from agents.agent_base import AgentSecBaseAgent
 from autogen_core.components import rpc, event
 from autogen_core.base import MessageContext, AgentId
-from security.signature_tools import sign_message
+from security.signature_tools import sign_message_batched
 from py_models.messages import DataMessage, ExternalMessage, InstructionMessage
 from autogen_core.components.models import ChatCompletionClient, SystemMessage, UserMessage
 from autogen_core.components import message_handler
 from utils.fetch import DataManager
-from utils.context import parse_context
+from utils.context import parse_context, select_context
 import time
 from data.db_manager import write_data
 from security.log_chain import log_action
+from utils.log import get_logger
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class CoreAgent(AgentSecBaseAgent):
     """
@@ -44,14 +43,14 @@ class CoreAgent(AgentSecBaseAgent):
 
         # Initialize the DataManager with this agent's ID and name
         self.data_manager = DataManager(agent_id=self.agent_id, agent_name=self.agent_name)
-        logger.info(f"CoreAgent initialized with ID: {self.agent_id}")
+        logger.info("CoreAgent initialized with ID: %s", self.agent_id)
 
     async def on_start(self):
         """Perform setup tasks when the agent starts."""
-        logger.info(f"{self.agent_id}: Starting and loading data.")
-        # CoreAgent has clearance level 3, so fetch all data
-        decrypted_data = self.data_manager.fetch_data_by_clearance_level(3)
-        logger.debug(f"{self.agent_id}: Decrypted data loaded for processing: {decrypted_data}")
+        logger.info("%s: Starting and loading data.", self.agent_id)
+        # CoreAgent has clearance level 3, so fetch all data; this warms the DataManager's context snapshot
+        decrypted_data = await self.data_manager.fetch_data_by_clearance_level_async(3)
+        logger.debug("%s: Decrypted data loaded for processing: %s", self.agent_id, decrypted_data)
 
     @rpc
     async def handle_instruction(self, message: InstructionMessage, ctx: MessageContext) -> None:
@@ -63,14 +62,16 @@ class CoreAgent(AgentSecBaseAgent):
             message (InstructionMessage): The validated instruction message.
             ctx (MessageContext): The message context.
         """
-        log_action(self.agent_id, f"Instruction received: {message}")
-        logger.info(f"{self.agent_id}: Instruction received from AuditorAgent: {message.message}")
+        log_action(self.agent_id, "Instruction received: %s", message)
+        logger.info("%s: Instruction received from AuditorAgent: %s", self.agent_id, message.message)
 
-        # Fetch decrypted context (clearance 3)
-        decrypted_context = self.data_manager.fetch_data_by_clearance_level(3)
+        # Select the most relevant decrypted context (clearance 3) from the warm snapshot;
+        # a cold snapshot is decrypted off the event loop first
+        await self.data_manager.warm_snapshot_async(3)
+        relevant_context = select_context(message.message, data_manager=self.data_manager, clearance_level=3)
 
         # Prepare contextualized message for processing
-        contextualized_message = message.message + parse_context(decrypted_context)
+        contextualized_message = message.message + parse_context(relevant_context)
 
         # Prepare messages for the model
         user_message = UserMessage(content=contextualized_message, source="auditor_agent")
@@ -78,32 +79,42 @@ class CoreAgent(AgentSecBaseAgent):
 
         # Send to model client for further processing or decision-making
         response = await self.model_client.create(final_messages, cancellation_token=ctx.cancellation_token)
-        logger.info(f"{self.agent_id}: Model client responded with: {response.content}")
+        logger.info("%s: Model client responded with: %s", self.agent_id, response.content)
 
         # Log the processed result
-        log_action(self.agent_id, f"Processed instruction: {response.content}")
-        logger.debug(f"{self.agent_id}: Processed instruction and logged.")
+        log_action(self.agent_id, "Processed instruction: %s", response.content)
+        logger.debug("%s: Processed instruction and logged.", self.agent_id)
         # Create and sign the instruction message
-        instruction_message = self._create_instruction_message(response.content, self.signing_token)
-        signed_instruction = sign_message(instruction_message)
+        instruction_message = self._create_instruction_message(response.content, self.signing_token, message.correlation_id, message.session_id)
+        # Sign on the crypto executor so other agents keep running; concurrent instructions
+        # share one Merkle root signature when SIGNING_BATCH_WINDOW is set
+        signed_instruction = await sign_message_batched(instruction_message)
 
         # Log and relay the signed instruction
-        log_action(self.agent_id, f"Signed instruction: {signed_instruction}")
-        logger.debug(f"{self.agent_id}: Instruction signed and logged.")
+        log_action(self.agent_id, "Signed instruction: %s", signed_instruction)
+        logger.debug("%s: Instruction signed and logged.", self.agent_id)
 
         recipient = AgentId(type="auditor_agent", key="default")
-        await self.send_message(signed_instruction, recipient)
-        log_action(self.agent_id, f"Instruction relayed to {recipient}.")
-        logger.info(f"{self.agent_id}: Instruction relayed to {recipient}.")
+        await self.send_message(signed_instruction, recipient, cancellation_token=ctx.cancellation_token)
+        log_action(self.agent_id, "Instruction relayed to %s.", recipient)
+        logger.info("%s: Instruction relayed to %s.", self.agent_id, recipient)
     
-    def _create_instruction_message(self, content: str, token: str) -> InstructionMessage:
+    def _create_instruction_message(
+        self,
+        content: str,
+        token: str,
+        correlation_id: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> InstructionMessage:
         """Create an InstructionMessage from model response content."""
         return InstructionMessage(
             message=content,
             sender=str(self.agent_id),
             timestamp=int(time.time()),
             token=token,
-            signature=''
+            signature='',
+            correlation_id=correlation_id,
+            session_id=session_id
         )
 
     @event
@@ -116,26 +127,26 @@ class CoreAgent(AgentSecBaseAgent):
             message (DataMessage): The data message received.
             ctx (MessageContext): The message context.
         """
-        log_action(self.agent_id, f"Data received: {message}")
-        logger.info(f"{self.agent_id}: Data received from AuditorAgent: {message}")
+        log_action(self.agent_id, "Data received: %s", message)
+        logger.info("%s: Data received from AuditorAgent: %s", self.agent_id, message)
 
         # Prompt or apply logic to classify clearance level
         clearance_level = self._prompt_for_clearance(message)
         if clearance_level is None:
-            logger.warning(f"{self.agent_id}: Invalid clearance level. Classification aborted.")
+            logger.warning("%s: Invalid clearance level. Classification aborted.", self.agent_id)
             return None
 
         # Assign clearance level and log
         message.clearance_level = clearance_level
-        log_action(self.agent_id, f"Data assigned clearance level {clearance_level}")
-        logger.info(f"{self.agent_id}: Data assigned clearance level {clearance_level}.")
+        log_action(self.agent_id, "Data assigned clearance level %s", clearance_level)
+        logger.info("%s: Data assigned clearance level %s.", self.agent_id, clearance_level)
 
         # Update database with validated data
         write_data(message.model_dump())
-        logger.debug(f"{self.agent_id}: Data updated in the database.")
+        logger.debug("%s: Data updated in the database.", self.agent_id)
 
         # Log completion of the data handling process
-        log_action(self.agent_id, f"Data handling completed: {message}")
+        log_action(self.agent_id, "Data handling completed: %s", message)
         return message
 
     def _prompt_for_clearance(self, message: DataMessage) -> Optional[int]:
@@ -155,7 +166,7 @@ class CoreAgent(AgentSecBaseAgent):
                 raise ValueError("Invalid clearance level.")
             return clearance_level
         except ValueError as e:
-            log_action(self.agent_id, f"Data classification failed: {e}")
+            log_action(self.agent_id, "Data classification failed: %s", e)
             return None
     
     @message_handler
@@ -168,12 +179,12 @@ class CoreAgent(AgentSecBaseAgent):
             ctx (MessageContext): The message context.
         """
         # Log the receipt of the message
-        logger.info(f"CoreAgent received external message: {message.content}")
+        logger.info("CoreAgent received external message: %s", message.content)
         # Putting in a mock token for now, 
-        instruction_message = self._create_instruction_message(message.content, self.signing_token)
+        instruction_message = self._create_instruction_message(message.content, self.signing_token, message.correlation_id, message.session_id)
 
         # Log the generated instruction
-        logger.info(f"Generated instruction: {instruction_message.message}")
+        logger.info("Generated instruction: %s", instruction_message.message)
 
         # Call the instruction handler
         await self.handle_instruction(instruction_message, ctx)
\ No newline at end of file
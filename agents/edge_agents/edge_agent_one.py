@@ -1,21 +1,21 @@
-import logging
+import asyncio
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from agents.agent_base import AgentSecBaseAgent
 from autogen_core.components import rpc, event
-from autogen_core.base import MessageContext
-from security.signature_tools import verify_signature
+from autogen_core.base import CancellationToken, MessageContext
+from security.signature_tools import verify_signature_async
 from security.log_chain import log_action
 from py_models.messages import InstructionMessage, DataMessage, ExternalMessage
 from autogen_core.components import message_handler
 from autogen_core.components.models import ChatCompletionClient, SystemMessage
 from utils.fetch import DataManager
-import queue
+from utils.response_hub import ResponseHub
+from utils.single_flight import SingleFlight, get_single_flight
+from utils.log import get_logger
 
-
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 class EdgeAgent(AgentSecBaseAgent):
     """
@@ -32,15 +32,18 @@ class EdgeAgent(AgentSecBaseAgent):
                 agent_id: str, 
                 model_client: ChatCompletionClient, 
                 auditor_agent_id: str,
-                outgoing_queue: queue.Queue,
+                outgoing_queue: ResponseHub,
                 description: str = "Executes tasks and reports results",
-                agent_name: str = "edge_agent"):
+                agent_name: str = "edge_agent",
+                coalescer: Optional[SingleFlight] = None):
         super().__init__(description=description)
         self.agent_id = agent_id
         self.agent_name = agent_name
         self.model_client = model_client
         self.auditor_agent_id = auditor_agent_id
         self.outgoing_queue = outgoing_queue
+        # Identical in-flight external messages share one chain; shared by all edge agents in the process
+        self.coalescer = coalescer or get_single_flight()
         self.clearance_level = 1
         self.data_manager = DataManager(agent_id=self.agent_id, agent_name=self.agent_name)
         self._system_messages = [
@@ -50,7 +53,7 @@ class EdgeAgent(AgentSecBaseAgent):
             )
         ]
 
-        logger.info(f"EdgeAgent initialized with ID: {self.agent_id}")
+        logger.info("EdgeAgent initialized with ID: %s", self.agent_id)
 
     def load_accessible_data(self, clearance_level: int = 1) -> List[Dict[str, any]]:
         """
@@ -63,14 +66,14 @@ class EdgeAgent(AgentSecBaseAgent):
             List[Dict[str, any]]: A list of data items accessible to this agent.
         """
         log_action(self.agent_id, "Loading accessible data.")
-        logger.debug(f"{self.agent_id}: Loading data for clearance level {clearance_level}")
+        logger.debug("%s: Loading data for clearance level %s", self.agent_id, clearance_level)
 
         # Use the DataManager to fetch data up to clearance_level 1
         accessible_data = self.data_manager.fetch_data_by_clearance_level(clearance_level)
 
         for data_item in accessible_data:
-            log_action(self.agent_id, f"Accessible data: {data_item['id']} with content: {data_item['content']}")
-            logger.debug(f"{self.agent_id}: Accessible data item {data_item['id']}: {data_item['content']}")
+            log_action(self.agent_id, "Accessible data: %s", data_item['id'])
+            logger.debug("%s: Accessible data item %s: %s", self.agent_id, data_item['id'], data_item['content'])
 
         return accessible_data
 
@@ -83,53 +86,62 @@ class EdgeAgent(AgentSecBaseAgent):
             message (InstructionMessage): The instruction message received.
             ctx (MessageContext): The context of the message.
         """
-        log_action(self.agent_id, f"Instruction received: {message}")
-        logger.info(f"{self.agent_id}: Instruction received: {message}")
+        log_action(self.agent_id, "Instruction received: %s", message)
+        logger.info("%s: Instruction received: %s", self.agent_id, message)
 
-        if not self._verify_instruction_signature(message):
-            logger.warning(f"{self.agent_id}: Signature verification failed for instruction ID {message.id}")
+        if not await self._verify_instruction_signature(message):
+            logger.warning("%s: Signature verification failed for instruction ID %s", self.agent_id, message.id)
             return
 
-        logger.info(f"{self.agent_id}: Instruction verified: {message.message}")
-        await self._perform_task(message)
+        logger.info("%s: Instruction verified: %s", self.agent_id, message.message)
+        await self._perform_task(message, ctx.cancellation_token)
 
-    async def _perform_task(self, instruction: InstructionMessage):
+    async def _perform_task(self, instruction: InstructionMessage, cancellation_token: Optional[CancellationToken] = None):
         """
         Perform the task described in the instruction and publish the result.
 
         Args:
             instruction (InstructionMessage): The instruction containing the task.
+            cancellation_token (Optional[CancellationToken]): Token of the chain this task belongs to.
         """
         command = instruction.message
-        logger.debug(f"{self.agent_id}: Performing task: {command}")
+        logger.debug("%s: Performing task: %s", self.agent_id, command)
 
         # Execute the actual command logic
-        result_message = await self._execute_command(command)
+        result_message = await self._execute_command(command, instruction.correlation_id, cancellation_token)
 
         # Create a DataMessage for the result
         result = DataMessage(
             message=result_message,
             timestamp=int(time.time()),
             sender=str(self.agent_id),
+            correlation_id=instruction.correlation_id,
         )
 
         # Forward the result to the AuditorAgent
-        response = await self.send_message(result, self.auditor_agent_id)
-        logger.info(f"{self.agent_id}: AuditorAgent response: {response}")
-        log_action(self.agent_id, f"Task executed and forwarded: {command}")
+        response = await self.send_message(result, self.auditor_agent_id, cancellation_token=cancellation_token)
+        logger.info("%s: AuditorAgent response: %s", self.agent_id, response)
+        log_action(self.agent_id, "Task executed and forwarded: %s", command)
 
     
-    async def _execute_command(self, command: str) -> str:
+    async def _execute_command(
+        self,
+        command: str,
+        correlation_id: Optional[str] = None,
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> str:
         """
         Execute the provided command and forward the result to the outgoing queue.
 
         Args:
             command (str): The instruction/command to execute.
+            correlation_id (Optional[str]): Id of the external request, used to route the result to its client.
+            cancellation_token (Optional[CancellationToken]): Token of the chain this command belongs to.
 
         Returns:
             str: The result of the command execution.
         """
-        logger.debug(f"{self.agent_id}: Executing command logic for: {command}")
+        logger.debug("%s: Executing command logic for: %s", self.agent_id, command)
 
         # Generate the command prompt
         command_prompt = f"Execute the following command. Describe and present your results. COMMAND: {command}"
@@ -137,25 +149,26 @@ class EdgeAgent(AgentSecBaseAgent):
         messages = self._system_messages + [external_message]
 
         # Get the response from the model client
-        response = await self.model_client.create(messages)
+        response = await self.model_client.create(messages, cancellation_token=cancellation_token)
 
         # Check if response is valid
         if not response or not hasattr(response, 'content') or not response.content:
-            logger.error(f"{self.agent_id}: Model client returned invalid response: {response}")
+            logger.error("%s: Model client returned invalid response: %s", self.agent_id, response)
             return "Error: Command execution failed."
 
         result_message = f"Result of task '{command}': {response.content}. Completed by {self.agent_id}"
 
         # Log and send the result
-        logger.info(f"{self.agent_id}: Command result: {result_message}")
-        log_action(self.agent_id, f"Command result: {result_message}")
+        logger.info("%s: Command result: %s", self.agent_id, result_message)
+        log_action(self.agent_id, "Command result: %s", result_message)
 
-        # Place the result in the outgoing queue for the Flask app to access
-        self.outgoing_queue.put(result_message)
+        # Route the result to the mailbox of the client that sent the request, and of any coalesced duplicates
+        for recipient_id in self.coalescer.resolve(correlation_id, result_message):
+            self.outgoing_queue.put(result_message, correlation_id=recipient_id)
 
         return result_message
 
-    def _verify_instruction_signature(self, message: InstructionMessage) -> bool:
+    async def _verify_instruction_signature(self, message: InstructionMessage) -> bool:
         """
         Verify the signature of the incoming instruction.
 
@@ -165,13 +178,13 @@ class EdgeAgent(AgentSecBaseAgent):
         Returns:
             bool: True if signature is valid, False otherwise.
         """
-        logger.debug(f"{self.agent_id}: Verifying signature for instruction ID: {message.id}")
-        if verify_signature(message):
-            logger.debug(f"{self.agent_id}: Signature verified for instruction ID: {message.id}")
+        logger.debug("%s: Verifying signature for instruction ID: %s", self.agent_id, message.id)
+        if await verify_signature_async(message):
+            logger.debug("%s: Signature verified for instruction ID: %s", self.agent_id, message.id)
             return True
         else:
             log_action(self.agent_id, "Signature verification failed.")
-            logger.error(f"{self.agent_id}: Signature verification failed for instruction ID: {message.id}")
+            logger.error("%s: Signature verification failed for instruction ID: %s", self.agent_id, message.id)
             return False
 
     @event
@@ -180,10 +193,10 @@ class EdgeAgent(AgentSecBaseAgent):
         Handle incoming data from other sources.
         """
         if isinstance(message, DataMessage):
-            log_action(self.agent_id, f"Data received: {message}")
-            logger.info(f"{self.agent_id}: Data received from {message.sender}: {message.message}")
+            log_action(self.agent_id, "Data received: %s", message)
+            logger.info("%s: Data received from %s: %s", self.agent_id, message.sender, message.message)
         else:
-            logger.error(f"{self.agent_id}: Unexpected message type: {type(message)}")
+            logger.error("%s: Unexpected message type: %s", self.agent_id, type(message))
     
     @message_handler
     async def handle_external_message(self, message: ExternalMessage, ctx: MessageContext) -> None:
@@ -194,7 +207,32 @@ class EdgeAgent(AgentSecBaseAgent):
             message (ExternalMessage): The external message.
             ctx (MessageContext): The context of the message.
         """
-        logger.info(f"EdgeAgent received external message: {message.content}")
+        logger.info("EdgeAgent received external message: %s", message.content)
+        key = self.coalescer.key(message.content, message.sender)
+        while True:
+            flight, is_leader = self.coalescer.acquire(key, message.correlation_id)
+            if is_leader:
+                break
+            if flight.has_result:
+                # Finished within the coalescing window; reuse its result
+                self.outgoing_queue.put(flight.result, correlation_id=message.correlation_id)
+                return None
+            logger.info("%s: Coalesced %s onto in-flight %s", self.agent_id, message.correlation_id, flight.leader)
+            try:
+                await flight.done.wait()
+            except asyncio.CancelledError:
+                self.coalescer.detach(flight, message.correlation_id)
+                raise
+            if not flight.abandoned:
+                # The result, if the chain produced one, was fanned out to this correlation id
+                return None
+            # The leader was cancelled or failed; retry, possibly as the new leader
+
         # Process the message or pass it on to the next agent (AuditorAgent)
-        await self.send_message(message, self.auditor_agent_id)
+        completed = False
+        try:
+            await self.send_message(message, self.auditor_agent_id, cancellation_token=ctx.cancellation_token)
+            completed = True
+        finally:
+            self.coalescer.finish(flight, abandoned=not completed)
         return None
\ No newline at end of file
@@ -0,0 +1,172 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from autogen_core.base import AgentId, CancellationToken
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for the edge agent pool
+EDGE_POOL_SIZE = int(os.getenv("EDGE_POOL_SIZE", 1))
+EDGE_ROUTING = os.getenv("EDGE_ROUTING", "least_outstanding")  # or "consistent_hash"
+EDGE_FAILURE_THRESHOLD = int(os.getenv("EDGE_FAILURE_THRESHOLD", 3))
+EDGE_COOLDOWN_SECONDS = float(os.getenv("EDGE_COOLDOWN_SECONDS", 30))
+
+LEAST_OUTSTANDING = "least_outstanding"
+CONSISTENT_HASH = "consistent_hash"
+VIRTUAL_NODES = 64
+
+
+class EdgeMember:
+    """Routing and health state of one EdgeAgent instance."""
+
+    __slots__ = ("agent_id", "outstanding", "consecutive_failures", "unhealthy_until", "completed", "failed")
+
+    def __init__(self, agent_id: AgentId):
+        self.agent_id = agent_id
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.completed = 0
+        self.failed = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+
+class EdgeAgentPool:
+    """
+    A pool of EdgeAgent instances registered under one agent type with distinct keys.
+
+    Routing strategies:
+        * least_outstanding: the healthy member with the fewest in-flight messages (round-robin on ties)
+        * consistent_hash: members on a hash ring, so one session key always lands on the same member
+          while it stays healthy
+
+    A member that fails `failure_threshold` sends in a row is taken out of rotation for
+    `cooldown_seconds`. If every member is unhealthy, routing falls back to the whole pool.
+    """
+
+    def __init__(
+        self,
+        agent_ids: List[AgentId],
+        strategy: str = EDGE_ROUTING,
+        failure_threshold: int = EDGE_FAILURE_THRESHOLD,
+        cooldown_seconds: float = EDGE_COOLDOWN_SECONDS
+    ):
+        if not agent_ids:
+            raise ValueError("An edge agent pool needs at least one agent.")
+        if strategy not in (LEAST_OUTSTANDING, CONSISTENT_HASH):
+            raise ValueError(f"Unknown edge routing strategy: {strategy}")
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.members: Dict[AgentId, EdgeMember] = {agent_id: EdgeMember(agent_id) for agent_id in agent_ids}
+        self._round_robin = itertools.count()
+
+        # Hash ring of (point, agent id), VIRTUAL_NODES points per member
+        self._ring = sorted(
+            (self._hash(f"{agent_id}#{replica}"), agent_id)
+            for agent_id in agent_ids
+            for replica in range(VIRTUAL_NODES)
+        )
+        self._ring_points = [point for point, _ in self._ring]
+
+    @classmethod
+    def of_size(cls, agent_type: str, size: int = EDGE_POOL_SIZE, **kwargs) -> "EdgeAgentPool":
+        """Create a pool of `size` agents of one type, keyed worker-0 .. worker-(size-1)."""
+        return cls([AgentId(agent_type, f"worker-{index}") for index in range(size)], **kwargs)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+    @property
+    def agent_ids(self) -> List[AgentId]:
+        return list(self.members)
+
+    def _candidates(self) -> List[EdgeMember]:
+        now = time.monotonic()
+        healthy = [member for member in self.members.values() if member.is_healthy(now)]
+        return healthy or list(self.members.values())
+
+    def pick(self, session_key: Optional[str] = None) -> AgentId:
+        """Choose the edge agent for a message."""
+        candidates = self._candidates()
+        if self.strategy == CONSISTENT_HASH and session_key:
+            allowed = {member.agent_id for member in candidates}
+            start = bisect.bisect(self._ring_points, self._hash(session_key))
+            for offset in range(len(self._ring)):
+                agent_id = self._ring[(start + offset) % len(self._ring)][1]
+                if agent_id in allowed:
+                    return agent_id
+
+        fewest = min(member.outstanding for member in candidates)
+        tied = [member for member in candidates if member.outstanding == fewest]
+        return tied[next(self._round_robin) % len(tied)].agent_id
+
+    def _record(self, agent_id: AgentId, succeeded: bool) -> None:
+        member = self.members[agent_id]
+        member.outstanding -= 1
+        if succeeded:
+            member.completed += 1
+            member.consecutive_failures = 0
+            return
+        member.failed += 1
+        member.consecutive_failures += 1
+        if member.consecutive_failures >= self.failure_threshold:
+            member.unhealthy_until = time.monotonic() + self.cooldown_seconds
+            member.consecutive_failures = 0
+            logger.warning("Edge agent %s marked unhealthy for %ss.", agent_id, self.cooldown_seconds)
+
+    async def send(
+        self,
+        sender,
+        message: Any,
+        session_key: Optional[str] = None,
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> Any:
+        """
+        Route a message to a pool member and track its outcome.
+
+        Args:
+            sender: Anything with `send_message(message, recipient, cancellation_token=...)`, e.g. an agent or the runtime.
+            message (Any): The message to deliver.
+            session_key (Optional[str]): Key for consistent-hash routing, e.g. the client's session id.
+            cancellation_token (Optional[CancellationToken]): Token for cancelling the send.
+
+        Returns:
+            Any: The member's response.
+        """
+        agent_id = self.pick(session_key)
+        self.members[agent_id].outstanding += 1
+        try:
+            response = await sender.send_message(message, agent_id, cancellation_token=cancellation_token)
+        except asyncio.CancelledError:
+            # A cancelled chain says nothing about the member's health
+            self.members[agent_id].outstanding -= 1
+            raise
+        except Exception:
+            self._record(agent_id, succeeded=False)
+            raise
+        self._record(agent_id, succeeded=True)
+        return response
+
+    def stats(self) -> List[dict]:
+        """Per-member routing and health counters."""
+        now = time.monotonic()
+        return [
+            {
+                "agent_id": str(member.agent_id),
+                "outstanding": member.outstanding,
+                "completed": member.completed,
+                "failed": member.failed,
+                "healthy": member.is_healthy(now),
+            }
+            for member in self.members.values()
+        ]
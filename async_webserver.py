@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import uuid
+from aiohttp import web, WSMsgType
+from utils.log import get_logger
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "templates", "index.html")
+# Seconds between SSE keep-alive comments
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", 15))
+# Clients are identified by this cookie (or the X-Client-Id header) so responses reach only their sender
+CLIENT_COOKIE = "client_id"
+
+logger = get_logger(__name__)
+
+
+def _to_jsonable(response):
+    """Convert a response (str, pydantic model, ...) into something json.dumps accepts."""
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return response
+
+
+def _client_id(request: web.Request):
+    """Return (client id, whether it was newly assigned) for a request."""
+    client_id = request.headers.get("X-Client-Id") or request.cookies.get(CLIENT_COOKIE)
+    if client_id:
+        return client_id, False
+    return uuid.uuid4().hex, True
+
+
+def _with_client_cookie(response: web.StreamResponse, client_id: str, is_new: bool) -> web.StreamResponse:
+    if is_new:
+        response.set_cookie(CLIENT_COOKIE, client_id, httponly=True, samesite="Strict")
+    return response
+
+
+def create_app(dispatcher, response_hub) -> web.Application:
+    """
+    Build the aiohttp front-end.
+
+    Args:
+        dispatcher (MessageDispatcher): Queues incoming messages for the agent runtime and cancels them.
+        response_hub (ResponseHub): Routes agent responses into per-client mailboxes and push subscribers.
+
+    Returns:
+        web.Application: The application, sharing the agent runtime's event loop.
+    """
+    app = web.Application()
+
+    async def index(request: web.Request) -> web.StreamResponse:
+        client_id, is_new = _client_id(request)
+        return _with_client_cookie(web.FileResponse(TEMPLATE_PATH), client_id, is_new)
+
+    def _submit(user_message, client_id):
+        if not user_message:
+            return web.json_response({"status": "error", "error": "No message provided"}, status=400)
+        logger.info("Received message: %s", user_message)
+        message_id = dispatcher.submit(user_message, client_id)
+        if message_id is None:
+            # Backpressure: the pending queue is full
+            return web.json_response(
+                {"status": "busy", "error": "Too many pending messages, retry later"},
+                status=503,
+                headers={"Retry-After": "1"},
+            )
+        return web.json_response({"status": "ok", "id": message_id})
+
+    async def _read_json(request: web.Request):
+        """Return the request's JSON object body, or None if it is not a JSON object."""
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _invalid_json():
+        return web.json_response({"status": "error", "error": "Request body must be a JSON object"}, status=400)
+
+    async def send_message(request: web.Request) -> web.Response:
+        data = await _read_json(request)
+        if data is None:
+            return _invalid_json()
+        client_id, is_new = _client_id(request)
+        return _with_client_cookie(_submit(data.get("message"), client_id), client_id, is_new)
+
+    async def cancel_message(request: web.Request) -> web.Response:
+        data = await _read_json(request)
+        if data is None:
+            return _invalid_json()
+        message_id = data.get("id")
+        if not message_id:
+            return web.json_response({"status": "error", "error": "No message id provided"}, status=400)
+        client_id, _ = _client_id(request)
+        # Clients may only cancel their own messages
+        if response_hub.owner(message_id) == client_id and dispatcher.cancel(message_id):
+            return web.json_response({"status": "ok"})
+        return web.json_response({"status": "error", "error": "Unknown or finished message"}, status=404)
+
+    async def get_responses(request: web.Request) -> web.Response:
+        # Polling endpoint kept for compatibility with older clients; returns only this client's mailbox
+        client_id, is_new = _client_id(request)
+        items = [{"id": item["id"], "response": _to_jsonable(item["response"])} for item in response_hub.drain(client_id)]
+        for item in items:
+            logger.info("Sending response %s to client %s", item['id'], client_id)
+        return _with_client_cookie(
+            web.json_response({"responses": [item["response"] for item in items], "items": items}),
+            client_id,
+            is_new,
+        )
+
+    async def events(request: web.Request) -> web.StreamResponse:
+        """Server-Sent Events stream of this client's agent responses."""
+        client_id, is_new = _client_id(request)
+        stream = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        _with_client_cookie(stream, client_id, is_new)
+        await stream.prepare(request)
+        subscriber = response_hub.subscribe(client_id)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    await stream.write(b": keep-alive\n\n")
+                    continue
+                payload = json.dumps(_to_jsonable(item["response"]))
+                await stream.write(f"event: response\nid: {item['id']}\ndata: {payload}\n\n".encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            # Also runs on cancellation (client disconnect, server shutdown), which must propagate
+            response_hub.unsubscribe(client_id, subscriber)
+        return stream
+
+    async def websocket(request: web.Request) -> web.WebSocketResponse:
+        """WebSocket channel: pushes responses and accepts {"message": ...} frames."""
+        client_id, is_new = _client_id(request)
+        ws = _with_client_cookie(web.WebSocketResponse(heartbeat=SSE_HEARTBEAT_INTERVAL), client_id, is_new)
+        await ws.prepare(request)
+        subscriber = response_hub.subscribe(client_id)
+
+        async def push():
+            while True:
+                item = await subscriber.get()
+                await ws.send_json({"type": "response", "id": item["id"], "response": _to_jsonable(item["response"])})
+
+        pusher = asyncio.create_task(push())
+        try:
+            async for frame in ws:
+                if frame.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(frame.data)
+                except json.JSONDecodeError:
+                    data = None
+                if not isinstance(data, dict):
+                    await ws.send_json({"type": "error", "error": "Invalid JSON"})
+                    continue
+                result = _submit(data.get("message"), client_id)
+                await ws.send_json({"type": "ack", **json.loads(result.text)})
+        finally:
+            pusher.cancel()
+            response_hub.unsubscribe(client_id, subscriber)
+        return ws
+
+    app.router.add_get("/", index)
+    app.router.add_post("/send_message", send_message)
+    app.router.add_post("/cancel_message", cancel_message)
+    app.router.add_get("/get_responses", get_responses)
+    app.router.add_get("/events", events)
+    app.router.add_get("/ws", websocket)
+    return app
+
+
+async def start_async_webserver(dispatcher, response_hub, host: str = "0.0.0.0", port: int = 8000) -> web.AppRunner:
+    """
+    Start the async front-end on the current event loop.
+
+    Returns:
+        web.AppRunner: The runner; call `await runner.cleanup()` to stop the server.
+    """
+    runner = web.AppRunner(create_app(dispatcher, response_hub))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Async webserver listening on %s:%s", host, port)
+    return runner
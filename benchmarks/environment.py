@@ -0,0 +1,38 @@
+import os
+from typing import Dict
+
+
+def generate_signing_keys(key_dir: str) -> None:
+    """Write a fresh RSA-2048 key pair in the PKCS#1 PEM layout of security/generate_rsa.py."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    os.makedirs(key_dir, exist_ok=True)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(os.path.join(key_dir, "private_key.pem"), "wb") as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    with open(os.path.join(key_dir, "public_key.pem"), "wb") as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.PKCS1))
+
+
+def isolate_environment(workdir: str, seed: int = 0, **overrides: str) -> None:
+    """
+    Point every store at `workdir` and provide generated keys and salt, so benchmarks run offline
+    and never touch the real data store, keys or ledger.
+
+    Must run before the repo modules are imported, since they read their configuration at import.
+    """
+    key_dir = os.path.join(workdir, "keys")
+    generate_signing_keys(key_dir)
+    environment: Dict[str, str] = {
+        "DATA_DIR": os.path.join(workdir, "data_store"),
+        "SIGNING_KEY_DIR": key_dir,
+        "SIGNATURE_ALGORITHM": "rsa",
+        "AUDIT_LEDGER_PATH": os.path.join(workdir, "audit", "ledger.jsonl"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite"),
+        "SECRET_KEY": "benchmark-secret",
+        "SALT_VALUE": f"benchmark-salt-{seed}",
+    }
+    environment.update(overrides)
+    os.environ.update(environment)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
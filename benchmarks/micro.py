@@ -0,0 +1,256 @@
+"""
+Microbenchmarks for the security and storage primitives, checked against a recorded baseline.
+
+Runs offline in a temporary directory with generated signing keys and salt:
+
+    python -m benchmarks.micro --save-baseline     # record benchmarks/baseline.json on this machine
+    python -m benchmarks.micro                     # compare against it; exits 1 on a regression
+
+A primitive regresses when its median time per call is more than the threshold percentage above
+the baseline (MICROBENCH_THRESHOLD, or per primitive with --thresholds "fetch_data_by_clearance*=50").
+Storage primitives are measured at every store size in --sizes, growing one store in place.
+Baselines are only comparable on the machine (and Python) that recorded them.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.environment import isolate_environment
+
+MICROBENCH_BASELINE = os.getenv("MICROBENCH_BASELINE", os.path.join(os.path.dirname(__file__), "baseline.json"))
+MICROBENCH_THRESHOLD = float(os.getenv("MICROBENCH_THRESHOLD", 20))
+
+PAYLOAD = "Patient's name is Mary Sue, she lives at 342 Happy Street. Her doctor is Dr Lewis."
+
+
+def parse_thresholds(spec: str) -> Dict[str, float]:
+    thresholds = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            pattern, percent = entry.split("=", 1)
+            thresholds[pattern.strip()] = float(percent)
+    return thresholds
+
+
+def name_matches(name: str, pattern: str) -> bool:
+    """Glob match where only "*" is a wildcard, so names like "read_data[10k]" can be written literally."""
+    return re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), name) is not None
+
+
+def threshold_for(name: str, default: float, overrides: Dict[str, float]) -> float:
+    for pattern, percent in overrides.items():
+        if name_matches(name, pattern):
+            return percent
+    return default
+
+
+def size_label(size: int) -> str:
+    return f"{size // 1000}k" if size >= 1000 and size % 1000 == 0 else str(size)
+
+
+def measure(func: Callable[[], object], rounds: int, min_time: float, max_number: int) -> dict:
+    """
+    Time `func` like timeit: calibrate calls per round until a round lasts `min_time` (at most
+    `max_number` calls), then report the median and minimum per-call time over `rounds` rounds.
+    """
+
+    def run(number: int) -> float:
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= min_time or number >= max_number:
+            break
+        number = min(max_number, max(number * 2, int(number * min_time / max(elapsed, 1e-9))))
+    per_call = [run(number) / number for _ in range(rounds)]
+    return {
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "min_us": round(min(per_call) * 1e6, 3),
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def check_legacy_signatures(instruction) -> None:
+    """
+    Check that uncorrelated RSA instructions are signed exactly as the original signature_tools did
+    ("message|sender|token|timestamp"), in both directions. Raises RuntimeError otherwise.
+    """
+    import hashlib
+
+    import rsa
+    from security.signature_tools import SIGNATURE_ALGORITHM, load_private_key, load_public_key, sign_message, verify_signature
+
+    if SIGNATURE_ALGORITHM != "rsa":
+        return
+    timestamp = int(time.time())
+    legacy_hash = hashlib.sha256(f"{instruction.message}|{instruction.sender}|{instruction.token}|{timestamp}".encode()).digest()
+    legacy_signed = instruction.model_copy(update={"timestamp": timestamp, "signature": rsa.sign(legacy_hash, load_private_key(), "SHA-256").hex()})
+    if not verify_signature(legacy_signed):
+        raise RuntimeError("A signature in the original format no longer verifies.")
+
+    signed = sign_message(instruction.model_copy())
+    legacy_hash = hashlib.sha256(f"{signed.message}|{signed.sender}|{signed.token}|{signed.timestamp}".encode()).digest()
+    try:
+        rsa.verify(legacy_hash, bytes.fromhex(signed.signature), load_public_key())
+    except rsa.VerificationError:
+        raise RuntimeError("An uncorrelated signature no longer verifies with the original format.")
+
+
+def run_benchmarks(sizes: List[int], rounds: int, min_time: float, only: Optional[List[str]], seed: int) -> Dict[str, dict]:
+    from benchmarks.pipeline import seed_data_store
+    from data.data_item import DataItem
+    from data.db_manager import fetch_data_by_clearance, read_data, write_data
+    from py_models.messages import InstructionMessage
+    from security.encryption_tools import decrypt_data, encrypt_data, generate_key
+    from security.signature_tools import sign_message, verify_signature
+
+    results: Dict[str, dict] = {}
+
+    def selected(name: str) -> bool:
+        return not only or any(name_matches(name, pattern) for pattern in only)
+
+    def bench(name: str, func: Callable[[], object], max_number: int = 1_000_000, bench_rounds: int = rounds) -> None:
+        if not selected(name):
+            return
+        results[name] = measure(func, bench_rounds, min_time, max_number)
+        print(f"{name:<36} {results[name]['median_us']:>14.1f} us", file=sys.stderr)
+
+    # Security primitives
+    bench("generate_key", lambda: generate_key(3, "core_agent"), bench_rounds=min(rounds, 3))
+    token = encrypt_data(PAYLOAD, 3, "core_agent")
+    bench("encrypt_data", lambda: encrypt_data(PAYLOAD, 3, "core_agent"))
+    bench("decrypt_data", lambda: decrypt_data(token, "core_agent"))
+    instruction = InstructionMessage(message=PAYLOAD, timestamp=int(time.time()), sender="core_agent/default", token="benchmark-token", signature="")
+    signed = sign_message(instruction.model_copy())
+    check_legacy_signatures(instruction)
+    bench("sign_message", lambda: sign_message(instruction.model_copy()))
+    bench("verify_signature", lambda: verify_signature(signed))
+
+    # Storage primitives, on one store grown to each size in turn
+    rng = random.Random(seed)
+    ids: List[str] = []
+    for size in sorted(sizes):
+        label = size_label(size)
+        if not any(selected(f"{name}[{label}]") for name in ("write_data", "read_data", "fetch_data_by_clearance")):
+            continue
+        if size > len(ids):
+            # A reader's key only opens records at its own clearance level, so every record here is
+            # either plaintext or readable by core_agent and no read fails
+            ids += seed_data_store(size - len(ids), seed, start=len(ids), levels=(0, 3))
+        # Writes grow the store; cap them at about 1% of it per round
+        bench(
+            f"write_data[{label}]",
+            lambda: write_data(DataItem(content=PAYLOAD, clearance_level=3, owner="core_agent")),
+            max_number=max(1, size // 100),
+        )
+        sample = itertools.cycle(rng.sample(ids, min(len(ids), 1000)))
+        bench(f"read_data[{label}]", lambda: read_data(next(sample), "core_agent", 3))
+        bench(f"fetch_data_by_clearance[{label}]", lambda: fetch_data_by_clearance(3, agent_name="core_agent"), bench_rounds=min(rounds, 3))
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], default_threshold: float, overrides: Dict[str, float]) -> List[dict]:
+    """Compare median times with the baseline; entries missing from either side are skipped."""
+    comparisons = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get("median_us"):
+            continue
+        change = (result["median_us"] - reference["median_us"]) / reference["median_us"] * 100
+        threshold = threshold_for(name, default_threshold, overrides)
+        comparisons.append({
+            "name": name,
+            "median_us": result["median_us"],
+            "baseline_us": reference["median_us"],
+            "change_pct": round(change, 2),
+            "threshold_pct": threshold,
+            "regressed": change > threshold,
+        })
+    return comparisons
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark security and storage primitives against a baseline.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Store sizes for the storage primitives.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per timing round.")
+    parser.add_argument("--only", help="Comma-separated name patterns to run, e.g. 'sign*,verify*'.")
+    parser.add_argument("--baseline", default=MICROBENCH_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record the results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=MICROBENCH_THRESHOLD, help="Allowed slowdown in percent.")
+    parser.add_argument("--thresholds", default="", help="Per-primitive overrides, e.g. 'fetch_data_by_clearance*=50,generate_key=10'.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    only = [pattern.strip() for pattern in args.only.split(",")] if args.only else None
+
+    with tempfile.TemporaryDirectory(prefix="agentsec-micro-") as workdir:
+        isolate_environment(workdir, seed=args.seed, AUDIT_LEDGER="off")
+        results = run_benchmarks(sizes, args.rounds, args.min_time, only, args.seed)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressed = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = {key: baseline.get(key) for key in ("created", "python", "platform")}
+        report["comparison"] = compare(results, baseline.get("results", {}), args.threshold, parse_thresholds(args.thresholds))
+        regressed = [entry for entry in report["comparison"] if entry["regressed"]]
+        for entry in regressed:
+            print(
+                f"REGRESSION {entry['name']}: {entry['median_us']:.1f} us vs {entry['baseline_us']:.1f} us "
+                f"(+{entry['change_pct']:.1f}% > {entry['threshold_pct']:.0f}%)",
+                file=sys.stderr,
+            )
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
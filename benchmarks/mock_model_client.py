@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import math
+import random
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import CreateResult, LLMMessage, RequestUsage
+
+from py_models.messages import VerificationResponse
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution in seconds, parsed from a spec string:
+
+        "0.05" or "constant:0.05"   fixed latency
+        "uniform:0.02,0.08"         uniform between two bounds
+        "normal:0.05,0.01"          mean and standard deviation, clamped at zero
+        "lognormal:0.05,0.5"        median and sigma of the underlying normal (long right tail)
+    """
+
+    KINDS = ("constant", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str = "0", seed: int = 0):
+        kind, _, params = spec.partition(":") if ":" in spec else ("constant", "", spec)
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",")] if params else [0.0]
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.kind == "constant":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self._random.uniform(self.params[0], self.params[1])
+        if self.kind == "normal":
+            return max(0.0, self._random.gauss(self.params[0], self.params[1]))
+        median, sigma = self.params
+        return self._random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+def _content(message: Any) -> str:
+    # LLMMessage objects for `create`, OpenAI-style dicts for `parse`
+    if isinstance(message, dict):
+        return str(message.get("content", ""))
+    return str(getattr(message, "content", message))
+
+
+def _digest(messages: Sequence[Any]) -> str:
+    return hashlib.sha256("\x00".join(_content(message) for message in messages).encode()).hexdigest()
+
+
+def _estimate_tokens(messages: Sequence[Any]) -> int:
+    return sum(len(_content(message)) for message in messages) // 4
+
+
+class _MockCompletions:
+    """Stand-in for the OpenAI client's `beta.chat.completions`."""
+
+    def __init__(self, owner: "MockChatCompletionClient"):
+        self._owner = owner
+
+    async def parse(self, *, model: str, messages: Sequence[Any], response_format: Any = None, **kwargs: Any):
+        owner = self._owner
+        owner.calls["parse"] += 1
+        await owner._wait(owner.parse_latency)
+        digest = _digest(messages)
+        # The same prompt always gets the same verdict
+        verified = int(digest[:8], 16) / 0xFFFFFFFF >= owner.reject_rate
+        parsed = VerificationResponse(verified=verified, message="Instruction complies with policy." if verified else "[REDACTED]")
+        message = SimpleNamespace(parsed=parsed, content=parsed.model_dump_json(), refusal=None)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, finish_reason="stop", message=message)])
+
+
+class MockChatCompletionClient:
+    """
+    Deterministic, offline ChatCompletionClient for benchmarks.
+
+    `create` waits for a sample of `latency` and returns a canned completion derived from a hash of
+    the prompt, so identical prompts get identical answers and no prompt content (which may include
+    decrypted context) is echoed downstream. The completion always names a slot number, which the
+    auditor's policy rules treat as ambiguous, so every instruction reaches `parse`.
+    `beta.chat.completions.parse` waits for `parse_latency` and returns a VerificationResponse,
+    rejecting about `reject_rate` of distinct prompts.
+    """
+
+    def __init__(
+        self,
+        latency: Union[str, LatencyModel] = "0",
+        parse_latency: Union[str, LatencyModel, None] = None,
+        reject_rate: float = 0.0,
+        seed: int = 0,
+        model: str = "mock-model",
+    ):
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency, seed)
+        if parse_latency is None:
+            parse_latency = self.latency.spec
+        self.parse_latency = parse_latency if isinstance(parse_latency, LatencyModel) else LatencyModel(parse_latency, seed + 1)
+        self.reject_rate = reject_rate
+        self.model = model
+        self.calls = {"create": 0, "parse": 0}
+        self._usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=_MockCompletions(self)))
+
+    @staticmethod
+    async def _wait(latency: LatencyModel) -> None:
+        delay = latency.sample()
+        # Always yield, as a real network call would
+        await asyncio.sleep(delay)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Any] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        self.calls["create"] += 1
+        await self._wait(self.latency)
+        digest = _digest(messages)
+        # Always carries a number, so the auditor's policy rules leave the instruction to `parse`
+        content = f"Acknowledged task {digest[:12]}: schedule confirmed for slot {int(digest[12:16], 16) % 40 + 1}."
+        usage = RequestUsage(prompt_tokens=_estimate_tokens(messages), completion_tokens=len(content) // 4)
+        self._usage = RequestUsage(
+            prompt_tokens=self._usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._usage.completion_tokens + usage.completion_tokens,
+        )
+        return CreateResult(finish_reason="stop", content=content, usage=usage, cached=False)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Any] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        result = await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
+        yield result.content
+        yield result
+
+    def actual_usage(self) -> RequestUsage:
+        return self._usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Any] = []) -> int:
+        return _estimate_tokens(messages)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Any] = []) -> int:
+        return 128000 - self.count_tokens(messages)
+
+    @property
+    def capabilities(self):
+        return {"vision": False, "function_calling": False, "json_output": True}
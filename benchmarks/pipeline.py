@@ -0,0 +1,231 @@
+"""
+End-to-end benchmark of the Edge -> Auditor -> Core -> Auditor -> Edge chain.
+
+Boots the real agents on a SingleThreadedAgentRuntime with a MockChatCompletionClient, against a
+synthetic data store in a temporary directory (fresh signing keys, salt and audit ledger), drives
+requests through the MessageDispatcher and prints a JSON report:
+
+    python -m benchmarks.pipeline --requests 200 --concurrency 8 --records 1000 --latency lognormal:0.05,0.5
+
+Hop latencies come from a runtime intervention handler that timestamps every send: a hop named
+"A->B:Message" is the time from A sending the message to B until the chain's next send (or, for
+the last instruction hop, until the result reaches the ResponseHub). "end_to_end" runs from
+dispatch to delivery. Nothing here talks to OpenAI.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks.environment import isolate_environment
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the agent pipeline with a mock model client.")
+    parser.add_argument("--requests", type=int, default=100, help="External messages to send.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chains in flight at once (MAX_CONCURRENT_MESSAGES).")
+    parser.add_argument("--records", type=int, default=1000, help="Size of the synthetic data store.")
+    parser.add_argument("--unique", type=int, default=None, help="Distinct message contents (default: every message is distinct).")
+    parser.add_argument("--latency", default="lognormal:0.05,0.4", help="Model latency for create(), see LatencyModel.")
+    parser.add_argument("--parse-latency", default=None, help="Model latency for beta.chat.completions.parse (default: --latency).")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Share of distinct instructions the mock auditor model rejects.")
+    parser.add_argument("--edge-pool-size", type=int, default=1)
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache on (off by default).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+FIRST_NAMES = ["Ada", "Ben", "Cara", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jun"]
+LAST_NAMES = ["Moss", "Reyes", "Okafor", "Lind", "Sato", "Berg", "Costa", "Novak", "Shah", "Quinn"]
+TOPICS = ["availability", "helpdesk hours", "parking", "visiting hours", "lab results pickup", "pharmacy refills"]
+
+
+def seed_data_store(records: int, seed: int, start: int = 0, levels: Sequence[int] = (0, 1, 2, 3)) -> List[str]:
+    """Write synthetic items `start` to `start + records`, cycling through `levels`; returns their ids."""
+    from data.data_item import DataItem
+    from data.db_manager import write_data
+
+    rng = random.Random(seed + start)
+    owners = {0: None, 1: "edge_agent", 2: "auditor_agent", 3: "core_agent"}
+    ids = []
+    for i in range(start, start + records):
+        level = levels[i % len(levels)]
+        if level == 3:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            content = f"Patient's name is {name}, record {i}. Their doctor is Dr {rng.choice(LAST_NAMES)}."
+        else:
+            content = f"Note {i} about {rng.choice(TOPICS)}: slot {rng.randint(1, 40)} is open on day {rng.randint(1, 28)}."
+        item = DataItem(content=content, clearance_level=level, owner=owners[level])
+        write_data(item)
+        ids.append(item.id)
+    return ids
+
+
+def request_contents(count: int, unique: Optional[int], seed: int) -> List[str]:
+    rng = random.Random(seed)
+    distinct = count if unique is None else max(1, unique)
+    pool = [f"Please check {rng.choice(TOPICS)} for appointment slot {i} and confirm the schedule." for i in range(distinct)]
+    return [pool[i % distinct] for i in range(count)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count, mean and nearest-rank percentiles of latencies given in seconds, reported in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": round(percentile(50), 3),
+        "p95": round(percentile(95), 3),
+        "p99": round(percentile(99), 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def run_pipeline(args: argparse.Namespace) -> dict:
+    from autogen_core.application import SingleThreadedAgentRuntime
+    from autogen_core.base.intervention import DefaultInterventionHandler
+
+    import main as app
+    from agents.core_agent import CoreAgent
+    from benchmarks.mock_model_client import MockChatCompletionClient
+    from security.audit_ledger import get_audit_ledger
+    from utils.bridge import AsyncBridge
+    from utils.dispatcher import MessageDispatcher
+    from utils.llm_cache import wrap_model_client
+    from utils.response_hub import ResponseHub
+
+    # Sends answered with None (e.g. events) would warn on every message
+    warnings.filterwarnings("ignore", message="Intervention handler on_response returned None")
+
+    traces: Dict[str, List[tuple]] = defaultdict(list)
+    sends = 0
+
+    class HopTracer(DefaultInterventionHandler):
+        async def on_send(self, message, *, sender, recipient):
+            nonlocal sends
+            sends += 1
+            correlation_id = getattr(message, "correlation_id", None)
+            if correlation_id:
+                label = f"{sender.type if sender else 'external'}->{recipient.type}:{type(message).__name__}"
+                traces[correlation_id].append((time.perf_counter(), label))
+            return message
+
+    class TimedResponseHub(ResponseHub):
+        def put(self, response, correlation_id=None):
+            if correlation_id:
+                traces[correlation_id].append((time.perf_counter(), "response"))
+            super().put(response, correlation_id=correlation_id)
+
+    class BenchmarkCoreAgent(CoreAgent):
+        def _prompt_for_clearance(self, message):
+            # Results are not classified or written back; the real agent asks on stdin
+            return None
+
+    mock_client = MockChatCompletionClient(args.latency, args.parse_latency, reject_rate=args.reject_rate, seed=args.seed)
+    model_client = wrap_model_client(mock_client)
+    runtime = SingleThreadedAgentRuntime(intervention_handlers=[HopTracer()])
+    edge_pool = app.create_edge_pool()
+    hub = TimedResponseHub()
+
+    await BenchmarkCoreAgent.register(
+        runtime,
+        "core_agent",
+        lambda: BenchmarkCoreAgent(agent_id=app.core_agent_id, model_client=model_client.for_agent("core_agent"), signing_token="benchmark-token"),
+    )
+    await app.register_auditor_agent(runtime, model_client, edge_pool)
+    await app.register_edge_agent(runtime, model_client, hub)
+    runtime.start()
+
+    source = AsyncBridge(maxsize=args.requests)
+    dispatcher = MessageDispatcher(runtime=runtime, recipient=edge_pool, source=source, outgoing_queue=hub, max_concurrency=args.concurrency)
+    dispatch_task = asyncio.create_task(dispatcher.run())
+
+    started = time.perf_counter()
+    correlation_ids = [dispatcher.submit(content, client_id="benchmark") for content in request_contents(args.requests, args.unique, args.seed)]
+    while source.qsize() or dispatcher.in_flight():
+        await asyncio.sleep(0.005)
+    duration = time.perf_counter() - started
+
+    dispatch_task.cancel()
+    await runtime.stop_when_idle()
+    ledger = get_audit_ledger()
+    if ledger is not None:
+        # Drain the ledger before the temporary directory goes away
+        ledger.close()
+
+    end_to_end: List[float] = []
+    hops: Dict[str, List[float]] = defaultdict(list)
+    for correlation_id in correlation_ids:
+        events = traces.get(correlation_id, [])
+        delivered = [t for t, label in events if label == "response"]
+        if delivered:
+            end_to_end.append(delivered[0] - events[0][0])
+        for (t, label), (next_t, _) in zip(events, events[1:]):
+            if label != "response":
+                hops[label].append(next_t - t)
+
+    completed = len(end_to_end)
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "requests": args.requests,
+        "completed": completed,
+        "not_delivered": args.requests - completed,
+        "duration_s": round(duration, 4),
+        "throughput": {
+            "requests_per_sec": round(completed / duration, 3) if duration else None,
+            "agent_messages_per_sec": round(sends / duration, 3) if duration else None,
+        },
+        "latency_ms": {
+            "end_to_end": summarize(end_to_end),
+            "hops": {label: summarize(samples) for label, samples in hops.items()},
+        },
+        "model_calls": dict(mock_client.calls),
+        "llm_cache": model_client.cache.stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="agentsec-bench-") as workdir:
+        isolate_environment(
+            workdir,
+            seed=args.seed,
+            LLM_CACHE="on" if args.llm_cache else "off",
+            MAX_CONCURRENT_MESSAGES=str(args.concurrency),
+            EDGE_POOL_SIZE=str(args.edge_pool_size),
+        )
+        from utils.log import configure_logging, shutdown_logging
+
+        configure_logging()
+        seed_data_store(args.records, args.seed)
+        report = asyncio.run(run_pipeline(args))
+        shutdown_logging()
+
+    if report["completed"] and not report["model_calls"].get("parse"):
+        # Every instruction was decided by the policy rules; the auditor model and --reject-rate were never exercised
+        report["warnings"] = ["No instruction reached the auditor model (parse == 0); --reject-rate had no effect."]
+        print(f"warning: {report['warnings'][0]}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 1 if report.get("warnings") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
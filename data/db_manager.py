@@ -1,33 +1,62 @@
-import json
 from pathlib import Path
 from .data_item import DataItem
-from security.encryption_tools import encrypt_data, decrypt_data
+from .log_store import LogStore
+from .store_index import StoreIndex
+from security.encryption_tools import encrypt_data, decrypt_data, decrypt_many
 import os
-from typing import Optional, Union
+from typing import Callable, List, Optional, Union
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "data/data_store"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+# Legacy single-file store, kept as the source for data.migrate_store
 DATA_FILE = DATA_DIR / "data_store.json"
+SEGMENT_DIR = DATA_DIR / "segments"
+
+store = LogStore(
+    SEGMENT_DIR,
+    segment_max_bytes=int(os.getenv("DATA_SEGMENT_MAX_BYTES", 4 * 1024 * 1024)),
+    compaction_threshold=int(os.getenv("DATA_COMPACTION_THRESHOLD", 4)),
+)
+# Process-wide id / clearance-level index; every read and write goes through it
+index = StoreIndex(store)
+
+# Callbacks notified after this process writes: callback(op, data_id, data)
+# where op is "put", "update" or "delete" and data is the stored (encrypted) item, or None on delete.
+_write_listeners: List[Callable[[str, str, Optional[dict]], None]] = []
+
+
+def add_write_listener(callback: Callable[[str, str, Optional[dict]], None]) -> None:
+    """Register a callback that is notified of every write made through this module."""
+    _write_listeners.append(callback)
+
+
+def remove_write_listener(callback: Callable[[str, str, Optional[dict]], None]) -> None:
+    """Unregister a write callback."""
+    if callback in _write_listeners:
+        _write_listeners.remove(callback)
+
+
+def _notify_write(op: str, data_id: str, data: Optional[dict]) -> None:
+    for callback in list(_write_listeners):
+        try:
+            callback(op, data_id, data)
+        except Exception as e:
+            logger.error("Write listener failed for item ID %s: %s", data_id, e)
 
 
 def write_data(data_item: DataItem) -> None:
-    """Write a DataItem to the single JSON data file."""
+    """Append a DataItem to the log-structured data store."""
     if data_item.clearance_level > 0:
         # Encrypt the content if the clearance level is above 0
         data_item.content = encrypt_data(data_item.content, data_item.clearance_level, data_item.owner)
 
-    # Load existing data
-    data_list = []
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r") as f:
-            data_list = json.load(f)
-
-    # Append the new data item
-    data_list.append(data_item.model_dump())
-
-    # Write back all data to the file
-    with open(DATA_FILE, "w") as f:
-        json.dump(data_list, f, indent=4)
+    # Append the new data item to the active segment
+    data = data_item.model_dump()
+    index.put(data)
+    _notify_write("put", data_item.id, dict(data))
 
 def fetch_data_by_clearance(
     agent_clearance: int,
@@ -46,116 +75,94 @@ def fetch_data_by_clearance(
     Returns:
         Union[list, dict]: List of data items (filtered by clearance level) or a single item.
     """
-    if not DATA_FILE.exists():
+    if not store.exists():
         raise FileNotFoundError("Data store file not found.")
 
-    # Load all data from the file
-    with open(DATA_FILE, "r") as f:
-        data_list = json.load(f)
-
-    # Tiered clearance logic
-    filtered_data = [
-        data for data in data_list if data["clearance_level"] <= agent_clearance
-    ]
-
     if data_id:
         # Fetch specific data by ID
-        for data in filtered_data:
-            if data["id"] == data_id:
-                data_item = DataItem(**data)
-                # Decrypt content if necessary
-                if agent_name and data_item.clearance_level > 0:
-                    data_item.content = decrypt_data(data_item.content, agent_name)
-                return data_item.model_dump()
+        record = index.get(data_id)
+        if record is not None and record.clearance_level <= agent_clearance:
+            data_item = DataItem(**record.to_dict())
+            # Decrypt content if necessary
+            if agent_name and data_item.clearance_level > 0:
+                data_item.content = decrypt_data(data_item.content, agent_name)
+            return data_item.model_dump()
         raise FileNotFoundError(f"Data with id {data_id} not found.")
 
+    # Tiered clearance logic
+    filtered_data = [record.to_dict() for record in index.at_or_below(agent_clearance)]
+
     # Decrypt all contents for clearance level > 0 if agent_name is provided
     if agent_name:
-        for data in filtered_data:
-            if data["clearance_level"] > 0:
-                try:
-                    data_item = DataItem(**data)
-                    data_item.content = decrypt_data(data_item.content, agent_name)
-                    data.update(data_item.model_dump())
-                except Exception as e:
-                    # Log decryption failure
-                    print(f"[ERROR] Decryption failed for item ID {data['id']}: {e}")
+        encrypted = [data for data in filtered_data if data["clearance_level"] > 0]
+        plaintexts = decrypt_many([data["content"] for data in encrypted], agent_name)
+        for data, plaintext in zip(encrypted, plaintexts):
+            if plaintext is None:
+                # Log decryption failure
+                logger.error("Decryption failed for item ID %s", data['id'])
+            data["content"] = plaintext
 
     return filtered_data
 
 def read_all_data():
     """Fetch all data from the database."""
-    print(f"[DEBUG] Reading from path: {DATA_FILE.resolve()}")
-    if not DATA_FILE.exists():
-        print(f"[DEBUG] Data file does not exist at path: {DATA_FILE.resolve()}")
+    logger.debug("Reading from path: %s", SEGMENT_DIR)
+    if not store.exists():
+        logger.debug("Data store does not exist at path: %s", SEGMENT_DIR)
         return []
 
-    with open(DATA_FILE, "r") as f:
-        return json.load(f)
+    return [record.to_dict() for record in index.all()]
 
 def read_data(data_id: str, agent_name: str, agent_clearance: int) -> str:
     """Read a DataItem from the file system with decryption and clearance check."""
-    if not DATA_FILE.exists():
+    if not store.exists():
         raise FileNotFoundError("Data store file not found.")
 
-    # Load all data from the single JSON file
-    with open(DATA_FILE, "r") as f:
-        data_list = json.load(f)
-
     # Find the specific data item by ID
-    for data in data_list:
-        if data["id"] == data_id:
-            data_item = DataItem(**data)
-            # Check clearance level
-            if agent_clearance < data_item.clearance_level:
-                raise PermissionError("Access denied: insufficient clearance level.")
-            # Decrypt content if necessary
-            if data_item.clearance_level > 0:
-                data_item.content = decrypt_data(data_item.content, agent_name)
-            return data_item.content
+    record = index.get(data_id)
+    if record is not None:
+        data_item = DataItem(**record.to_dict())
+        # Check clearance level
+        if agent_clearance < data_item.clearance_level:
+            raise PermissionError("Access denied: insufficient clearance level.")
+        # Decrypt content if necessary
+        if data_item.clearance_level > 0:
+            data_item.content = decrypt_data(data_item.content, agent_name)
+        return data_item.content
 
     raise FileNotFoundError(f"Data with id {data_id} not found.")
 
 
 def update_data(data_id: str, updated_fields: dict) -> None:
-    """Update fields of a DataItem and write back to the data store."""
-    if not DATA_FILE.exists():
+    """Update fields of a DataItem by appending an update record to the data store."""
+    if not store.exists():
         raise FileNotFoundError("Data store file not found.")
 
-    # Load all data from the single JSON file
-    with open(DATA_FILE, "r") as f:
-        data_list = json.load(f)
-
-    # Update the specific data item
-    for i, data in enumerate(data_list):
-        if data["id"] == data_id:
-            data_item = DataItem(**data)
-            for key, value in updated_fields.items():
-                setattr(data_item, key, value)
-            # Replace the updated item back into the list
-            data_list[i] = data_item.model_dump()
-            break
-    else:
+    record = index.get(data_id)
+    if record is None:
         raise FileNotFoundError(f"Data with id {data_id} not found.")
 
-    # Write all data back to the file
-    with open(DATA_FILE, "w") as f:
-        json.dump(data_list, f, indent=4)
+    # Validate the patched item before it is appended to the log
+    data_item = DataItem(**record.to_dict())
+    for key, value in updated_fields.items():
+        setattr(data_item, key, value)
+    patched = data_item.model_dump()
+    index.update(data_id, {key: patched[key] for key in updated_fields})
+    _notify_write("update", data_id, index.get(data_id).to_dict())
+
+
+def delete_data(data_id: str) -> None:
+    """Remove a DataItem from the data store by appending a tombstone record."""
+    if data_id not in index:
+        raise FileNotFoundError(f"Data with id {data_id} not found.")
+    index.delete(data_id)
+    _notify_write("delete", data_id, None)
 
 
 def filter_data_by_clearance_level(agent_clearance: int):
     """Filter and return data accessible by the given clearance level."""
-    if not DATA_FILE.exists():
+    if not store.exists():
         return []
 
-    # Load all data from the file
-    with open(DATA_FILE, "r") as f:
-        data_list = json.load(f)
-
-    # Filter data based on clearance level
-    accessible_data = []
-    for data in data_list:
-        if data["clearance_level"] <= agent_clearance:
-            accessible_data.append(data)
-
-    return accessible_data
\ No newline at end of file
+    # Only the clearance levels the caller can see are scanned
+    return [record.to_dict() for record in index.at_or_below(agent_clearance)]
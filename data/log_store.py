@@ -0,0 +1,256 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from utils.log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so only one process may use a store directory
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Each record is framed as: 4-byte big-endian payload length, 4-byte CRC32 of the payload, JSON payload.
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".seg"
+
+# Advisory lock files in the segment directory
+SEGMENT_LOCK = ".segments.lock"
+COMPACTION_LOCK = ".compaction.lock"
+
+# Record types
+OP_PUT = "put"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+
+class LogStore:
+    """
+    An append-only, log-structured store for data items.
+
+    Records are appended to numbered segment files instead of rewriting the whole store:
+        * put: a full data item (dict) keyed by its "id"
+        * update: a patch of fields applied to an existing item
+        * delete: a tombstone removing an item
+
+    Once the active segment grows past `segment_max_bytes` it is closed and a new one is opened.
+    When `compaction_threshold` closed segments have accumulated, a background thread merges them
+    into a single segment holding only the latest state of each item.
+
+    Replaying the segments in order yields the current state, keyed by id in first-insertion order.
+
+    Several processes may share a segment directory. Appends and replays hold a shared lock on
+    ".segments.lock", which compaction takes exclusively only to swap in the merged segment, and
+    ".compaction.lock" lets one process at a time compact.
+    """
+
+    def __init__(self, directory: Path, segment_max_bytes: int = 4 * 1024 * 1024, compaction_threshold: int = 4):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.compaction_threshold = compaction_threshold
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Segment bookkeeping
+    # ------------------------------------------------------------------
+    def segment_paths(self) -> List[Path]:
+        """Return all segment files ordered from oldest to newest."""
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"), key=lambda p: int(p.stem))
+
+    def signature(self) -> tuple:
+        """Return (name, size, mtime) for every segment; it changes whenever any segment is written or replaced."""
+        signature = []
+        for path in self.segment_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Removed by a concurrent compaction
+                continue
+            signature.append((path.name, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+
+    def exists(self) -> bool:
+        """Return True if at least one segment has been written."""
+        return bool(self.segment_paths())
+
+    @contextmanager
+    def _file_lock(self, name: str, exclusive: bool):
+        """Hold an advisory lock on a file in the segment directory, shared with other processes."""
+        with open(self.directory / name, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            # Closing the file releases the lock
+            yield
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{number:06d}{SEGMENT_SUFFIX}"
+
+    def _active_segment(self) -> Path:
+        """Return the segment new records are appended to, rolling over to a new one when full."""
+        segments = self.segment_paths()
+        if not segments:
+            return self._segment_path(1)
+        active = segments[-1]
+        if active.stat().st_size >= self.segment_max_bytes:
+            return self._segment_path(int(active.stem) + 1)
+        return active
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _encode(record: dict) -> bytes:
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @staticmethod
+    def _iter_segment(path: Path) -> Iterator[dict]:
+        """Yield the records of a single segment, stopping at a torn or corrupted tail."""
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if not header:
+                    return
+                if len(header) < RECORD_HEADER.size:
+                    logger.warning("Truncated record header at the end of segment %s.", path.name)
+                    return
+                length, checksum = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    logger.warning("Corrupted or truncated record in segment %s; ignoring the rest of it.", path.name)
+                    return
+                yield json.loads(payload)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def append(self, record: dict) -> None:
+        """Append a single record to the active segment."""
+        encoded = self._encode(record)
+        with self._lock, self._file_lock(SEGMENT_LOCK, exclusive=False):
+            with open(self._active_segment(), "ab") as f:
+                f.write(encoded)
+        self.maybe_compact()
+
+    def append_many(self, records: List[dict]) -> None:
+        """Append several records with a single open/write of the active segment."""
+        if not records:
+            return
+        encoded = b"".join(self._encode(record) for record in records)
+        with self._lock, self._file_lock(SEGMENT_LOCK, exclusive=False):
+            with open(self._active_segment(), "ab") as f:
+                f.write(encoded)
+        self.maybe_compact()
+
+    def put(self, item: dict) -> None:
+        """Append a full data item."""
+        self.append({"op": OP_PUT, "item": item})
+
+    def update(self, item_id: str, fields: dict) -> None:
+        """Append a patch of fields for an existing data item."""
+        self.append({"op": OP_UPDATE, "id": item_id, "fields": fields})
+
+    def delete(self, item_id: str) -> None:
+        """Append a tombstone for a data item."""
+        self.append({"op": OP_DELETE, "id": item_id})
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _apply(state: Dict[str, dict], record: dict) -> None:
+        op = record.get("op")
+        if op == OP_PUT:
+            item = record["item"]
+            state[item["id"]] = item
+        elif op == OP_UPDATE:
+            current = state.get(record["id"])
+            if current is not None:
+                current.update(record["fields"])
+        elif op == OP_DELETE:
+            state.pop(record["id"], None)
+        else:
+            logger.warning("Skipping record with unknown op: %s", op)
+
+    def _replay_paths(self, paths: List[Path]) -> Dict[str, dict]:
+        state: Dict[str, dict] = {}
+        for path in paths:
+            for record in self._iter_segment(path):
+                self._apply(state, record)
+        return state
+
+    def replay(self) -> Dict[str, dict]:
+        """Replay every segment and return the current items keyed by id."""
+        with self._lock, self._file_lock(SEGMENT_LOCK, exclusive=False):
+            return self._replay_paths(self.segment_paths())
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def maybe_compact(self) -> None:
+        """Start a background compaction if enough closed segments have accumulated."""
+        closed = self.segment_paths()[:-1]
+        if len(closed) < self.compaction_threshold:
+            return
+        with self._lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(target=self.compact, name="log-store-compaction", daemon=True)
+            self._compaction_thread.start()
+
+    def compact(self) -> None:
+        """
+        Merge all closed segments into one segment holding the latest state of each item.
+
+        The merged segment replaces the newest closed segment, so it still sorts before the active
+        segment. Tombstones are carried over for deleted ids in case an older segment survives a crash.
+        """
+        with self._file_lock(COMPACTION_LOCK, exclusive=True):
+            self._compact()
+
+    def _compact(self) -> None:
+        # Listed under the compaction lock, so another process cannot have merged these segments away
+        with self._lock:
+            closed = self.segment_paths()[:-1]
+        if len(closed) < 2:
+            return
+        sizes = [path.stat().st_size for path in closed]
+
+        state: Dict[str, dict] = {}
+        deleted = set()
+        for path in closed:
+            for record in self._iter_segment(path):
+                if record.get("op") == OP_DELETE:
+                    deleted.add(record["id"])
+                elif record.get("op") == OP_PUT:
+                    deleted.discard(record["item"]["id"])
+                self._apply(state, record)
+
+        target = closed[-1]
+        tmp_path = target.with_suffix(".compact")
+        with open(tmp_path, "wb") as f:
+            for item in state.values():
+                f.write(self._encode({"op": OP_PUT, "item": item}))
+            for item_id in deleted:
+                f.write(self._encode({"op": OP_DELETE, "id": item_id}))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock, self._file_lock(SEGMENT_LOCK, exclusive=True):
+            if [path.stat().st_size for path in closed] != sizes:
+                # A process that had not yet seen the newer segment appended to one of these; retry later
+                tmp_path.unlink(missing_ok=True)
+                logger.info("Segments changed during compaction; skipped.")
+                return
+            os.replace(tmp_path, target)
+            for path in closed[:-1]:
+                path.unlink(missing_ok=True)
+        logger.info("Compacted %s segments into %s (%s items).", len(closed), target.name, len(state))
@@ -0,0 +1,40 @@
+import json
+import sys
+from .db_manager import DATA_FILE, SEGMENT_DIR, store, index
+from .log_store import OP_PUT
+# One-shot migration from the legacy data_store.json to the log-structured store
+# To run as a module: python -m data.migrate_store [--force]
+
+
+def migrate_store(force: bool = False) -> int:
+    """
+    Copy every item of the legacy JSON data store into the log-structured store.
+
+    Items are appended as-is (content is already encrypted), in file order. Once migrated,
+    the JSON file is renamed to data_store.json.migrated so the migration is not repeated.
+
+    Args:
+        force (bool): Migrate even if the log-structured store already has segments.
+
+    Returns:
+        int: The number of records migrated.
+    """
+    if not DATA_FILE.exists():
+        print(f"No legacy data store found at {DATA_FILE.resolve()}. Nothing to migrate.")
+        return 0
+
+    if store.exists() and not force:
+        print(f"Segments already exist in {SEGMENT_DIR.resolve()}. Use --force to migrate anyway.")
+        return 0
+
+    with open(DATA_FILE, "r") as f:
+        data_list = json.load(f)
+
+    store.append_many([{"op": OP_PUT, "item": data} for data in data_list])
+    index.invalidate()
+    DATA_FILE.rename(DATA_FILE.with_name(DATA_FILE.name + ".migrated"))
+    print(f"Migrated {len(data_list)} records from {DATA_FILE.name} into {SEGMENT_DIR.resolve()}.")
+    return len(data_list)
+
+if __name__ == "__main__":
+    migrate_store(force="--force" in sys.argv[1:])
@@ -0,0 +1,155 @@
+import threading
+from typing import Dict, List, Optional
+
+from .log_store import LogStore, OP_PUT, OP_UPDATE, OP_DELETE
+
+
+class IndexedRecord:
+    """Compact in-memory copy of a stored data item."""
+
+    __slots__ = ("seq", "id", "content", "clearance_level", "timestamp", "owner")
+
+    def __init__(self, seq: int, data: dict):
+        self.seq = seq
+        self.id = data["id"]
+        self.content = data.get("content")
+        self.clearance_level = data.get("clearance_level", 0)
+        self.timestamp = data.get("timestamp")
+        self.owner = data.get("owner")
+
+    def update(self, fields: dict) -> None:
+        for key, value in fields.items():
+            if key in self.__slots__ and key != "seq":
+                setattr(self, key, value)
+
+    def to_dict(self) -> dict:
+        """Return a fresh dict in the DataItem shape, safe for callers to mutate."""
+        return {
+            "id": self.id,
+            "content": self.content,
+            "clearance_level": self.clearance_level,
+            "timestamp": self.timestamp,
+            "owner": self.owner,
+        }
+
+
+class StoreIndex:
+    """
+    Process-wide index over a LogStore: id -> record and clearance level -> ids.
+
+    The index is rebuilt by replaying the store only when the segment files' names, sizes or
+    mtimes change (i.e. another process wrote or a compaction ran). Writes made through this
+    index are applied in place, so they never trigger a rebuild.
+    """
+
+    def __init__(self, store: LogStore):
+        self.store = store
+        self._lock = threading.RLock()
+        self._signature: Optional[tuple] = None
+        self._records: Dict[str, IndexedRecord] = {}
+        self._by_level: Dict[int, Dict[str, None]] = {}
+        self._seq = 0
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def _rebuild(self, signature: tuple) -> None:
+        self._records = {}
+        self._by_level = {}
+        self._seq = 0
+        for data in self.store.replay().values():
+            self._insert(data)
+        self._signature = signature
+
+    def _refresh(self) -> None:
+        signature = self.store.signature()
+        if signature != self._signature:
+            self._rebuild(signature)
+
+    def _insert(self, data: dict) -> None:
+        existing = self._records.get(data["id"])
+        if existing is not None:
+            # Same id written again: replace in place, keeping its original position
+            self._by_level.get(existing.clearance_level, {}).pop(existing.id, None)
+            record = IndexedRecord(existing.seq, data)
+        else:
+            self._seq += 1
+            record = IndexedRecord(self._seq, data)
+        self._records[record.id] = record
+        self._by_level.setdefault(record.clearance_level, {})[record.id] = None
+
+    def _apply(self, record: dict) -> None:
+        op = record["op"]
+        if op == OP_PUT:
+            self._insert(record["item"])
+        elif op == OP_UPDATE:
+            current = self._records.get(record["id"])
+            if current is not None:
+                self._by_level.get(current.clearance_level, {}).pop(current.id, None)
+                current.update(record["fields"])
+                self._by_level.setdefault(current.clearance_level, {})[current.id] = None
+        elif op == OP_DELETE:
+            current = self._records.pop(record["id"], None)
+            if current is not None:
+                self._by_level.get(current.clearance_level, {}).pop(current.id, None)
+
+    def _write(self, record: dict) -> None:
+        with self._lock:
+            # Pick up any foreign writes first so our signature stays truthful after appending
+            self._refresh()
+            self.store.append(record)
+            self._apply(record)
+            self._signature = self.store.signature()
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next lookup."""
+        with self._lock:
+            self._signature = None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def put(self, item: dict) -> None:
+        self._write({"op": OP_PUT, "item": item})
+
+    def update(self, item_id: str, fields: dict) -> None:
+        self._write({"op": OP_UPDATE, "id": item_id, "fields": fields})
+
+    def delete(self, item_id: str) -> None:
+        self._write({"op": OP_DELETE, "id": item_id})
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get(self, data_id: str) -> Optional[IndexedRecord]:
+        """Return the record for an id, or None. O(1)."""
+        with self._lock:
+            self._refresh()
+            return self._records.get(data_id)
+
+    def __contains__(self, data_id: str) -> bool:
+        return self.get(data_id) is not None
+
+    def at_or_below(self, clearance_level: int) -> List[IndexedRecord]:
+        """Return records with clearance_level <= the given level, in insertion order."""
+        with self._lock:
+            self._refresh()
+            records = [
+                self._records[data_id]
+                for level, ids in self._by_level.items()
+                if level <= clearance_level
+                for data_id in ids
+            ]
+        records.sort(key=lambda record: record.seq)
+        return records
+
+    def all(self) -> List[IndexedRecord]:
+        """Return every record in insertion order."""
+        with self._lock:
+            self._refresh()
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._records)
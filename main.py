@@ -1,103 +1,230 @@
+import argparse
 import asyncio
+import os
 import threading
-import queue
 from autogen_core.application import SingleThreadedAgentRuntime
-from autogen_core.base import AgentId
+from autogen_core.base import AgentId, AgentInstantiationContext
 from agents.core_agent import CoreAgent
 from agents.auditor_agent import AuditorAgent
 from agents.edge_agents.edge_agent_one import EdgeAgent
+from agents.edge_agents.edge_pool import EdgeAgentPool
 from security.authenticate_user import authenticate_user, generate_token
-from py_models.messages import ExternalMessage  # Use ExternalMessage
+from security.audit_ledger import get_audit_ledger
+from security.policies.policy_rules import PolicyRuleEngine
+from utils.bridge import AsyncBridge
+from utils.dispatcher import MessageDispatcher, MAX_PENDING_MESSAGES
+from utils.response_hub import ResponseHub
+from utils.llm_cache import wrap_model_client
+from utils.log import configure_logging
 from autogen_ext.models import OpenAIChatCompletionClient
 
-# Queues for external environment communication
-incoming_external_messages = queue.Queue()
-outgoing_agent_messages = queue.Queue()
+# "async" serves the aiohttp front-end on the runtime's loop; "flask" runs the legacy Flask thread
+WEB_SERVER = os.getenv("WEB_SERVER", "async")
 
-async def main():
-    # Authenticate the user
+# Process roles: "local" runs everything in one SingleThreadedAgentRuntime; the others are the
+# processes of the distributed mode, connected through a gRPC host runtime
+RUNTIME_MODES = ("local", "host", "core", "auditor", "edge", "gateway")
+
+core_agent_id = AgentId("core_agent", "default")
+auditor_agent_id = AgentId("auditor_agent", "default")
+
+
+def create_edge_pool() -> EdgeAgentPool:
+    # EDGE_POOL_SIZE edge agents share the "edge_agent_one" type, keyed worker-0, worker-1, ...
+    return EdgeAgentPool.of_size("edge_agent_one")
+
+
+def create_model_client():
+    # Repeated requests are answered from the response cache (per-agent TTLs via LLM_CACHE_TTLS)
+    return wrap_model_client(OpenAIChatCompletionClient(model="gpt-4o-mini"))
+
+
+def get_user_token():
+    """Authenticate the user and return their signing token, or None if authentication fails."""
     clearance_level = authenticate_user()
     if clearance_level is None:
         print("Exiting due to failed authentication.")
-        return
-    user_id = "n"
-    user_token = generate_token(clearance_level)
-
-    # Initialize runtime and agent IDs
-    runtime = SingleThreadedAgentRuntime()
-    core_agent_id = AgentId("core_agent", "default")
-    auditor_agent_id = AgentId("auditor_agent", "default")
-    edge_agent_id = AgentId("edge_agent_one", "default")
+        return None
+    return generate_token(clearance_level)
 
-    # Initialize model client
-    openai_client = OpenAIChatCompletionClient(model="gpt-4o-mini")
 
-    # Register agents
+async def register_core_agent(runtime, model_client, user_token):
     await CoreAgent.register(
         runtime,
         "core_agent",
         lambda: CoreAgent(
             agent_id=core_agent_id,
-            model_client=openai_client,
+            model_client=model_client.for_agent("core_agent"),
             signing_token=user_token
         ),
     )
 
+
+async def register_auditor_agent(runtime, model_client, edge_pool):
+    # Compile the auditor's policy pre-filter (patient names come from the clearance 3 data)
+    policy_rules = PolicyRuleEngine.from_data_store()
+
     await AuditorAgent.register(
         runtime,
         "auditor_agent",
         lambda: AuditorAgent(
-            model_client=openai_client,
+            model_client=model_client.for_agent("auditor_agent"),
             agent_id=auditor_agent_id,
             core_agent_id=core_agent_id,
-            edge_agent_id=edge_agent_id
+            edge_agent_id=edge_pool.agent_ids[0],
+            edge_pool=edge_pool,
+            policy_rules=policy_rules
         ),
     )
 
+
+async def register_edge_agent(runtime, model_client, outgoing_queue):
     await EdgeAgent.register(
         runtime,
         "edge_agent_one",
         lambda: EdgeAgent(
-            model_client=openai_client,
-            agent_id=edge_agent_id,
+            model_client=model_client.for_agent("edge_agent"),
+            # The runtime instantiates one EdgeAgent per pool key on first use
+            agent_id=AgentInstantiationContext.current_agent_id(),
             auditor_agent_id=auditor_agent_id,
-            outgoing_queue=outgoing_agent_messages
+            outgoing_queue=outgoing_queue
         ),
     )
 
+
+async def serve_front_end(runtime, edge_pool, outgoing_agent_messages):
+    """Start the webserver and dispatch external messages to the edge pool forever."""
+    # Messages from the Flask thread are handed to this loop with call_soon_threadsafe
+    incoming_external_messages = AsyncBridge(maxsize=MAX_PENDING_MESSAGES)
+    dispatcher = MessageDispatcher(
+        runtime=runtime,
+        recipient=edge_pool,
+        source=incoming_external_messages,
+        outgoing_queue=outgoing_agent_messages
+    )
+
+    if WEB_SERVER == "flask":
+        # Start Flask webserver in a separate thread
+        from webserver import start_flask_app
+        flask_thread = threading.Thread(
+            target=start_flask_app,
+            args=(dispatcher, outgoing_agent_messages),
+            daemon=True
+        )
+        flask_thread.start()
+    else:
+        # Serve the async front-end on this event loop
+        from async_webserver import start_async_webserver
+        await start_async_webserver(dispatcher, outgoing_agent_messages)
+
+    # Main loop: run up to MAX_CONCURRENT_MESSAGES message chains at once
+    await dispatcher.run()
+
+
+async def main():
+    user_token = get_user_token()
+    if user_token is None:
+        return
+
+    # Initialize runtime
+    runtime = SingleThreadedAgentRuntime()
+    edge_pool = create_edge_pool()
+
+    # Initialize model client
+    openai_client = create_model_client()
+
+    # Responses to the external environment: pushed to SSE/WebSocket subscribers and kept for polling
+    outgoing_agent_messages = ResponseHub()
+
+    # Register agents
+    await register_core_agent(runtime, openai_client, user_token)
+    await register_auditor_agent(runtime, openai_client, edge_pool)
+    await register_edge_agent(runtime, openai_client, outgoing_agent_messages)
+
+    runtime.start()
+    await serve_front_end(runtime, edge_pool, outgoing_agent_messages)
+
+
+async def run_distributed(mode: str, host_address: str):
+    """
+    Run one process of the distributed mode.
+
+    "host" serves the gRPC host runtime; "core", "auditor" and "edge" each host one agent type in a
+    WorkerAgentRuntime; "gateway" runs the webserver and dispatcher and receives edge results.
+    """
+    from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+    from utils.distributed import (
+        RESPONSE_GATEWAY_TYPE,
+        RemoteResponseSink,
+        ResponseGatewayAgent,
+        register_message_serializers,
+    )
+
+    if mode == "host":
+        host = WorkerAgentRuntimeHost(address=host_address)
+        host.start()
+        print(f"gRPC host runtime listening on {host_address}")
+        await host.stop_when_signal()
+        return
+
+    if mode != "gateway":
+        # Fail fast, before joining the host, if another process already writes this ledger (see AUDIT_LEDGER_PATH)
+        get_audit_ledger()
+
+    runtime = WorkerAgentRuntime(host_address=host_address)
     runtime.start()
+    register_message_serializers(runtime)
+    edge_pool = create_edge_pool()
+
+    if mode == "gateway":
+        outgoing_agent_messages = ResponseHub()
+        await ResponseGatewayAgent.register(
+            runtime,
+            RESPONSE_GATEWAY_TYPE,
+            lambda: ResponseGatewayAgent(outgoing_agent_messages),
+        )
+        await serve_front_end(runtime, edge_pool, outgoing_agent_messages)
+        return
 
-    # Start Flask webserver in a separate thread
-    from webserver import start_flask_app
-    flask_thread = threading.Thread(
-        target=start_flask_app,
-        args=(incoming_external_messages, outgoing_agent_messages),
-        daemon=True
+    openai_client = create_model_client()
+    if mode == "core":
+        user_token = get_user_token()
+        if user_token is None:
+            await runtime.stop()
+            return
+        await register_core_agent(runtime, openai_client, user_token)
+    elif mode == "auditor":
+        await register_auditor_agent(runtime, openai_client, edge_pool)
+    elif mode == "edge":
+        # Results go back to the gateway process's ResponseHub over the host runtime
+        await register_edge_agent(runtime, openai_client, RemoteResponseSink(runtime))
+
+    print(f"{mode} worker connected to {host_address}")
+    await runtime.stop_when_signal()
+
+
+def parse_args():
+    from utils.distributed import GRPC_HOST_ADDRESS
+
+    parser = argparse.ArgumentParser(description="Run AgentSec.")
+    parser.add_argument(
+        "--runtime",
+        choices=RUNTIME_MODES,
+        default=os.getenv("AGENT_RUNTIME", "local"),
+        help="local: all agents in one process (default). host/core/auditor/edge/gateway: one process of the gRPC distributed mode.",
+    )
+    parser.add_argument(
+        "--host-address",
+        default=GRPC_HOST_ADDRESS,
+        help="Address of the gRPC host runtime (distributed mode only).",
     )
-    flask_thread.start()
-
-# Main loop
-    while True:
-        # Handle external environment input
-        try:
-            external_msg_content = incoming_external_messages.get_nowait()
-        except queue.Empty:
-            external_msg_content = None
-
-        if external_msg_content:
-            # Create an ExternalMessage and send it to the EdgeAgent
-            external_message = ExternalMessage(
-                content=external_msg_content,
-                sender="unknown_source",
-            )
-            response_message = await runtime.send_message(
-                message=external_message,
-                recipient=edge_agent_id
-            )
-            # Place the response into the outgoing queue for the Flask server
-            outgoing_agent_messages.put(response_message)
-
-        await asyncio.sleep(0.1)
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    configure_logging()
+    args = parse_args()
+    if args.runtime == "local":
+        asyncio.run(main())
+    else:
+        asyncio.run(run_distributed(args.runtime, args.host_address))
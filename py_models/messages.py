@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 import uuid
 from typing import Literal
 
@@ -11,17 +11,22 @@ class AuthUserMessage(BaseModel):
 class InstructionMessage(BaseModel):
     message: str
     timestamp: int
-    id: str = str(uuid.uuid4()) 
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Unique id of this message")
     sender: str
     token: str
     signature: str = Field(..., description="Digital signature for message authentication")
+    correlation_id: Optional[str] = Field(None, description="Id of the external request this instruction serves")
+    session_id: Optional[str] = Field(None, description="Id of the client session, used to keep a session on one edge agent")
+    merkle_root: Optional[str] = Field(None, description="Hex Merkle root that `signature` signs when the instruction was batch-signed")
+    merkle_proof: Optional[List[str]] = Field(None, description="Inclusion proof of a batch-signed instruction: 'L:<hex>' / 'R:<hex>' sibling hashes")
     
 class DataMessage(BaseModel):
     message: str
     timestamp: int
     sender: str
-    id: str = str(uuid.uuid4()) 
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Unique id of this message")
     clearance_level: Optional[int] = Field(None, description="Optional to support unclassified data")
+    correlation_id: Optional[str] = Field(None, description="Id of the external request this data answers")
 
 class VerificationResponse(BaseModel):
     verified: bool
@@ -32,4 +37,6 @@ class ExternalMessage(BaseModel):
     Represents a message from an external, unsecured source.
     """
     content: str = Field(..., description="The content of the external message")
-    sender: str = Field(..., description="The identifier of the sender")
\ No newline at end of file
+    sender: str = Field(..., description="The identifier of the sender")
+    correlation_id: Optional[str] = Field(None, description="Id assigned at /send_message, used to route the response")
+    session_id: Optional[str] = Field(None, description="Id of the client session that sent the message")
\ No newline at end of file
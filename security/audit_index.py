@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from security.audit_ledger import iter_ledger, split_line
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for the sidecar index over the audit ledger
+AUDIT_INDEX_ENABLED = os.getenv("AUDIT_INDEX", "on").lower() not in ("0", "off", "false", "no")
+# Width in seconds of the time buckets records are filed under
+AUDIT_INDEX_BUCKET_SECONDS = int(os.getenv("AUDIT_INDEX_BUCKET_SECONDS", 60))
+
+# Record fields whose values are indexed as message ids
+MESSAGE_ID_FIELDS = ("message_id", "correlation_id")
+
+
+def index_path_for(ledger_path: str) -> str:
+    return str(ledger_path) + ".idx.sqlite"
+
+
+class AuditIndex:
+    """
+    Sidecar SQLite index over an audit ledger: agent -> offsets, time bucket -> offsets and
+    message id -> offsets.
+
+    Registered as a ledger listener, it indexes each batch right after the batch is fsynced, so it
+    never points at a record that is not durable. `sync` catches up with records written while no
+    index was attached (another process, an older version, a deleted sidecar) by scanning only the
+    bytes past the last indexed offset. The hashes of the first and the last indexed record are kept
+    in `meta`; if the ledger shrank below the indexed offset, or either record no longer carries its
+    hash, the ledger was replaced and the index is rebuilt from scratch.
+    """
+
+    def __init__(self, ledger_path: str, path: Optional[str] = None, bucket_seconds: int = AUDIT_INDEX_BUCKET_SECONDS):
+        self.ledger_path = Path(ledger_path)
+        self.path = path or index_path_for(ledger_path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);"
+            "CREATE TABLE IF NOT EXISTS records ("
+            "seq INTEGER PRIMARY KEY, offset INTEGER NOT NULL, ts REAL NOT NULL, bucket INTEGER NOT NULL, agent TEXT);"
+            "CREATE INDEX IF NOT EXISTS records_agent ON records (agent, ts);"
+            "CREATE INDEX IF NOT EXISTS records_bucket ON records (bucket);"
+            "CREATE TABLE IF NOT EXISTS message_refs (message_id TEXT NOT NULL, seq INTEGER NOT NULL, PRIMARY KEY (message_id, seq));"
+        )
+        stored_bucket = self._meta("bucket_seconds")
+        if stored_bucket is not None and int(stored_bucket) != bucket_seconds:
+            # Buckets are baked into the rows; honour the width the index was built with
+            bucket_seconds = int(stored_bucket)
+        self.bucket_seconds = bucket_seconds
+        self._set_meta("bucket_seconds", bucket_seconds)
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+    def _meta(self, key: str):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def end(self) -> int:
+        """Byte offset just past the last indexed record."""
+        return int(self._meta("end") or 0)
+
+    def bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def _insert(self, entries: List[Tuple[int, dict]], end: int) -> None:
+        rows, refs = [], []
+        for offset, record in entries:
+            seq = record["seq"]
+            rows.append((seq, offset, record["ts"], self.bucket(record["ts"]), record.get("agent")))
+            fields = record.get("fields") or {}
+            for name in MESSAGE_ID_FIELDS:
+                if fields.get(name):
+                    refs.append((str(fields[name]), seq))
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany("INSERT OR IGNORE INTO records (seq, offset, ts, bucket, agent) VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT OR IGNORE INTO message_refs (message_id, seq) VALUES (?, ?)", refs)
+            if entries and entries[0][0] == 0:
+                self._set_meta("first_hash", entries[0][1]["hash"])
+            if end > self.end:
+                self._set_meta("end", end)
+                self._set_meta("last_offset", entries[-1][0])
+                self._set_meta("last_hash", entries[-1][1]["hash"])
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _scan(self, start: int, stop: Optional[int] = None, chunk: int = 10000) -> None:
+        """Index the ledger lines between byte offsets `start` and `stop` (end of file when None)."""
+        entries: List[Tuple[int, dict]] = []
+        end = start
+        for offset, line in iter_ledger(str(self.ledger_path), start):
+            if (stop is not None and offset >= stop) or not line.endswith(b"\n"):
+                break
+            entries.append((offset, json.loads(line)))
+            end = offset + len(line)
+            if len(entries) >= chunk:
+                self._insert(entries, end)
+                entries = []
+        if entries:
+            self._insert(entries, end)
+
+    def _reset(self) -> None:
+        self._db.executescript(
+            "DELETE FROM records; DELETE FROM message_refs;"
+            "DELETE FROM meta WHERE key IN ('end', 'first_hash', 'last_offset', 'last_hash');"
+        )
+
+    def _hash_at(self, offset: int) -> Optional[str]:
+        """Return the hash claimed by the ledger line at `offset`, or None if there is no valid line."""
+        for _, line in iter_ledger(str(self.ledger_path), offset):
+            try:
+                return split_line(line)[1]
+            except ValueError:
+                return None
+        return None
+
+    def _matches_ledger(self, size: int) -> bool:
+        """True if the indexed records are still the ones at the start of the ledger."""
+        end = self.end
+        if end == 0:
+            return True
+        first_hash, last_offset = self._meta("first_hash"), self._meta("last_offset")
+        if size < end or first_hash is None or last_offset is None:
+            return False
+        return self._hash_at(0) == first_hash and self._hash_at(int(last_offset)) == self._meta("last_hash")
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def sync(self) -> None:
+        """Index whatever the ledger holds past the last indexed offset."""
+        with self._lock:
+            if not self.ledger_path.exists():
+                return
+            size = self.ledger_path.stat().st_size
+            if not self._matches_ledger(size):
+                logger.warning("Audit ledger %s no longer matches its index; rebuilding the index.", self.ledger_path)
+                self._reset()
+            end = self.end
+            if size > end:
+                self._scan(end)
+
+    def on_commit(self, committed: List[Tuple[int, dict]], end: int) -> None:
+        """Ledger listener: index a freshly committed batch, first filling any gap before it."""
+        if not committed:
+            return
+        with self._lock:
+            first_offset = committed[0][0]
+            if first_offset > self.end:
+                self._scan(self.end, stop=first_offset)
+            self._insert(committed, end)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def offsets(
+        self,
+        agent: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        message_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Return the ledger offsets of matching records in ledger order.
+
+        Time ranges are narrowed to whole buckets through the bucket index, then filtered exactly.
+        """
+        clauses, params = [], []
+        if agent is not None:
+            # An agent type ("edge_agent_one") also matches its instances ("edge_agent_one/default")
+            clauses.append("(records.agent = ? OR (records.agent >= ? AND records.agent < ?))")
+            params += [agent, agent + "/", agent + "0"]
+        if since is not None:
+            clauses.append("records.bucket >= ? AND records.ts >= ?")
+            params += [self.bucket(since), since]
+        if until is not None:
+            clauses.append("records.bucket <= ? AND records.ts < ?")
+            params += [self.bucket(until), until]
+        source = "records"
+        if message_id is not None:
+            source = "message_refs JOIN records ON records.seq = message_refs.seq"
+            clauses.append("message_refs.message_id = ?")
+            params.append(message_id)
+        sql = f"SELECT records.offset FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY records.seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql, params)]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
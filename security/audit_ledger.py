@@ -0,0 +1,419 @@
+import argparse
+import atexit
+import base64
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per ledger is not enforced
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Defaults for the append-only audit ledger written by log_action
+AUDIT_LEDGER_ENABLED = os.getenv("AUDIT_LEDGER", "on").lower() not in ("0", "off", "false", "no")
+AUDIT_LEDGER_PATH = os.getenv("AUDIT_LEDGER_PATH", str(Path(os.getenv("DATA_DIR", "data/data_store")) / "audit" / "ledger.jsonl"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 100000))
+# Most records written (and fsynced) as one group commit
+AUDIT_BATCH_MAX = int(os.getenv("AUDIT_BATCH_MAX", 1024))
+# Seconds the writer keeps collecting records after the first one of a batch (0: take what is queued)
+AUDIT_COMMIT_WINDOW = float(os.getenv("AUDIT_COMMIT_WINDOW", 0))
+# A signed checkpoint is appended after this many records or seconds, whichever comes first
+AUDIT_CHECKPOINT_INTERVAL = int(os.getenv("AUDIT_CHECKPOINT_INTERVAL", 1000))
+AUDIT_CHECKPOINT_SECONDS = float(os.getenv("AUDIT_CHECKPOINT_SECONDS", 60))
+
+GENESIS_HASH = "0" * 64
+CHECKPOINT_PREFIX = b"agentsec-audit-checkpoint:"
+# Every line ends with ',"hash":"<64 hex>"}\n'; the hash covers the line with that suffix replaced by "}"
+HASH_SUFFIX_LEN = len(',"hash":""}\n') + 64
+
+RECORD_ACTION = "action"
+RECORD_CHECKPOINT = "checkpoint"
+
+
+def checkpoint_payload(seq: int, head: str) -> bytes:
+    """The bytes a checkpoint signs: a digest of its sequence number and the chain head it covers."""
+    return hashlib.sha256(CHECKPOINT_PREFIX + f"{seq}:{head}".encode()).digest()
+
+
+def encode_record(body: Dict[str, Any]) -> Tuple[bytes, str]:
+    """
+    Serialize a record body (which must carry "prev") into a ledger line.
+
+    Returns:
+        Tuple[bytes, str]: The line, including its trailing newline, and the record's hash.
+    """
+    encoded = json.dumps(body, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    record_hash = hashlib.sha256(encoded).hexdigest()
+    return encoded[:-1] + f',"hash":"{record_hash}"}}\n'.encode(), record_hash
+
+
+def split_line(line: bytes) -> Tuple[bytes, str]:
+    """Return the hashed body of a ledger line and the hash it claims."""
+    if len(line) <= HASH_SUFFIX_LEN or not line.endswith(b'"}\n'):
+        raise ValueError("Malformed ledger line.")
+    claimed = line[-(64 + 3):-3].decode("ascii")
+    return line[:-HASH_SUFFIX_LEN] + b"}", claimed
+
+
+def _last_record(path: Path) -> Tuple[Optional[dict], int]:
+    """
+    Return the last complete record of a ledger and the size of its complete prefix.
+
+    Reads backwards from the end, so opening a large ledger costs one block read. A torn final line
+    (a crash mid-write) is not part of the prefix.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        block = 64 * 1024
+        tail = b""
+        position = end
+        while position > 0:
+            step = min(block, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.split(b"\n")
+            # Everything after the last newline is a torn write; the line before it is the last record
+            complete = lines[:-1]
+            if len(complete) >= 2 or (complete and position == 0):
+                size = end - len(lines[-1])
+                return json.loads(complete[-1]), size
+        return None, end - len(tail)
+
+
+class AuditLedger:
+    """
+    Append-only, hash-chained ledger of agent actions.
+
+    Every line is a JSON record whose "prev" is the hash of the record before it and whose "hash"
+    is the SHA-256 of the line itself, so editing, dropping or reordering any record breaks the chain
+    from that point on. Every `checkpoint_interval` records (or `checkpoint_seconds`) a checkpoint
+    record signs the chain head with the instruction signing key, so a verifier holding only the
+    public key can tell a genuine ledger from one rewritten end to end.
+
+    `append` only enqueues: a background writer assigns sequence numbers, hashes a whole batch,
+    writes it with one call and fsyncs once per batch (group commit). `flush` waits until everything
+    appended so far is durable. Listeners are called on the writer thread with the (offset, record)
+    pairs of each committed batch and the ledger size after it.
+
+    A ledger has a single writer: the chain head lives in this process, so a second process
+    appending to the same file would fork the chain. The writer holds an exclusive lock on
+    "<path>.lock" and a second AuditLedger on the same path raises RuntimeError; give every process
+    its own AUDIT_LEDGER_PATH.
+    """
+
+    def __init__(
+        self,
+        path: str = AUDIT_LEDGER_PATH,
+        batch_max: int = AUDIT_BATCH_MAX,
+        commit_window: float = AUDIT_COMMIT_WINDOW,
+        checkpoint_interval: int = AUDIT_CHECKPOINT_INTERVAL,
+        checkpoint_seconds: float = AUDIT_CHECKPOINT_SECONDS,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        signer=None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_max = batch_max
+        self.commit_window = commit_window
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_seconds = checkpoint_seconds
+        self._signer = signer
+        self._warned_unsigned = False
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._listeners: List[Callable[[List[Tuple[int, dict]], int], None]] = []
+        self._condition = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        self._closed = False
+        self.stats = {"records": 0, "batches": 0, "checkpoints": 0, "fsyncs": 0}
+
+        self._lock_file = self._lock_writer()
+        self._seq, self._head, self._offset = self._recover()
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self._file = open(self.path, "ab")
+        self._writer = threading.Thread(target=self._run, name="audit-ledger-writer", daemon=True)
+        self._writer.start()
+
+    def _lock_writer(self):
+        """Take the ledger's single-writer lock, held until close."""
+        lock_file = open(self.path.with_name(self.path.name + ".lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise RuntimeError(
+                    f"Audit ledger {self.path} is already open in another process; set AUDIT_LEDGER_PATH per process."
+                )
+        return lock_file
+
+    def _recover(self) -> Tuple[int, str, int]:
+        """Find the chain head of an existing ledger, cutting off a torn final line."""
+        if not self.path.exists():
+            return 0, GENESIS_HASH, 0
+        last, size = _last_record(self.path)
+        if size < self.path.stat().st_size:
+            logger.warning("Truncating a torn record at the end of %s.", self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+        if last is None:
+            return 0, GENESIS_HASH, size
+        return last["seq"], last["hash"], size
+
+    @property
+    def signer(self):
+        if self._signer is None:
+            from security.signature_tools import get_signer
+            self._signer = get_signer()
+        return self._signer
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+    def add_listener(self, callback: Callable[[List[Tuple[int, dict]], int], None]) -> None:
+        """Register a callback receiving the (offset, record) pairs of every committed batch and the new ledger size."""
+        self._listeners.append(callback)
+
+    def append(self, agent: str, action: str, **fields: Any) -> None:
+        """Queue an action record; blocks only if the writer has fallen `queue_size` records behind."""
+        record = {"type": RECORD_ACTION, "ts": round(time.time(), 6), "agent": agent, "action": action}
+        if fields:
+            record["fields"] = fields
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The audit ledger is closed.")
+            self._enqueued += 1
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record appended before this call has been fsynced."""
+        with self._condition:
+            target = self._enqueued
+            return self._condition.wait_for(lambda: self._committed >= target, timeout=timeout)
+
+    def close(self) -> None:
+        """Drain the queue, write a final checkpoint and stop the writer."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        # Closing the file releases the writer lock
+        self._lock_file.close()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _next_batch(self) -> Tuple[List[dict], bool]:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.commit_window
+        while len(batch) < self.batch_max:
+            try:
+                remaining = deadline - time.monotonic()
+                record = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    def _chain(self, body: dict, lines: List[bytes], committed: List[Tuple[int, dict]]) -> None:
+        self._seq += 1
+        body["seq"] = self._seq
+        body["prev"] = self._head
+        line, self._head = encode_record(body)
+        body["hash"] = self._head
+        committed.append((self._offset, body))
+        self._offset += len(line)
+        lines.append(line)
+
+    def _checkpoint(self, lines: List[bytes], committed: List[Tuple[int, dict]]) -> None:
+        """Chain a checkpoint signing the current head."""
+        seq = self._seq + 1
+        body = {"type": RECORD_CHECKPOINT, "ts": round(time.time(), 6), "head": self._head, "algorithm": None, "signature": None}
+        try:
+            body["signature"] = base64.b64encode(self.signer.sign_bytes(checkpoint_payload(seq, self._head))).decode()
+            body["algorithm"] = self.signer.algorithm
+        except Exception as e:
+            if not self._warned_unsigned:
+                logger.warning("Writing unsigned audit checkpoints: %s", e)
+                self._warned_unsigned = True
+        self._chain(body, lines, committed)
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self.stats["checkpoints"] += 1
+
+    def _commit(self, batch: List[dict], final: bool) -> None:
+        lines: List[bytes] = []
+        committed: List[Tuple[int, dict]] = []
+        for record in batch:
+            self._chain(record, lines, committed)
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self.checkpoint_interval:
+                self._checkpoint(lines, committed)
+        if self._since_checkpoint and (final or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self._checkpoint(lines, committed)
+        if not lines:
+            return
+
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.stats["fsyncs"] += 1
+        self.stats["batches"] += 1
+        self.stats["records"] += len(batch)
+
+        for callback in list(self._listeners):
+            try:
+                callback(committed, self._offset)
+            except Exception as e:
+                logger.error("Audit ledger listener failed: %s", e)
+
+    def _run(self) -> None:
+        while True:
+            batch, final = self._next_batch()
+            head = (self._seq, self._head, self._offset)
+            try:
+                self._commit(batch, final)
+            except Exception as e:
+                logger.exception("Failed to commit %d audit records: %s", len(batch), e)
+                # Roll the chain back to the last durable record so the next batch still links to it
+                self._seq, self._head, self._offset = head
+                try:
+                    self._file.truncate(self._offset)
+                except OSError:
+                    pass
+            with self._condition:
+                self._committed += len(batch)
+                self._condition.notify_all()
+            if final:
+                return
+
+
+_ledger: Optional[AuditLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_audit_ledger() -> Optional[AuditLedger]:
+    """Return the process-wide audit ledger, or None when AUDIT_LEDGER is off."""
+    global _ledger
+    if not AUDIT_LEDGER_ENABLED:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = AuditLedger()
+            from security.audit_index import AUDIT_INDEX_ENABLED, AuditIndex
+            if AUDIT_INDEX_ENABLED:
+                _ledger.add_listener(AuditIndex(str(_ledger.path)).on_commit)
+            atexit.register(_ledger.close)
+        return _ledger
+
+
+# ----------------------------------------------------------------------
+# Verification
+# ----------------------------------------------------------------------
+def iter_ledger(path: str, start: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, line) for each line of a ledger from byte offset `start`, one line in memory at a time."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            yield offset, line
+            offset += len(line)
+
+
+def verify_chain(path: str = AUDIT_LEDGER_PATH, signer=None, verify_signatures: bool = True) -> dict:
+    """
+    Stream a ledger and check every hash link, sequence number and checkpoint signature.
+
+    Memory use is bounded by the longest line, so multi-GB ledgers verify without loading them.
+
+    Returns:
+        dict: "ok", counts of records and checkpoints, the last sequence number and head, the number
+        of records after the last signed checkpoint ("unanchored"), and on failure the "error" with
+        the "offset" and "seq" where the chain breaks.
+    """
+    if verify_signatures and signer is None:
+        from security.signature_tools import get_signer
+        signer = get_signer()
+
+    result = {"ok": True, "records": 0, "checkpoints": 0, "unsigned_checkpoints": 0, "last_seq": 0, "head": GENESIS_HASH, "unanchored": 0}
+
+    def fail(reason: str, offset: int) -> dict:
+        result.update(ok=False, error=reason, offset=offset, seq=result["last_seq"] + 1)
+        return result
+
+    for offset, line in iter_ledger(path):
+        if not line.endswith(b"\n"):
+            return fail("Torn record at the end of the ledger.", offset)
+        try:
+            body, claimed = split_line(line)
+            record = json.loads(line)
+        except ValueError as e:
+            return fail(f"Unreadable record: {e}", offset)
+        if hashlib.sha256(body).hexdigest() != claimed:
+            return fail("Record hash does not match its contents.", offset)
+        if record.get("prev") != result["head"]:
+            return fail("Record does not link to the previous record.", offset)
+        if record.get("seq") != result["last_seq"] + 1:
+            return fail("Sequence number out of order.", offset)
+
+        if record.get("type") == RECORD_CHECKPOINT:
+            result["checkpoints"] += 1
+            if record.get("head") != result["head"]:
+                return fail("Checkpoint head does not match the chain.", offset)
+            if record.get("signature") is None:
+                result["unsigned_checkpoints"] += 1
+            elif verify_signatures:
+                if record.get("algorithm") != signer.algorithm:
+                    return fail(f"Checkpoint signed with {record.get('algorithm')}, verifier uses {signer.algorithm}.", offset)
+                signature = base64.b64decode(record["signature"])
+                if not signer.verify_bytes(checkpoint_payload(record["seq"], record["head"]), signature):
+                    return fail("Invalid checkpoint signature.", offset)
+                result["unanchored"] = 0
+            if record.get("signature") is None or not verify_signatures:
+                result["unanchored"] += 1
+        else:
+            result["records"] += 1
+            result["unanchored"] += 1
+
+        result["last_seq"] = record["seq"]
+        result["head"] = claimed
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify the hash chain and checkpoint signatures of an audit ledger.")
+    parser.add_argument("path", nargs="?", default=AUDIT_LEDGER_PATH)
+    parser.add_argument("--no-signatures", action="store_true", help="Check hash links only, without the public key.")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        parser.error(f"No audit ledger at {args.path}")
+
+    result = verify_chain(args.path, verify_signatures=not args.no_signatures)
+    print(json.dumps(result, indent=2))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from security.audit_index import AuditIndex
+from security.audit_ledger import AUDIT_LEDGER_PATH, split_line
+
+RELATIVE_TIME = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """
+    Parse a CLI time into an epoch timestamp.
+
+    Accepts epoch seconds ("1718000000"), ISO 8601 ("2024-06-10T10:00"), a local time of day today
+    ("10:05", "10:05:30") or a duration ago ("15m", "2h", "1d").
+    """
+    now = time.time() if now is None else now
+    value = value.strip()
+    relative = RELATIVE_TIME.match(value)
+    if relative:
+        return now - float(relative.group(1)) * UNIT_SECONDS[relative.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if re.match(r"^\d{1,2}:\d{2}(:\d{2})?$", value):
+        clock = datetime.strptime(value, "%H:%M:%S" if value.count(":") == 2 else "%H:%M").time()
+        return datetime.combine(datetime.fromtimestamp(now).date(), clock).timestamp()
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Unrecognised time: {value}")
+
+
+def query(
+    agent: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    message_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    ledger_path: str = AUDIT_LEDGER_PATH,
+    check_hashes: bool = True,
+) -> List[dict]:
+    """
+    Return the audit records matching every given filter, in ledger order.
+
+    The sidecar index is brought up to date first, then each match is read by seeking to its offset,
+    so the cost grows with the number of matches rather than the size of the ledger. With
+    `check_hashes`, every returned record is checked against its own hash (chain links are left to
+    `security.audit_ledger.verify_chain`).
+    """
+    index = AuditIndex(ledger_path)
+    try:
+        index.sync()
+        offsets = index.offsets(agent=agent, since=since, until=until, message_id=message_id, limit=limit)
+    finally:
+        index.close()
+
+    records = []
+    with open(ledger_path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            line = f.readline()
+            if check_hashes:
+                body, claimed = split_line(line)
+                if hashlib.sha256(body).hexdigest() != claimed:
+                    raise ValueError(f"Audit record at offset {offset} does not match its hash; run python -m security.audit_ledger.")
+            records.append(json.loads(line))
+    return records
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the audit ledger through its sidecar index.")
+    parser.add_argument("--agent", help="Agent id, e.g. edge_agent_one/default")
+    parser.add_argument("--since", help="Start time: epoch, ISO 8601, HH:MM[:SS] today, or a duration ago (15m, 2h)")
+    parser.add_argument("--until", help="End time (exclusive), same formats as --since")
+    parser.add_argument("--message-id", help="Id or correlation id of a message")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--ledger", default=AUDIT_LEDGER_PATH)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.ledger):
+        parser.error(f"No audit ledger at {args.ledger}")
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    for record in query(args.agent, since, until, args.message_id, args.limit, args.ledger):
+        print(json.dumps(record, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
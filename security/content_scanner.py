@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Sequence, Set, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_RULES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'configs', 'content_rules.json'))
+# Minimum seconds between checks of the rule file's mtime
+CONTENT_RULES_RELOAD_INTERVAL = float(os.getenv('CONTENT_RULES_RELOAD_INTERVAL', 1.0))
+
+# Joins messages in a batch scan; no pattern may contain it, so matches never span two messages
+BATCH_SEPARATOR = "\x00"
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over lowercase literal patterns.
+
+    Scanning is a single pass over the text regardless of the number of patterns; every match
+    reports the index of the pattern's rule.
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]  # (rule index, pattern length)
+
+        for pattern, rule_index in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((rule_index, len(pattern)))
+
+        # Breadth-first construction of failure links, merging outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str):
+        """Yield (end position, rule index, pattern length) for every match in the text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for rule_index, length in output[state]:
+                yield position, rule_index, length
+
+
+class ContentScanner:
+    """
+    Multi-pattern scanner for prompt-injection phrases, exfiltration markers and encoded payloads.
+
+    Rules are loaded from configs/content_rules.json:
+        {"rules": [{"id": "...", "category": "...", "patterns": ["...", ...]}, ...]}
+    Patterns are matched case-insensitively as literals. The file is re-read automatically when
+    its mtime changes (checked at most every CONTENT_RULES_RELOAD_INTERVAL seconds).
+    """
+
+    def __init__(self, rules_path: str = CONTENT_RULES_PATH, reload_interval: float = CONTENT_RULES_RELOAD_INTERVAL):
+        self.rules_path = rules_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+        self.rule_ids: List[str] = []
+        self.categories: Dict[str, str] = {}
+        self._automaton = AhoCorasick([])
+        self.reload()
+
+    def reload(self) -> None:
+        """Re-read the rule file and rebuild the automaton; on failure the previous rules stay in use."""
+        mtime = None
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+            with open(self.rules_path, "r") as f:
+                config = json.load(f)
+            rule_ids, categories, patterns = self._parse_rules(config)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load content rules from %s; keeping the previous rules: %s", self.rules_path, e)
+            # Retry once the file changes again rather than on every check
+            self._mtime = mtime
+            return
+
+        automaton = AhoCorasick(patterns)
+        with self._lock:
+            self.rule_ids, self.categories, self._automaton = rule_ids, categories, automaton
+            self._mtime = mtime
+        logger.info("Loaded %s content rules (%s patterns).", len(rule_ids), len(patterns))
+
+    @staticmethod
+    def _parse_rules(config) -> Tuple[List[str], Dict[str, str], List[Tuple[str, int]]]:
+        """
+        Validate the rule file and return (rule ids, categories, (pattern, rule index) pairs).
+
+        A rule needs a string "id" and a non-empty list of non-empty string "patterns"; invalid
+        rules are logged and skipped. Raises ValueError if the file has no "rules" list.
+        """
+        if not isinstance(config, dict) or not isinstance(config.get("rules"), list):
+            raise ValueError('expected an object with a "rules" list')
+
+        rule_ids, categories, patterns = [], {}, []
+        for position, rule in enumerate(config["rules"]):
+            rule_id = rule.get("id") if isinstance(rule, dict) else None
+            rule_patterns = rule.get("patterns") if isinstance(rule, dict) else None
+            if (
+                not isinstance(rule_id, str) or not rule_id
+                or rule_id in categories
+                or not isinstance(rule_patterns, list) or not rule_patterns
+                or not all(isinstance(pattern, str) and pattern for pattern in rule_patterns)
+            ):
+                logger.warning("Skipping invalid content rule #%s (id %r): it needs a unique id and a list of patterns.", position, rule_id)
+                continue
+            rule_index = len(rule_ids)
+            rule_ids.append(rule_id)
+            categories[rule_id] = rule.get("category", "generic")
+            for pattern in rule_patterns:
+                pattern = pattern.lower()
+                if BATCH_SEPARATOR not in pattern:
+                    patterns.append((pattern, rule_index))
+        return rule_ids, categories, patterns
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def scan(self, text: str) -> List[str]:
+        """Return the sorted ids of the rules that match the text."""
+        return self.scan_batch([text])[0]
+
+    def scan_batch(self, texts: Sequence[str]) -> List[List[str]]:
+        """
+        Scan many messages in a single pass.
+
+        Args:
+            texts (Sequence[str]): The messages to scan.
+
+        Returns:
+            List[List[str]]: For each message, the sorted ids of the rules it matched.
+        """
+        self._maybe_reload()
+        with self._lock:
+            automaton, rule_ids = self._automaton, self.rule_ids
+
+        # Lowercase per message (lowercasing can change lengths) and record each start offset
+        texts = [text.lower() for text in texts]
+        starts, offset = [], 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + len(BATCH_SEPARATOR)
+
+        matched: List[Set[int]] = [set() for _ in texts]
+        joined = BATCH_SEPARATOR.join(texts)
+        for end, rule_index, _ in automaton.iter_matches(joined):
+            matched[bisect_right(starts, end) - 1].add(rule_index)
+        return [sorted(rule_ids[index] for index in indices) for indices in matched]
+
+
+_default_scanner = None
+_default_scanner_lock = threading.Lock()
+
+
+def get_content_scanner() -> ContentScanner:
+    """Return the process-wide scanner for configs/content_rules.json."""
+    global _default_scanner
+    with _default_scanner_lock:
+        if _default_scanner is None:
+            _default_scanner = ContentScanner()
+        return _default_scanner
@@ -0,0 +1,36 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Threads for signing, verification and decryption off the event loop; OpenSSL releases the GIL
+CRYPTO_WORKERS = int(os.getenv("CRYPTO_WORKERS", min(4, os.cpu_count() or 1)))
+
+_crypto_executor = None
+_crypto_executor_lock = threading.Lock()
+
+
+def get_crypto_executor() -> ThreadPoolExecutor:
+    """Return the process-wide bounded executor for CPU-bound crypto."""
+    global _crypto_executor
+    with _crypto_executor_lock:
+        if _crypto_executor is None:
+            _crypto_executor = ThreadPoolExecutor(max_workers=CRYPTO_WORKERS, thread_name_prefix="crypto")
+        return _crypto_executor
+
+
+async def run_crypto(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking crypto call on the crypto executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_crypto_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_crypto_executor() -> None:
+    """Stop the crypto executor, if one was started."""
+    global _crypto_executor
+    with _crypto_executor_lock:
+        if _crypto_executor is not None:
+            _crypto_executor.shutdown(wait=True)
+            _crypto_executor = None
@@ -4,20 +4,44 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
-from security.permissions import get_clearance_level
+from security.permissions import get_clearance_level, CLEARANCE_CONFIG_PATH
+from security.crypto_executor import run_crypto
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Union
 from dotenv import load_dotenv
+import threading
 import os
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 load_dotenv()
 salt_value = os.getenv('SALT_VALUE')
 
+# Bounded LRU of (key, ready-made Fernet object) keyed by (agent_name, clearance_level, salt)
+KEY_CACHE_SIZE = int(os.getenv('KEY_CACHE_SIZE', 256))
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+_key_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+_config_signature = None
+
+# Optional process pool for bulk decryption; disabled unless DECRYPT_PROCESSES > 0
+DECRYPT_PROCESSES = int(os.getenv('DECRYPT_PROCESSES', 0))
+DECRYPT_POOL_MIN_ITEMS = int(os.getenv('DECRYPT_POOL_MIN_ITEMS', 512))
+DECRYPT_CHUNK_SIZE = int(os.getenv('DECRYPT_CHUNK_SIZE', 128))
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
+def _salt_bytes() -> bytes:
+    if isinstance(salt_value, str):
+        return salt_value.encode('utf-8')  # Convert to bytes if not already
+    return salt_value  # Assume salt_value is already bytes
+
 def generate_key(clearance_level: int, agent_name: str) -> bytes:
     """Generate a secure key based on clearance level and agent name."""
-    if isinstance(salt_value, str):
-        salt = salt_value.encode('utf-8')  # Convert to bytes if not already
-    else:
-        salt = salt_value  # Assume salt_value is already bytes
-    
+    salt = _salt_bytes()
+
     password = f"{agent_name}_{clearance_level}".encode()
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
@@ -29,55 +53,204 @@ def generate_key(clearance_level: int, agent_name: str) -> bytes:
     key = base64.urlsafe_b64encode(kdf.derive(password))
     return key
 
+def _clearance_config_signature():
+    try:
+        stat = os.stat(CLEARANCE_CONFIG_PATH)
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+def invalidate_key_cache() -> None:
+    """Drop every cached Fernet object."""
+    global _config_signature
+    with _key_cache_lock:
+        _key_cache.clear()
+        _key_cache_stats["invalidations"] += 1
+        _config_signature = _clearance_config_signature()
+
+def set_salt_value(new_salt) -> None:
+    """Replace the salt used for key derivation (e.g. after rotating SALT_VALUE) and invalidate the key cache."""
+    global salt_value
+    salt_value = new_salt
+    invalidate_key_cache()
+
+def reload_salt_value() -> None:
+    """Re-read SALT_VALUE from the environment/.env and invalidate the key cache if it changed."""
+    load_dotenv(override=True)
+    new_salt = os.getenv('SALT_VALUE')
+    if new_salt != salt_value:
+        set_salt_value(new_salt)
+
+def key_cache_stats() -> dict:
+    """Return hit/miss/eviction/invalidation counters and the current size of the key cache."""
+    with _key_cache_lock:
+        return {**_key_cache_stats, "size": len(_key_cache), "maxsize": KEY_CACHE_SIZE}
+
+def _get_key_entry(clearance_level: int, agent_name: str) -> tuple:
+    """Return the cached (key, Fernet) pair for the agent, deriving it with PBKDF2 only on a cache miss."""
+    global _config_signature
+    salt = _salt_bytes()
+    cache_key = (agent_name, clearance_level, salt)
+    config_signature = _clearance_config_signature()
+    with _key_cache_lock:
+        if config_signature != _config_signature:
+            if _config_signature is not None:
+                _key_cache.clear()
+                _key_cache_stats["invalidations"] += 1
+            _config_signature = config_signature
+        entry = _key_cache.get(cache_key)
+        if entry is not None:
+            _key_cache.move_to_end(cache_key)
+            _key_cache_stats["hits"] += 1
+            return entry
+        _key_cache_stats["misses"] += 1
+
+    # Derive outside the lock so a slow PBKDF2 run does not block cache hits
+    key = generate_key(clearance_level, agent_name)
+    entry = (key, Fernet(key))
+    with _key_cache_lock:
+        _key_cache[cache_key] = entry
+        _key_cache.move_to_end(cache_key)
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+            _key_cache_stats["evictions"] += 1
+    return entry
+
+def get_fernet(clearance_level: int, agent_name: str) -> Fernet:
+    """
+    Return a Fernet object for the agent's key, deriving it with PBKDF2 only on a cache miss.
+
+    The cache is cleared automatically when configs/clearance_levels.json changes on disk.
+    """
+    return _get_key_entry(clearance_level, agent_name)[1]
+
 def encrypt_data(data: str, clearance_level: int, agent_name: str) -> str:
     """Encrypt data using the generated key and return a base64-encoded string."""
-    key = generate_key(clearance_level, agent_name)
-    fernet = Fernet(key)
+    fernet = get_fernet(clearance_level, agent_name)
     encrypted_data = fernet.encrypt(data.encode())
     # Convert bytes to a base64 string
     return base64.b64encode(encrypted_data).decode()
 
 def decrypt_data(encrypted_data: str, agent_name: str) -> str:
     """Decrypt a base64-encoded string using the agent's key."""
-    print("[DEBUG] Starting decryption process.")
-    
     # Retrieve the agent's clearance level
     try:
         agent_level = get_clearance_level(agent_name)
-        print(f"[DEBUG] Retrieved clearance level: {agent_level} for agent: {agent_name}")
     except Exception as e:
-        print(f"[ERROR] Failed to retrieve clearance level for agent {agent_name}: {e}")
+        logger.error("Failed to retrieve clearance level for agent %s: %s", agent_name, e)
         return None
     
-    # Generate the decryption key
+    # Fetch the (cached) Fernet object for the agent's key
     try:
-        key = generate_key(agent_level, agent_name)
-        print(f"[DEBUG] Generated decryption key: {key}")
+        fernet = get_fernet(agent_level, agent_name)
     except Exception as e:
-        print(f"[ERROR] Failed to generate decryption key for agent {agent_name}: {e}")
-        return None
-
-    # Initialize Fernet with the generated key
-    try:
-        fernet = Fernet(key)
-        print(f"[DEBUG] Fernet object successfully initialized.")
-    except Exception as e:
-        print(f"[ERROR] Failed to initialize Fernet: {e}")
+        logger.error("Failed to initialize Fernet for agent %s: %s", agent_name, e)
         return None
     
     # Attempt to decode the base64-encoded string
     try:
         encrypted_bytes = base64.b64decode(encrypted_data)
-        print(f"[DEBUG] Base64-decoded encrypted data: {encrypted_bytes}")
     except Exception as e:
-        print(f"[ERROR] Failed to decode base64 data: {e}")
+        logger.error("Failed to decode base64 data: %s", e)
         return None
 
     # Attempt to decrypt the data
     try:
         decrypted_data = fernet.decrypt(encrypted_bytes).decode()
-        print(f"[DEBUG] Successfully decrypted data: {decrypted_data}")
         return decrypted_data
     except Exception as e:
-        print(f"[ERROR] Error decrypting data: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error decrypting data: %s", e)
+        return None
+
+def _decrypt_with(fernet: Fernet, encrypted_data: str) -> Optional[str]:
+    """Decrypt one base64-encoded ciphertext, returning None on failure."""
+    try:
+        return fernet.decrypt(base64.b64decode(encrypted_data)).decode()
+    except Exception:
+        return None
+
+def _decrypt_chunk(key: bytes, chunk: List[str]) -> List[Optional[str]]:
+    """Process pool worker: decrypt a chunk of ciphertexts that share one key."""
+    fernet = Fernet(key)
+    return [_decrypt_with(fernet, encrypted_data) for encrypted_data in chunk]
+
+def _get_decrypt_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is None:
+            _decrypt_pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _decrypt_pool
+
+def shutdown_decrypt_pool() -> None:
+    """Shut down the bulk decryption process pool, if one was started."""
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is not None:
+            _decrypt_pool.shutdown(wait=True)
+            _decrypt_pool = None
+
+def decrypt_many(
+    encrypted_data: Sequence[str],
+    agent_name: Union[str, Sequence[str]],
+    processes: Optional[int] = None
+) -> List[Optional[str]]:
+    """
+    Decrypt many base64-encoded strings, grouping them by derived key.
+
+    Each group is decrypted with a single Fernet object. When the batch holds at least
+    DECRYPT_POOL_MIN_ITEMS ciphertexts and a process count is configured, the groups are
+    split into chunks and decrypted on a process pool.
+
+    Args:
+        encrypted_data (Sequence[str]): The ciphertexts to decrypt.
+        agent_name (Union[str, Sequence[str]]): The decrypting agent, or one agent name per ciphertext.
+        processes (Optional[int]): Process pool size; defaults to DECRYPT_PROCESSES (0 disables the pool).
+
+    Returns:
+        List[Optional[str]]: Plaintexts in input order, with None for every item that failed to decrypt.
+    """
+    agent_names = [agent_name] * len(encrypted_data) if isinstance(agent_name, str) else list(agent_name)
+    if len(agent_names) != len(encrypted_data):
+        raise ValueError("agent_name must be a single name or one name per ciphertext.")
+
+    results: List[Optional[str]] = [None] * len(encrypted_data)
+
+    # Group positions by agent so each key is resolved once
+    groups = {}
+    for position, name in enumerate(agent_names):
+        groups.setdefault(name, []).append(position)
+
+    keyed_groups = []
+    for name, positions in groups.items():
+        try:
+            agent_level = get_clearance_level(name)
+            keyed_groups.append((_get_key_entry(agent_level, name), positions))
+        except Exception as e:
+            logger.error("Failed to derive decryption key for agent %s: %s", name, e)
+
+    processes = DECRYPT_PROCESSES if processes is None else processes
+    if processes and len(encrypted_data) >= DECRYPT_POOL_MIN_ITEMS:
+        pool = _get_decrypt_pool(processes)
+        futures = []
+        for (key, _), positions in keyed_groups:
+            for start in range(0, len(positions), DECRYPT_CHUNK_SIZE):
+                chunk_positions = positions[start:start + DECRYPT_CHUNK_SIZE]
+                chunk = [encrypted_data[position] for position in chunk_positions]
+                futures.append((chunk_positions, pool.submit(_decrypt_chunk, key, chunk)))
+        for chunk_positions, future in futures:
+            for position, plaintext in zip(chunk_positions, future.result()):
+                results[position] = plaintext
+        return results
+
+    for (_, fernet), positions in keyed_groups:
+        for position in positions:
+            results[position] = _decrypt_with(fernet, encrypted_data[position])
+    return results
+
+async def decrypt_many_async(
+    encrypted_data: Sequence[str],
+    agent_name: Union[str, Sequence[str]],
+    processes: Optional[int] = None
+) -> List[Optional[str]]:
+    """Like decrypt_many, but runs on the crypto executor so the event loop keeps running."""
+    return await run_crypto(decrypt_many, encrypted_data, agent_name, processes)
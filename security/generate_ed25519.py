@@ -0,0 +1,25 @@
+# This is for demonstration purposes, in a real world application you'd want to do this more securely
+# Generate Ed25519 keys (used when SIGNATURE_ALGORITHM=ed25519) via python -m security.generate_ed25519
+import os
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from security.signature_tools import ED25519_PRIVATE_KEY_PATH, ED25519_PUBLIC_KEY_PATH
+
+# Generate Ed25519 key pair
+privkey = Ed25519PrivateKey.generate()
+os.makedirs(os.path.dirname(ED25519_PRIVATE_KEY_PATH), exist_ok=True)
+
+# Save the public key to a file
+with open(ED25519_PUBLIC_KEY_PATH, "wb") as pub_file:
+    pub_file.write(privkey.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ))
+
+# Save the private key to a file
+with open(ED25519_PRIVATE_KEY_PATH, "wb") as priv_file:
+    priv_file.write(privkey.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
@@ -1,9 +1,65 @@
 # security/blockchain.py
+import hashlib
 import logging
+from pydantic import BaseModel
+from security.audit_ledger import get_audit_ledger
+from utils.log import get_logger
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+_action_logger = get_logger("agentsec.actions")
 
-def log_action(agent_name: str, action: str):
-    """Log agent actions."""
-    logging.info(f"{agent_name}: {action}")
\ No newline at end of file
+# Longest argument recorded verbatim in the ledger; free text and longer values are recorded as a digest
+LEDGER_ARG_MAX_CHARS = 64
+# Most items of a list argument recorded in the ledger
+LEDGER_ARG_MAX_ITEMS = 16
+
+def _message_ids(args: tuple) -> dict:
+    """Pull the id and correlation id of the first message among the arguments, for the audit index."""
+    for arg in args:
+        if isinstance(arg, BaseModel):
+            ids = {"message_id": getattr(arg, "id", None), "correlation_id": getattr(arg, "correlation_id", None)}
+            return {key: value for key, value in ids.items() if value}
+    return {}
+
+def _summarize(arg):
+    """
+    Reduce an action argument to what the ledger keeps: messages become their type and id, exceptions
+    their type, and free text (model output, decrypted data) a length and SHA-256 prefix.
+    """
+    if arg is None or isinstance(arg, (bool, int, float)):
+        return arg
+    if isinstance(arg, BaseModel):
+        ref = getattr(arg, "id", None) or getattr(arg, "correlation_id", None)
+        return f"<{type(arg).__name__} {ref}>" if ref else f"<{type(arg).__name__}>"
+    if isinstance(arg, BaseException):
+        return f"<{type(arg).__name__}>"
+    if isinstance(arg, (list, tuple, set, frozenset)):
+        items = list(arg)
+        summary = [_summarize(item) for item in items[:LEDGER_ARG_MAX_ITEMS]]
+        if len(items) > LEDGER_ARG_MAX_ITEMS:
+            summary.append(f"... {len(items) - LEDGER_ARG_MAX_ITEMS} more")
+        return summary
+    text = str(arg)
+    # Ids, rule names and agent ids are short and contain no whitespace
+    if len(text) <= LEDGER_ARG_MAX_CHARS and not any(char.isspace() for char in text):
+        return text
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"<{len(text)} chars sha256:{digest}>"
+
+def log_action(agent_name: str, action: str, *args, **fields):
+    """
+    Record an agent action in the audit ledger and the action log.
+
+    `action` may contain %s placeholders filled from `args`. The ledger records a summary of each
+    argument (see `_summarize`) plus the ids of the first message, never full message contents; the
+    action log formats the arguments as given, and only when INFO is enabled.
+    """
+    ledger = get_audit_ledger()
+    if ledger is not None:
+        summary = action % tuple(_summarize(arg) for arg in args) if args else action
+        ledger.append(str(agent_name), summary, **{**_message_ids(args), **fields})
+    if not _action_logger.isEnabledFor(logging.INFO):
+        return
+    if args:
+        _action_logger.info("%s: " + action, agent_name, *args, agent=str(agent_name), **fields)
+    else:
+        _action_logger.info("%s: %s", agent_name, action, agent=str(agent_name), **fields)
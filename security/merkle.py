@@ -0,0 +1,65 @@
+import hashlib
+from typing import List, Sequence, Tuple
+
+# Domain separation between leaves, inner nodes and the signed root
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+ROOT_PREFIX = b"agentsec-merkle-root:"
+
+
+def leaf_hash(payload: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + payload).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def root_signing_payload(root: bytes) -> bytes:
+    """The bytes signed for a batch: a digest of the root, distinct from any single-message payload."""
+    return hashlib.sha256(ROOT_PREFIX + root).digest()
+
+
+def build_tree(leaves: Sequence[bytes]) -> Tuple[bytes, List[List[str]]]:
+    """
+    Build a Merkle tree over leaf hashes.
+
+    An odd node at the end of a level is promoted unchanged, so no leaf is ever duplicated.
+
+    Returns:
+        Tuple[bytes, List[List[str]]]: The root and, per leaf, its inclusion proof as a list of
+        "L:<hex>" / "R:<hex>" entries naming each sibling and the side it sits on.
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves.")
+    proofs: List[List[str]] = [[] for _ in leaves]
+    # Each node carries the leaf indices below it, so sibling hashes can be appended to their proofs
+    level = [(leaf, [index]) for index, leaf in enumerate(leaves)]
+    while len(level) > 1:
+        next_level = []
+        for position in range(0, len(level) - 1, 2):
+            (left, left_leaves), (right, right_leaves) = level[position], level[position + 1]
+            for index in left_leaves:
+                proofs[index].append(f"R:{right.hex()}")
+            for index in right_leaves:
+                proofs[index].append(f"L:{left.hex()}")
+            next_level.append((node_hash(left, right), left_leaves + right_leaves))
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0][0], proofs
+
+
+def root_from_proof(leaf: bytes, proof: Sequence[str]) -> bytes:
+    """Fold an inclusion proof into the root it implies for a leaf hash."""
+    node = leaf
+    for entry in proof:
+        side, _, sibling_hex = entry.partition(":")
+        sibling = bytes.fromhex(sibling_hex)
+        if side == "L":
+            node = node_hash(sibling, node)
+        elif side == "R":
+            node = node_hash(node, sibling)
+        else:
+            raise ValueError(f"Malformed Merkle proof entry: {entry}")
+    return node
@@ -1,12 +1,14 @@
 import json
 import os
+from utils.log import get_logger
 
-def get_clearance_level(agent_id):
-    # Construct the path relative to the working directory
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'clearance_levels.json')
-    config_path = os.path.abspath(config_path)  # Convert to an absolute path for clarity
+logger = get_logger(__name__)
+
+# Construct the path relative to this file
+CLEARANCE_CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'configs', 'clearance_levels.json'))
 
-    print(f"Looking for clearance_levels.json at: {config_path}")
+def get_clearance_level(agent_id):
+    config_path = CLEARANCE_CONFIG_PATH
 
     try:
         with open(config_path, 'r') as f:
@@ -18,8 +20,8 @@ def get_clearance_level(agent_id):
             return agent_info["clearance_level"]
         
         # Default value if clearance level is not found
-        print(f"[DEBUG] Clearance level not found for {agent_id}. Using default value.")
+        logger.debug("Clearance level not found for %s. Using default value.", agent_id)
         return 3
     except FileNotFoundError:
-        print(f"Warning: {config_path} not found. Using default clearance level.")
+        logger.warning("%s not found. Using default clearance level.", config_path)
         return 3
\ No newline at end of file
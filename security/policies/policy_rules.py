@@ -0,0 +1,247 @@
+import hashlib
+import re
+import threading
+import weakref
+from typing import Iterable, List, Optional, Set, Tuple
+
+from py_models.messages import VerificationResponse
+from security.policies import security_policy
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+REDACTED = "[REDACTED]"
+
+# Rule families, enabled when the policy text mentions them
+RULE_PASSCODE = "passcode"
+RULE_ADDRESS = "address"
+RULE_PATIENT_NAME = "patient_name"
+
+POLICY_KEYWORDS = {
+    RULE_PASSCODE: re.compile(r"pass\s?codes?", re.IGNORECASE),
+    RULE_ADDRESS: re.compile(r"address", re.IGNORECASE),
+    RULE_PATIENT_NAME: re.compile(r"patient\s+names?", re.IGNORECASE),
+}
+
+# A three digit number near a passcode-like word, e.g. "passcode is 456" or "456 is the PIN"
+PASSCODE_PATTERN = re.compile(
+    r"(?:\b(?:pass\s?code|pin|secret(?:\s+code)?)\b\D{0,20}?\b(\d{3})\b)|(?:\b(\d{3})\b\D{0,20}?\b(?:pass\s?code|pin)\b)",
+    re.IGNORECASE,
+)
+STREET_SUFFIXES = r"(?:street|st|lane|ln|avenue|ave|road|rd|drive|boulevard|blvd|court|ct|way|place|pl|terrace|circle|parkway)"
+ADDRESS_PATTERN = re.compile(
+    rf"\b\d{{1,5}}\s+(?:[A-Za-z]+\s+){{0,3}}{STREET_SUFFIXES}\b\.?|\b\d{{1,5}}\s+[A-Za-z]+{STREET_SUFFIXES}\b",
+    re.IGNORECASE,
+)
+# Extracts names from data store sentences such as "Patient's name is John Doe"
+PATIENT_NAME_PATTERN = re.compile(r"[Pp]atient(?:'s)?\s+(?:name\s+is\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})")
+
+# Signals that the text may touch a protected category even though no rule matched: any digit
+# (codes can be spelled "4 5 6") or a protected keyword
+AMBIGUITY_PATTERN = re.compile(
+    r"\d|\b(?:patient|passcode|pass\s?code|pin|code|address|lives?|name[sd]?|secret|street)\b",
+    re.IGNORECASE,
+)
+# The only words a rules-only approval may contain. Anything else, such as "Bob" or "jones", may be
+# a name the engine does not know and goes to the model.
+COMMON_WORDS = frozenset("""
+a about after again all also am an and any are as at be been before being below between both but by
+can could did do does done each for from had has have having he her here hers him his how i if in
+into is it its just me more most my no not now of off on once only or other our out over own please
+same she should so some such than that the their them then there these they this those through to
+too under until up very was we were what when where which while who why will with would yes you your
+able add agenda answer appointment appointments available availability back book booked call cancel
+change check clinic close closed confirm confirmed day days desk details email file find follow form
+forms get give help helpdesk hour hours info information inform let list lobby make meeting message
+morning afternoon evening next note notes office open opening option options parking pharmacy pickup
+print provide refill refills remind reminder reply report request requests reschedule results room
+schedule scheduled send service services set show slot slots staff status summarize summary task
+tell thank thanks time times today tomorrow update visit visiting visitor visitors week weekly
+""".split())
+NAME_TOKEN_PATTERN = re.compile(r"[A-Za-z']+")
+
+
+def _name_digest(name: str) -> str:
+    return hashlib.sha256(" ".join(name.lower().split()).encode()).hexdigest()
+
+
+def extract_patient_names(data_items: Iterable[dict]) -> Set[str]:
+    """
+    Pull patient names out of decrypted data item content.
+
+    Args:
+        data_items (Iterable[dict]): Decrypted data items with a 'content' field.
+
+    Returns:
+        Set[str]: The patient names found.
+    """
+    names = set()
+    for item in data_items:
+        for match in PATIENT_NAME_PATTERN.finditer(item.get("content") or ""):
+            names.add(match.group(1))
+    return names
+
+
+class PolicyRuleEngine:
+    """
+    Deterministic pre-filter compiled from the security policy.
+
+    `evaluate` returns a VerificationResponse when the rules can decide on their own:
+        * verified=False with every match replaced by [REDACTED] when a rule fires
+        * verified=True with the text unchanged when nothing in it touches a protected category
+    and None when the text is ambiguous and must go to the model.
+
+    Text that mentions a digit or a protected keyword is always ambiguous, and so is any word outside
+    COMMON_WORDS or capitalized anywhere but at the start of a sentence (a possible name the engine
+    does not know). Patient names are kept only as SHA-256 digests, so
+    the engine never holds them in plaintext.
+    """
+
+    def __init__(self, policy_text: str = security_policy.security_policy, patient_names: Iterable[str] = ()):
+        self.rules = {rule for rule, keyword in POLICY_KEYWORDS.items() if keyword.search(policy_text)}
+        self._name_digests: Set[str] = set()
+        self._name_lengths: Set[int] = {2}
+        self._names_lock = threading.Lock()
+        self.add_patient_names(patient_names)
+
+    def add_patient_names(self, patient_names: Iterable[str]) -> None:
+        """Add patient names to the rules; readers keep using the previous sets until the swap."""
+        names = list(patient_names)
+        if not names:
+            return
+        with self._names_lock:
+            # Replace rather than mutate, so a concurrent _name_spans never sees a set change size
+            self._name_digests = self._name_digests | {_name_digest(name) for name in names}
+            self._name_lengths = self._name_lengths | {len(name.split()) for name in names}
+
+    @classmethod
+    def from_data_store(cls, agent_name: str = "core_agent", policy_text: str = security_policy.security_policy) -> "PolicyRuleEngine":
+        """
+        Build the engine with patient names read from the data store, kept current as records are written.
+
+        Args:
+            agent_name (str): Agent whose key decrypts the records holding patient names.
+            policy_text (str): The security policy to compile.
+
+        Returns:
+            PolicyRuleEngine: The compiled engine.
+        """
+        from data.db_manager import fetch_data_by_clearance
+
+        engine = cls(policy_text)
+        # Listen before the initial read so a record written in between is not missed
+        engine.watch_data_store(agent_name)
+        try:
+            data_items = fetch_data_by_clearance(3, agent_name=agent_name)
+        except FileNotFoundError:
+            data_items = []
+        engine.add_patient_names(extract_patient_names(data_items))
+        return engine
+
+    def watch_data_store(self, agent_name: str = "core_agent") -> None:
+        """
+        Pick up patient names from records written through data.db_manager after startup.
+
+        Args:
+            agent_name (str): Agent whose key decrypts the records holding patient names.
+        """
+        from data.db_manager import add_write_listener, remove_write_listener
+        from security.encryption_tools import decrypt_many
+        from security.permissions import get_clearance_level
+
+        agent_level = get_clearance_level(agent_name)
+        # Hold only a weak reference so the listener does not keep this engine alive
+        self_ref = weakref.ref(self)
+
+        def _on_write(op: str, data_id: str, data: Optional[dict]) -> None:
+            engine = self_ref()
+            if engine is None:
+                remove_write_listener(_on_write)
+                return
+            if op == "delete" or data is None:
+                # Names stay known after their record is deleted
+                return
+            level = data.get("clearance_level", 0)
+            if level == 0:
+                content = data.get("content")
+            elif level == agent_level:
+                # The agent's key only opens records at its own clearance level
+                content = decrypt_many([data["content"]], agent_name)[0]
+            else:
+                return
+            engine.add_patient_names(extract_patient_names([{"content": content}]))
+
+        add_write_listener(_on_write)
+
+    def _name_spans(self, text: str) -> List[Tuple[int, int]]:
+        tokens = [(m.start(), m.end(), m.group()) for m in NAME_TOKEN_PATTERN.finditer(text)]
+        spans = []
+        name_digests, name_lengths = self._name_digests, self._name_lengths
+        for length in name_lengths:
+            for i in range(len(tokens) - length + 1):
+                window = tokens[i:i + length]
+                if _name_digest(" ".join(token for _, _, token in window)) in name_digests:
+                    spans.append((window[0][0], window[-1][1]))
+        return spans
+
+    def find_violations(self, text: str) -> List[Tuple[str, int, int]]:
+        """Return (rule, start, end) for every policy violation in the text."""
+        violations = []
+        if RULE_PASSCODE in self.rules:
+            for match in PASSCODE_PATTERN.finditer(text):
+                group = 1 if match.group(1) else 2
+                violations.append((RULE_PASSCODE, match.start(group), match.end(group)))
+        if RULE_ADDRESS in self.rules:
+            violations.extend((RULE_ADDRESS, m.start(), m.end()) for m in ADDRESS_PATTERN.finditer(text))
+        if RULE_PATIENT_NAME in self.rules and self._name_digests:
+            violations.extend((RULE_PATIENT_NAME, start, end) for start, end in self._name_spans(text))
+        return violations
+
+    @staticmethod
+    def redact(text: str, violations: List[Tuple[str, int, int]]) -> str:
+        """Replace the violating spans (merging overlaps) with [REDACTED]."""
+        spans = sorted((start, end) for _, start, end in violations)
+        merged: List[List[int]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        parts, position = [], 0
+        for start, end in merged:
+            parts.append(text[position:start])
+            parts.append(REDACTED)
+            position = end
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def evaluate(self, text: str) -> Optional[VerificationResponse]:
+        """
+        Decide on the text if the rules are conclusive.
+
+        Args:
+            text (str): The instruction text.
+
+        Returns:
+            Optional[VerificationResponse]: The verdict, or None if the model should decide.
+        """
+        violations = self.find_violations(text)
+        if violations:
+            logger.debug("Policy rules matched: %s", sorted({rule for rule, _, _ in violations}))
+            return VerificationResponse(verified=False, message=self.redact(text, violations))
+        if AMBIGUITY_PATTERN.search(text) or self._has_unknown_words(text):
+            return None
+        return VerificationResponse(verified=True, message=text)
+
+    @staticmethod
+    def _has_unknown_words(text: str) -> bool:
+        """True if a word is outside COMMON_WORDS or capitalized mid-sentence, i.e. may be a name."""
+        for match in NAME_TOKEN_PATTERN.finditer(text):
+            word = match.group()
+            if word.lower() not in COMMON_WORDS:
+                return True
+            sentence_start = not text[:match.start()].strip() or text[:match.start()].rstrip()[-1] in ".!?:"
+            if word[0].isupper() and word != "I" and not sentence_start:
+                return True
+        return False
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from py_models.messages import VerificationResponse
+from security.policies import security_policy
+
+# Maximum number of cached verification verdicts
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 4096))
+
+
+class VerdictCache:
+    """
+    LRU cache of the auditor's model verdicts.
+
+    Keys combine a hash of the exact instruction text with a hash of the current
+    `security_policy.security_policy` text, so editing the policy makes every earlier verdict
+    unreachable; those entries age out of the LRU. The full VerificationResponse, including the
+    redacted message, is stored. Instructions are not normalized: a verdict's message echoes its
+    instruction, so only an identical instruction may reuse it.
+    """
+
+    def __init__(self, maxsize: int = VERDICT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, VerificationResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._policy_text = None
+        self._policy_hash = ""
+
+    def _policy_digest(self) -> str:
+        # Re-hash only when the policy text object changes
+        policy_text = security_policy.security_policy
+        if policy_text is not self._policy_text:
+            self._policy_hash = hashlib.sha256(policy_text.encode()).hexdigest()
+            self._policy_text = policy_text
+        return self._policy_hash
+
+    def key(self, instruction: str) -> str:
+        instruction_hash = hashlib.sha256(instruction.encode()).hexdigest()
+        return f"{self._policy_digest()}:{instruction_hash}"
+
+    def get(self, instruction: str) -> Optional[VerificationResponse]:
+        """Return a copy of the cached verdict for the instruction under the current policy, if any."""
+        key = self.key(instruction)
+        with self._lock:
+            verdict = self._cache.get(key)
+            if verdict is None:
+                self._stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self._stats["hits"] += 1
+            return verdict.model_copy()
+
+    def put(self, instruction: str, verdict: VerificationResponse) -> None:
+        key = self.key(instruction)
+        with self._lock:
+            self._cache[key] = verdict.model_copy()
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters, the hit rate and the current size."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+            }
@@ -1,14 +1,38 @@
 import rsa
+import asyncio
 import hashlib
+import threading
 import time
 import os
+from collections import OrderedDict
+from typing import List, Optional
 from py_models.messages import InstructionMessage
+from security.crypto_executor import run_crypto
+from security.merkle import build_tree, leaf_hash, root_from_proof, root_signing_payload
 from utils.serializers import deserialize_message, serialize_message
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # Path constants for the keys (note: made explicit for proof of concept)
 BASE_DIR = os.path.dirname(__file__)
-PUBLIC_KEY_PATH = os.path.join(BASE_DIR, "keys", "public_key.pem")
-PRIVATE_KEY_PATH = os.path.join(BASE_DIR, "keys", "private_key.pem")
+KEY_DIR = os.getenv("SIGNING_KEY_DIR", os.path.join(BASE_DIR, "keys"))
+PUBLIC_KEY_PATH = os.path.join(KEY_DIR, "public_key.pem")
+PRIVATE_KEY_PATH = os.path.join(KEY_DIR, "private_key.pem")
+ED25519_PUBLIC_KEY_PATH = os.path.join(KEY_DIR, "ed25519_public_key.pem")
+ED25519_PRIVATE_KEY_PATH = os.path.join(KEY_DIR, "ed25519_private_key.pem")
+
+# "rsa" (RSA-2048, PKCS#1 v1.5 over SHA-256) or "ed25519"; both ends must use the same algorithm
+SIGNATURE_ALGORITHM = os.getenv("SIGNATURE_ALGORITHM", "rsa").lower()
+# RSA implementation: "cryptography" (OpenSSL) or "rsa" (the pure-Python package); signatures are identical
+SIGNATURE_BACKEND = os.getenv("SIGNATURE_BACKEND", "cryptography").lower()
+# Signed instructions older than this many seconds are rejected
+SIGNATURE_MAX_AGE = int(os.getenv("SIGNATURE_MAX_AGE", 300))
+# Batch signing: instructions signed within this many seconds share one Merkle root signature (0 disables)
+SIGNING_BATCH_WINDOW = float(os.getenv("SIGNING_BATCH_WINDOW", 0))
+SIGNING_BATCH_MAX = int(os.getenv("SIGNING_BATCH_MAX", 256))
+# Number of verified (root, signature) pairs remembered by a verifier
+VERIFIED_ROOT_CACHE_SIZE = int(os.getenv("VERIFIED_ROOT_CACHE_SIZE", 1024))
 
 def load_public_key():
     """Load the public key from a file."""
@@ -20,72 +44,287 @@ def load_private_key():
     with open(PRIVATE_KEY_PATH, "rb") as priv_file:
         return rsa.PrivateKey.load_pkcs1(priv_file.read())
 
+def signing_payload(message: str, sender: str, token: str, timestamp: int, correlation_id: Optional[str] = None) -> bytes:
+    """
+    The bytes that are signed: the SHA-256 digest of "message|sender|token|timestamp", followed by
+    "|correlation_id" when one is set.
+
+    The correlation id routes the response to a client's mailbox, so it is covered too. Without one,
+    the payload is exactly the original format, so older signers and verifiers still interoperate.
+    """
+    payload = f"{message}|{sender}|{token}|{timestamp}"
+    if correlation_id:
+        payload += f"|{correlation_id}"
+    return hashlib.sha256(payload.encode()).digest()
+
+
+class MessageSigner:
+    """
+    Signs and verifies InstructionMessages with keys that are loaded once.
+
+    RSA signatures are PKCS#1 v1.5 with SHA-256 over the signing payload, exactly what
+    `rsa.sign(payload, key, 'SHA-256')` produces, so the `cryptography` backend verifies signatures
+    from the pure-Python one and vice versa. Ed25519 is a faster, non-interchangeable alternative
+    using the keys from `python -m security.generate_ed25519`.
+
+    Keys are loaded lazily, so a verifier never needs the private key.
+
+    `sign_batch` signs many instructions with one signature over a Merkle root; each message
+    carries the root and its inclusion proof. Verifying such a message costs one proof fold, plus
+    one signature check per distinct root, since verified roots are cached.
+    """
+
+    def __init__(self, algorithm: str = SIGNATURE_ALGORITHM, backend: str = SIGNATURE_BACKEND, max_age: int = SIGNATURE_MAX_AGE):
+        if algorithm not in ("rsa", "ed25519"):
+            raise ValueError(f"Unknown signature algorithm: {algorithm}")
+        if backend not in ("cryptography", "rsa"):
+            raise ValueError(f"Unknown signature backend: {backend}")
+        self.algorithm = algorithm
+        self.backend = backend
+        self.max_age = max_age
+        self._private_key = None
+        self._public_key = None
+        self._lock = threading.Lock()
+        self._verified_roots: "OrderedDict[tuple, bool]" = OrderedDict()
+        self.root_cache_stats = {"hits": 0, "misses": 0}
+
+    def _load_key(self, private: bool):
+        with self._lock:
+            key = self._private_key if private else self._public_key
+            if key is not None:
+                return key
+
+            if self.algorithm == "rsa" and self.backend == "rsa":
+                key = load_private_key() if private else load_public_key()
+            else:
+                from cryptography.hazmat.primitives import serialization
+
+                if self.algorithm == "rsa":
+                    path = PRIVATE_KEY_PATH if private else PUBLIC_KEY_PATH
+                else:
+                    path = ED25519_PRIVATE_KEY_PATH if private else ED25519_PUBLIC_KEY_PATH
+                with open(path, "rb") as key_file:
+                    pem = key_file.read()
+                # PKCS#1 ("RSA PRIVATE/PUBLIC KEY") and PKCS#8/SPKI PEM files are both accepted
+                if private:
+                    key = serialization.load_pem_private_key(pem, password=None)
+                else:
+                    key = serialization.load_pem_public_key(pem)
+
+            if private:
+                self._private_key = key
+            else:
+                self._public_key = key
+            return key
+
+    def sign_bytes(self, payload: bytes) -> bytes:
+        key = self._load_key(private=True)
+        if self.algorithm == "ed25519":
+            return key.sign(payload)
+        if self.backend == "rsa":
+            return rsa.sign(payload, key, 'SHA-256')
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+        return key.sign(payload, padding.PKCS1v15(), hashes.SHA256())
+
+    def verify_bytes(self, payload: bytes, signature: bytes) -> bool:
+        key = self._load_key(private=False)
+        if self.backend == "rsa" and self.algorithm == "rsa":
+            try:
+                rsa.verify(payload, signature, key)
+                return True
+            except rsa.VerificationError:
+                return False
+
+        from cryptography.exceptions import InvalidSignature
+        try:
+            if self.algorithm == "ed25519":
+                key.verify(signature, payload)
+            else:
+                from cryptography.hazmat.primitives import hashes
+                from cryptography.hazmat.primitives.asymmetric import padding
+                key.verify(signature, payload, padding.PKCS1v15(), hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
+
+    def sign_message(self, data: InstructionMessage) -> InstructionMessage:
+        """Sign a message and return the signed and timestamped InstructionMessage."""
+        timestamp = int(time.time())  # Add current timestamp
+
+        # Serialize the message to prepare for signing
+        message_dict = serialize_message(data)
+        payload = signing_payload(message_dict['message'], message_dict['sender'], message_dict['token'], timestamp, message_dict.get('correlation_id'))
+
+        # Generate signature and encode it as a string
+        message_dict['signature'] = self.sign_bytes(payload).hex()
+        message_dict['timestamp'] = timestamp
+
+        # Return a Pydantic model from the updated dictionary
+        return deserialize_message(message_dict, InstructionMessage)
+
+    def sign_batch(self, messages: List[InstructionMessage]) -> List[InstructionMessage]:
+        """Sign many messages with a single signature over the Merkle root of their payloads."""
+        if len(messages) == 1:
+            return [self.sign_message(messages[0])]
+
+        timestamp = int(time.time())
+        message_dicts = [serialize_message(data) for data in messages]
+        leaves = [
+            leaf_hash(signing_payload(
+                message_dict['message'], message_dict['sender'], message_dict['token'], timestamp, message_dict.get('correlation_id')
+            ))
+            for message_dict in message_dicts
+        ]
+        root, proofs = build_tree(leaves)
+        signature = self.sign_bytes(root_signing_payload(root)).hex()
+
+        signed = []
+        for message_dict, proof in zip(message_dicts, proofs):
+            message_dict.update(timestamp=timestamp, signature=signature, merkle_root=root.hex(), merkle_proof=proof)
+            signed.append(deserialize_message(message_dict, InstructionMessage))
+        return signed
+
+    def _verify_root(self, root: bytes, signature: bytes) -> bool:
+        """Check a batch signature over a Merkle root, consulting the verified-root cache first."""
+        cache_key = (root, signature)
+        with self._lock:
+            if cache_key in self._verified_roots:
+                self._verified_roots.move_to_end(cache_key)
+                self.root_cache_stats["hits"] += 1
+                return True
+            self.root_cache_stats["misses"] += 1
+
+        if not self.verify_bytes(root_signing_payload(root), signature):
+            return False
+
+        with self._lock:
+            self._verified_roots[cache_key] = True
+            while len(self._verified_roots) > VERIFIED_ROOT_CACHE_SIZE:
+                self._verified_roots.popitem(last=False)
+        return True
+
+    def verify_signature(self, received_data: InstructionMessage, now: Optional[int] = None) -> bool:
+        """Verify the signature and freshness of a message."""
+        try:
+            # Verify timestamp (e.g., within 5 minutes)
+            current_time = int(time.time()) if now is None else now
+            if abs(current_time - received_data.timestamp) > self.max_age:
+                logger.debug("Message expired: timestamp %s, now %s.", received_data.timestamp, current_time)
+                return False
+
+            signature_bytes = bytes.fromhex(received_data.signature)
+            payload = signing_payload(
+                received_data.message, received_data.sender, received_data.token, received_data.timestamp, received_data.correlation_id
+            )
+
+            if received_data.merkle_root is not None:
+                # Batch-signed: the proof must lead to the signed root
+                root = bytes.fromhex(received_data.merkle_root)
+                if root_from_proof(leaf_hash(payload), received_data.merkle_proof or []) != root:
+                    logger.debug("Merkle proof does not match the signed root.")
+                    return False
+                if self._verify_root(root, signature_bytes):
+                    return True
+                logger.debug("Merkle root signature verification failed.")
+                return False
+
+            if self.verify_bytes(payload, signature_bytes):
+                return True
+            logger.debug("Signature verification failed.")
+            return False
+
+        except Exception as e:
+            logger.debug("An unexpected error occurred during verification: %s", e)
+            return False
+
+
+class MerkleBatchSigner:
+    """
+    Collects instructions signed within `window` seconds and signs each group with one Merkle root.
+
+    A batch is signed when the window closes or when it reaches `max_batch` messages. Signing runs
+    on the crypto executor. Must be used from a single event loop.
+    """
+
+    def __init__(self, signer: Optional[MessageSigner] = None, window: float = SIGNING_BATCH_WINDOW, max_batch: int = SIGNING_BATCH_MAX):
+        self.signer = signer or get_signer()
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def sign(self, data: InstructionMessage) -> InstructionMessage:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((data, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._sign_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _sign_batch(self, batch: list) -> None:
+        try:
+            signed = await run_crypto(self.signer.sign_batch, [data for data, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), message in zip(batch, signed):
+            if not future.done():
+                future.set_result(message)
+
+
+_default_signer = None
+_default_signer_lock = threading.Lock()
+_default_batch_signer = None
+
+def get_signer() -> MessageSigner:
+    """Return the process-wide signer configured by SIGNATURE_ALGORITHM and SIGNATURE_BACKEND."""
+    global _default_signer
+    with _default_signer_lock:
+        if _default_signer is None:
+            _default_signer = MessageSigner()
+        return _default_signer
+
 def sign_message(data: InstructionMessage) -> InstructionMessage:
     """
     Sign a message with the private key and return the signed and timestamped InstructionMessage.
     """
-    privkey = load_private_key()
-    timestamp = int(time.time())  # Add current timestamp
-    
-    # Serialize the message to prepare for signing
-    message_dict = serialize_message(data)
-    message_str = f"{message_dict['message']}|{message_dict['sender']}|{message_dict['token']}|{timestamp}"
-    message_hash = hashlib.sha256(message_str.encode()).digest()
-
-    # Generate signature and encode it as a string
-    signature = rsa.sign(message_hash, privkey, 'SHA-256')
-    message_dict['signature'] = signature.hex()
-    message_dict['timestamp'] = timestamp
-
-    # Return a Pydantic model from the updated dictionary
-    return deserialize_message(message_dict, InstructionMessage)
+    return get_signer().sign_message(data)
 
 def verify_signature(received_data: InstructionMessage) -> bool:
     """Verify the signature of a message with the public key."""
-    try:
-        # Convert InstructionMessage to a dictionary for processing
-        message_dict = serialize_message(received_data)
-        pubkey = load_public_key()  # Load public key for verification
-        
-        # Extract fields
-        message = message_dict["message"]
-        sender = message_dict["sender"]
-        token = message_dict["token"]
-        timestamp = message_dict["timestamp"]
-        signature = message_dict["signature"]
-
-        print(f"Debug: Loaded public key: {pubkey}")
-        print(f"Debug: Extracted data - message: {message}, sender: {sender}, token: {token}, timestamp: {timestamp}, signature: {signature}")
-
-        # Convert the signature from hex string to bytes
-        signature_bytes = bytes.fromhex(signature)
-        print(f"Debug: Converted signature to bytes: {signature_bytes}")
-
-        # Verify timestamp (e.g., within 5 minutes)
-        current_time = int(time.time())
-        print(f"Debug: Current time: {current_time}, Message timestamp: {timestamp}, Time difference: {abs(current_time - timestamp)}")
-
-        if abs(current_time - timestamp) > 300:  # 5 minutes
-            print("Debug: Message expired.")
-            return False
+    return get_signer().verify_signature(received_data)
 
-        # Recreate the hash
-        message_data = f"{message}|{sender}|{token}|{timestamp}"
-        message_hash = hashlib.sha256(message_data.encode()).digest()
-        print(f"Debug: Recreated message hash: {message_hash}")
+async def sign_message_async(data: InstructionMessage) -> InstructionMessage:
+    """Like sign_message, but signs on the crypto executor so the event loop keeps running."""
+    return await run_crypto(get_signer().sign_message, data)
 
-        # Verify the signature with the public key
-        try:
-            rsa.verify(message_hash, signature_bytes, pubkey)
-            print("Debug: Signature verification successful.")
-            return True
-        except rsa.VerificationError:
-            print("Debug: Signature verification failed.")
-            return False
+async def verify_signature_async(received_data: InstructionMessage) -> bool:
+    """Like verify_signature, but verifies on the crypto executor so the event loop keeps running."""
+    return await run_crypto(get_signer().verify_signature, received_data)
 
-    except KeyError as e:
-        print(f"Debug: Missing key in received data: {e}")
-        return False
-    except Exception as e:
-        print(f"Debug: An unexpected error occurred during verification: {e}")
-        return False
\ No newline at end of file
+async def sign_message_batched(data: InstructionMessage) -> InstructionMessage:
+    """
+    Sign a message as part of a Merkle batch when SIGNING_BATCH_WINDOW is set, otherwise on its own.
+    """
+    global _default_batch_signer
+    if SIGNING_BATCH_WINDOW <= 0:
+        return await sign_message_async(data)
+    if _default_batch_signer is None:
+        _default_batch_signer = MerkleBatchSigner()
+    return await _default_batch_signer.sign(data)
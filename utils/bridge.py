@@ -0,0 +1,68 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Optional
+
+
+class AsyncBridge:
+    """
+    Thread-safe handoff from a worker thread (e.g. the Flask server) into an asyncio event loop.
+
+    `put` may be called from any thread: it schedules the item onto the loop with
+    `call_soon_threadsafe`, so the awaiting consumer wakes as soon as the loop runs it instead
+    of on the next tick of a polling sleep.
+
+    With `maxsize` > 0 the bridge is bounded: items handed over but not yet consumed count
+    against the limit, and `try_put` refuses new items once it is reached (backpressure).
+
+    Usage:
+    - Create the bridge inside the running loop (or pass the loop explicitly).
+    - Hand the bridge to the producer thread, which calls `put(item)`.
+    - Consume with `item = await bridge.get()` on the loop.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, maxsize: int = 0):
+        self.loop = loop or asyncio.get_running_loop()
+        self.maxsize = maxsize
+        # Capacity is tracked here rather than by asyncio.Queue so producer threads can check it synchronously
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def try_put(self, item: Any) -> bool:
+        """Hand an item to the event loop, returning False if the bridge is full. Safe to call from any thread."""
+        with self._pending_lock:
+            if self.maxsize > 0 and self._pending >= self.maxsize:
+                return False
+            self._pending += 1
+        if self._on_loop_thread():
+            self._queue.put_nowait(item)
+        else:
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        return True
+
+    def put(self, item: Any) -> None:
+        """Hand an item to the event loop, raising queue.Full if the bridge is full. Safe to call from any thread."""
+        if not self.try_put(item):
+            raise queue.Full
+
+    async def get(self) -> Any:
+        """Wait for the next item. Must be awaited on the bridge's loop."""
+        item = await self._queue.get()
+        with self._pending_lock:
+            self._pending -= 1
+        return item
+
+    def qsize(self) -> int:
+        with self._pending_lock:
+            return self._pending
+
+    def full(self) -> bool:
+        with self._pending_lock:
+            return self.maxsize > 0 and self._pending >= self.maxsize
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
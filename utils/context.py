@@ -1,3 +1,9 @@
+import os
+
+# Defaults for relevance-ranked context selection
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", 5))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))
+
 
 def parse_context(data_items):
     """
@@ -11,4 +17,50 @@ def parse_context(data_items):
     """
     # Extract the 'content' field from each data item and join them with newlines
     parsed_context = "\n".join(item.get("content", "") for item in data_items if item.get("content"))
-    return parsed_context
\ No newline at end of file
+    return parsed_context
+
+
+def estimate_tokens(text):
+    """
+    Roughly estimate the number of model tokens in a string (about four characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+
+def select_context(query, k=CONTEXT_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET, *, data_manager, clearance_level):
+    """
+    Selects the data items most relevant to a query instead of the whole data store.
+
+    Items are ranked with the DataManager's BM25 index over its decrypted snapshot for the given
+    clearance level, so only data visible at that clearance can be returned. Of the k best items,
+    each is taken in rank order if it still fits in the token budget; one oversized item does not
+    keep smaller, lower-ranked ones out.
+
+    Args:
+        query (str): The instruction or question to rank data items against.
+        k (int): Maximum number of items to return.
+        token_budget (int): Maximum estimated tokens of content across the returned items.
+        data_manager (DataManager): The agent's DataManager.
+        clearance_level (int): The clearance level of the requesting agent.
+
+    Returns:
+        list: The selected data items, most relevant first.
+    """
+    selected = []
+    used_tokens = 0
+    for item in data_manager.search(clearance_level, query, k):
+        # The snapshot is already clearance-filtered; re-check so a mislabelled item can never leak
+        if item.get("clearance_level", 0) > clearance_level or not item.get("content"):
+            continue
+        tokens = estimate_tokens(item["content"])
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append(item)
+        used_tokens += tokens
+    return selected
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import uuid
+from typing import Dict, Optional, Set, Union
+
+from autogen_core.base import AgentId, CancellationToken
+from agents.edge_agents.edge_pool import EdgeAgentPool
+from py_models.messages import ExternalMessage
+from utils.bridge import AsyncBridge
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for the external message pipeline
+MAX_CONCURRENT_MESSAGES = int(os.getenv("MAX_CONCURRENT_MESSAGES", 4))
+MAX_PENDING_MESSAGES = int(os.getenv("MAX_PENDING_MESSAGES", 100))
+
+
+class MessageDispatcher:
+    """
+    Runs up to `max_concurrency` external message chains at once.
+
+    `submit(content)` (thread-safe) assigns a message id and queues the message on a bounded
+    AsyncBridge; a new message is only dequeued once a slot is free, so a full bridge pushes back
+    on the webserver. Every chain gets its own CancellationToken, and `cancel(message_id)` cancels
+    a queued or in-flight chain.
+    """
+
+    def __init__(self, runtime, recipient: Union[AgentId, EdgeAgentPool], source: AsyncBridge, outgoing_queue, max_concurrency: int = MAX_CONCURRENT_MESSAGES):
+        self.runtime = runtime
+        self.recipient = recipient
+        self.source = source
+        self.outgoing_queue = outgoing_queue
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._queued: Set[str] = set()
+        self._in_flight: Dict[str, CancellationToken] = {}
+        self._cancelled: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, content: str, client_id: str) -> Optional[str]:
+        """
+        Queue a message for a client. Safe to call from any thread.
+
+        Returns:
+            Optional[str]: The message's correlation id, or None if the queue is full.
+        """
+        message_id = uuid.uuid4().hex
+        # Register before queueing: a cached or coalesced answer can reach the hub before submit returns
+        self.outgoing_queue.register(message_id, client_id)
+        with self._lock:
+            self._queued.add(message_id)
+        if not self.source.try_put((message_id, content, client_id)):
+            with self._lock:
+                self._queued.discard(message_id)
+            self.outgoing_queue.unregister(message_id)
+            return None
+        return message_id
+
+    async def run(self) -> None:
+        """Dispatch messages from the source forever."""
+        while True:
+            await self._slots.acquire()
+            message_id, content, client_id = await self.source.get()
+
+            with self._lock:
+                self._queued.discard(message_id)
+                if message_id in self._cancelled:
+                    # Cancelled while it was still queued
+                    self._cancelled.discard(message_id)
+                    self._slots.release()
+                    continue
+                token = CancellationToken()
+                self._in_flight[message_id] = token
+
+            task = asyncio.create_task(self._process(message_id, content, client_id, token))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, message_id: str, content: str, client_id: str, token: CancellationToken) -> None:
+        try:
+            # Create an ExternalMessage and send it to the EdgeAgent
+            external_message = ExternalMessage(
+                content=content,
+                sender="unknown_source",
+                correlation_id=message_id,
+                session_id=client_id,
+            )
+            if isinstance(self.recipient, EdgeAgentPool):
+                response_message = await self.recipient.send(
+                    self.runtime,
+                    external_message,
+                    session_key=client_id,
+                    cancellation_token=token
+                )
+            else:
+                response_message = await self.runtime.send_message(
+                    message=external_message,
+                    recipient=self.recipient,
+                    cancellation_token=token
+                )
+            # The EdgeAgent routes its own results; only forward an actual reply from the chain
+            if response_message is not None:
+                self.outgoing_queue.put(response_message, correlation_id=message_id)
+        except asyncio.CancelledError:
+            if not token.is_cancelled():
+                raise
+            logger.info("Message %s was cancelled.", message_id)
+        except Exception as e:
+            logger.error("Message %s failed: %s", message_id, e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(message_id, None)
+            self._slots.release()
+
+    def cancel(self, message_id: str) -> bool:
+        """Cancel a queued or in-flight message; returns False if the id is unknown or finished. Safe to call from any thread."""
+        with self._lock:
+            if message_id in self._queued:
+                self._cancelled.add(message_id)
+                return True
+            token = self._in_flight.get(message_id)
+            if token is None:
+                return False
+        # Token callbacks cancel asyncio futures, so they must run on the runtime's loop
+        self.source.loop.call_soon_threadsafe(token.cancel)
+        return True
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
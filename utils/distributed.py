@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from typing import Any, Optional, Set
+
+from autogen_core.base import AgentId, JSON_DATA_CONTENT_TYPE, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+from py_models.messages import AuthUserMessage, DataMessage, ExternalMessage, InstructionMessage, VerificationResponse
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Address of the gRPC host runtime that connects the worker processes
+GRPC_HOST_ADDRESS = os.getenv("GRPC_HOST_ADDRESS", "localhost:50051")
+
+# Every message type that crosses a process boundary, as a request or as a handler's return value
+MESSAGE_TYPES = (AuthUserMessage, InstructionMessage, DataMessage, VerificationResponse, ExternalMessage)
+
+# Agent type of the front-end's response gateway; edge workers deliver their results to it
+RESPONSE_GATEWAY_TYPE = "response_gateway"
+
+
+class NoneSerializer:
+    """Serializer for handlers that return None, which the worker runtime must still send back."""
+
+    data_content_type = JSON_DATA_CONTENT_TYPE
+    type_name = "NoneType"
+
+    def deserialize(self, payload: bytes) -> None:
+        return None
+
+    def serialize(self, message: None) -> bytes:
+        return b"null"
+
+
+def register_message_serializers(runtime) -> None:
+    """Register serializers for the system's messages on a WorkerAgentRuntime."""
+    for message_type in MESSAGE_TYPES:
+        runtime.add_message_serializer(try_get_known_serializers_for_type(message_type))
+    runtime.add_message_serializer(NoneSerializer())
+
+
+class ResponseGatewayAgent(RoutedAgent):
+    """
+    Runs in the front-end process and hands results from edge workers to the ResponseHub.
+
+    In the single-process runtime the EdgeAgent writes to the hub directly; across processes it
+    sends a DataMessage carrying the result and correlation id here instead.
+    """
+
+    def __init__(self, response_hub, description: str = "Delivers edge agent results to web clients"):
+        super().__init__(description)
+        self.response_hub = response_hub
+
+    @message_handler
+    async def handle_data(self, message: DataMessage, ctx: MessageContext) -> None:
+        self.response_hub.put(message.message, correlation_id=message.correlation_id)
+        return None
+
+
+class RemoteResponseSink:
+    """
+    Stand-in for the ResponseHub inside an edge worker process.
+
+    `put(response, correlation_id)` has the hub's signature but forwards the response to the
+    front-end's ResponseGatewayAgent over the host runtime. It must be called on the worker's loop.
+    """
+
+    def __init__(self, runtime, gateway_agent_id: AgentId = AgentId(RESPONSE_GATEWAY_TYPE, "default")):
+        self.runtime = runtime
+        self.gateway_agent_id = gateway_agent_id
+        self._tasks: Set[asyncio.Task] = set()
+
+    def put(self, response: Any, correlation_id: Optional[str] = None) -> None:
+        message = DataMessage(
+            message=str(response),
+            timestamp=int(time.time()),
+            sender="edge_worker",
+            correlation_id=correlation_id,
+        )
+        task = asyncio.get_running_loop().create_task(self._deliver(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, message: DataMessage) -> None:
+        try:
+            await self.runtime.send_message(message, self.gateway_agent_id)
+        except Exception as e:
+            logger.error("Could not deliver response %s to the gateway: %s", message.correlation_id, e)
@@ -1,12 +1,69 @@
-import logging
-from typing import List, Dict, Any
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from typing import List, Dict, Any, Optional
 
-from data.db_manager import read_all_data
-from security.encryption_tools import decrypt_data
+from data.db_manager import filter_data_by_clearance_level, add_write_listener, remove_write_listener
+from security.encryption_tools import decrypt_many, decrypt_many_async
 from security.log_chain import log_action
+from utils.retrieval import BM25Index
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for the warm decrypted-context snapshots
+CONTEXT_SNAPSHOT_TTL = float(os.getenv("CONTEXT_SNAPSHOT_TTL", 300))
+# Memory budget shared by all of a DataManager's snapshots
+CONTEXT_SNAPSHOT_MAX_BYTES = int(os.getenv("CONTEXT_SNAPSHOT_MAX_BYTES", 16 * 1024 * 1024))
+# Recent writes kept for replay onto snapshots that were being loaded when the writes landed
+CONTEXT_WRITE_LOG_SIZE = int(os.getenv("CONTEXT_WRITE_LOG_SIZE", 4096))
+
+
+def _item_size(item: Dict[str, Any]) -> int:
+    """Approximate in-memory size of a data item dict."""
+    return sys.getsizeof(item) + sum(sys.getsizeof(value) for value in item.values())
+
+
+class ContextSnapshot:
+    """Decrypted data items visible at one clearance level, keyed by id in store order, with a BM25 index over their content."""
+
+    def __init__(self, clearance_level: int, items: List[Dict[str, Any]]):
+        self.clearance_level = clearance_level
+        self.items: Dict[str, Dict[str, Any]] = {item["id"]: item for item in items}
+        self.size = sum(_item_size(item) for item in items)
+        self.built_at = time.monotonic()
+        self.index = BM25Index()
+        for item in items:
+            self.index.add(item["id"], item.get("content") or "")
+
+    def is_expired(self, ttl: Optional[float]) -> bool:
+        return ttl is not None and time.monotonic() - self.built_at > ttl
+
+    def put(self, item: Dict[str, Any]) -> None:
+        old = self.items.get(item["id"])
+        if old is not None:
+            self.size -= _item_size(old)
+        # Assigning to an existing key keeps its position in the store order
+        self.items[item["id"]] = item
+        self.size += _item_size(item)
+        self.index.add(item["id"], item.get("content") or "")
+
+    def discard(self, data_id: str) -> None:
+        old = self.items.pop(data_id, None)
+        if old is not None:
+            self.size -= _item_size(old)
+            self.index.remove(data_id)
+
+    def copy_items(self) -> List[Dict[str, Any]]:
+        return [dict(item) for item in self.items.values()]
+
+    def search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """Return copies of the k items most relevant to the query, best first."""
+        return [dict(self.items[data_id]) for data_id, _ in self.index.search(query, k)]
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 class DataManager:
     """
@@ -22,15 +79,48 @@ class DataManager:
 
     Decryption is only attempted on items that have a clearance level > 0.
     Items that fail decryption will be skipped.
+
+    The decrypted result for each clearance level is kept as a warm snapshot. Writes made through
+    data.db_manager update the snapshot incrementally, so repeated fetches never touch disk or PBKDF2.
+    A snapshot is rebuilt once it is older than `snapshot_ttl` seconds (None disables expiry).
+
+    Every write gets a sequence number. A cold load records the sequence before it reads the store
+    and, when it installs its snapshot, replays the writes that landed meanwhile (or, if they have
+    left the write log, serves the result uncached). All snapshots share one `snapshot_max_bytes`
+    budget; the oldest are dropped first when it is exceeded.
     """
 
-    def __init__(self, agent_id: str, agent_name: str = "core_agent"):
+    def __init__(
+        self,
+        agent_id: str,
+        agent_name: str = "core_agent",
+        snapshot_ttl: Optional[float] = CONTEXT_SNAPSHOT_TTL,
+        snapshot_max_bytes: int = CONTEXT_SNAPSHOT_MAX_BYTES
+    ):
         self.agent_id = agent_id
         self.agent_name = agent_name
+        self.snapshot_ttl = snapshot_ttl
+        self.snapshot_max_bytes = snapshot_max_bytes
+        self._snapshots: Dict[int, ContextSnapshot] = {}
+        self._snapshot_lock = threading.RLock()
+        self._write_seq = 0
+        self._write_log: deque = deque(maxlen=CONTEXT_WRITE_LOG_SIZE)  # (seq, op, data_id, data)
+
+        # Hold only a weak reference so the listener does not keep this manager alive
+        self_ref = weakref.ref(self)
+
+        def _on_write(op: str, data_id: str, data: Optional[dict]) -> None:
+            manager = self_ref()
+            if manager is None:
+                remove_write_listener(_on_write)
+            else:
+                manager._apply_write(op, data_id, data)
+
+        add_write_listener(_on_write)
 
     def fetch_data_by_clearance_level(self, clearance_level: int) -> List[Dict[str, Any]]:
         """
-        Fetch and decrypt data by clearance level.
+        Fetch decrypted data by clearance level, served from the warm snapshot when possible.
 
         Args:
             clearance_level (int): The requesting agent's clearance level (1 to 3).
@@ -38,40 +128,185 @@ class DataManager:
         Returns:
             List[Dict[str, Any]]: A list of decrypted data items.
         """
-        try:
-            # Read all data from the database
-            all_data = read_all_data()
-            logger.debug(f"[{self.agent_id}] Raw data fetched from database: {all_data}")
+        snapshot = self._get_snapshot(clearance_level)
+        return snapshot.copy_items() if snapshot is not None else []
+
+    def search(self, clearance_level: int, query: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Return the k decrypted items visible at the clearance level that are most relevant to the query.
+
+        Args:
+            clearance_level (int): The requesting agent's clearance level (1 to 3).
+            query (str): Free text to rank items against.
+            k (int): Maximum number of items to return.
+
+        Returns:
+            List[Dict[str, Any]]: Decrypted data items, most relevant first.
+        """
+        snapshot = self._get_snapshot(clearance_level)
+        if snapshot is None:
+            return []
+        with self._snapshot_lock:
+            return snapshot.search(query, k)
 
-            # Filter data by the agent's clearance
+    def _get_snapshot(self, clearance_level: int) -> Optional[ContextSnapshot]:
+        """Return the warm snapshot for the clearance level, (re)building it if missing or expired."""
+        snapshot = self._warm_snapshot(clearance_level)
+        if snapshot is not None:
+            return snapshot
+        write_seq = self._current_write_seq()
+        return self._install_snapshot(clearance_level, self._load_data_by_clearance_level(clearance_level), write_seq)
+
+    async def warm_snapshot_async(self, clearance_level: int) -> Optional[ContextSnapshot]:
+        """Like _get_snapshot, but a cold load decrypts on the crypto executor instead of the event loop."""
+        snapshot = self._warm_snapshot(clearance_level)
+        if snapshot is not None:
+            return snapshot
+        write_seq = self._current_write_seq()
+        loaded = self._read_data_by_clearance_level(clearance_level)
+        if loaded is None:
+            return None
+        allowed_data, encrypted_items = loaded
+        plaintexts = await decrypt_many_async([item["content"] for item in encrypted_items], self.agent_name)
+        return self._install_snapshot(clearance_level, self._apply_plaintexts(allowed_data, encrypted_items, plaintexts), write_seq)
+
+    async def fetch_data_by_clearance_level_async(self, clearance_level: int) -> List[Dict[str, Any]]:
+        """Like fetch_data_by_clearance_level, without blocking the event loop on a cold load."""
+        snapshot = await self.warm_snapshot_async(clearance_level)
+        return snapshot.copy_items() if snapshot is not None else []
+
+    def _warm_snapshot(self, clearance_level: int) -> Optional[ContextSnapshot]:
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(clearance_level)
+            if snapshot is not None and not snapshot.is_expired(self.snapshot_ttl):
+                return snapshot
+        return None
+
+    def _current_write_seq(self) -> int:
+        with self._snapshot_lock:
+            return self._write_seq
+
+    def _install_snapshot(self, clearance_level: int, items: Optional[List[Dict[str, Any]]], write_seq: int) -> Optional[ContextSnapshot]:
+        """Cache a freshly loaded snapshot, first replaying the writes made after `write_seq` (when the load began)."""
+        if items is None:
+            # Loading failed; do not cache an empty snapshot
+            return None
+        snapshot = ContextSnapshot(clearance_level, items)
+        with self._snapshot_lock:
+            if self._write_seq != write_seq:
+                missed = [entry for entry in self._write_log if entry[0] > write_seq]
+                if not missed or missed[0][0] != write_seq + 1:
+                    # Some writes already left the log; serve this load once and reload next time
+                    logger.info("[%s] Too many writes during the clearance %s load; snapshot not cached.", self.agent_id, clearance_level)
+                    return snapshot
+                for _, op, data_id, data in missed:
+                    self._fold_write(snapshot, op, data_id, data)
+            self._snapshots[clearance_level] = snapshot
+            self._enforce_budget()
+        return snapshot
+
+    def _enforce_budget(self) -> None:
+        """Drop snapshots, oldest first, until together they fit in snapshot_max_bytes."""
+        total = sum(snapshot.size for snapshot in self._snapshots.values())
+        for clearance_level, snapshot in sorted(self._snapshots.items(), key=lambda entry: entry[1].built_at):
+            if total <= self.snapshot_max_bytes:
+                return
+            del self._snapshots[clearance_level]
+            total -= snapshot.size
+            logger.warning(
+                "[%s] Context snapshots exceed %s bytes; dropped the one for clearance %s.",
+                self.agent_id, self.snapshot_max_bytes, clearance_level
+            )
+
+    def invalidate_snapshots(self) -> None:
+        """Drop all warm snapshots; the next fetch reloads from the data store."""
+        with self._snapshot_lock:
+            self._snapshots.clear()
+
+    def _apply_write(self, op: str, data_id: str, data: Optional[dict]) -> None:
+        """Record a store write and fold it into every snapshot."""
+        with self._snapshot_lock:
+            self._write_seq += 1
+            self._write_log.append((self._write_seq, op, data_id, data))
+            for snapshot in self._snapshots.values():
+                self._fold_write(snapshot, op, data_id, data)
+            self._enforce_budget()
+
+    def _fold_write(self, snapshot: ContextSnapshot, op: str, data_id: str, data: Optional[dict]) -> None:
+        """Apply a store write to a snapshot, if the snapshot can see the written record."""
+        if op == "delete" or data is None or data.get("clearance_level", 0) > snapshot.clearance_level:
+            # Deleted, or (re)classified above this snapshot's clearance
+            snapshot.discard(data_id)
+            return
+
+        item = dict(data)
+        if item.get("clearance_level", 0) > 0:
+            plaintext = decrypt_many([item["content"]], self.agent_name)[0]
+            if plaintext is None:
+                # Same skip-on-failure semantics as a full fetch
+                snapshot.discard(data_id)
+                return
+            item["content"] = plaintext
+        snapshot.put(item)
+
+    def _load_data_by_clearance_level(self, clearance_level: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch and decrypt data by clearance level from the data store.
+
+        Args:
+            clearance_level (int): The requesting agent's clearance level (1 to 3).
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: A list of decrypted data items, or None if loading failed.
+        """
+        loaded = self._read_data_by_clearance_level(clearance_level)
+        if loaded is None:
+            return None
+        allowed_data, encrypted_items = loaded
+        # Decrypt every classified item in one batch, grouped by key
+        plaintexts = decrypt_many([item["content"] for item in encrypted_items], self.agent_name)
+        return self._apply_plaintexts(allowed_data, encrypted_items, plaintexts)
+
+    def _read_data_by_clearance_level(self, clearance_level: int) -> Optional[tuple]:
+        """Return (items visible at the clearance, the subset that needs decrypting), or None on error."""
+        try:
+            # Read the data visible at the agent's clearance from the database index
             # If clearance is 3, return all data. If 2, return data with clearance <= 2. If 1, <= 1.
-            allowed_data = [item for item in all_data if item.get("clearance_level", 0) <= clearance_level]
-
-            decrypted_data = []
-            for index, item in enumerate(allowed_data):
-                logger.debug(f"[{self.agent_id}] Processing item {index+1}/{len(allowed_data)}: ID={item.get('id')}")
-                
-                # If clearance > 0, attempt decryption
-                if item.get("clearance_level", 0) > 0:
-                    try:
-                        logger.debug(f"[{self.agent_id}] Attempting to decrypt item ID={item.get('id')}")
-                        decrypted_content = decrypt_data(item["content"], self.agent_name)
-                        item["content"] = decrypted_content
-                        log_action(self.agent_id, f"Decrypted data item {item['id']}.")
-                        logger.debug(f"[{self.agent_id}] Decryption successful for item ID={item.get('id')}")
-                    except Exception as e:
-                        # Log and skip if decryption fails
-                        log_action(self.agent_id, f"Failed to decrypt data item {item.get('id')}: {e}")
-                        logger.error(f"[{self.agent_id}] Decryption failed for item ID={item.get('id')}. Error: {e}")
-                        continue  # Skip this item
-                
-                decrypted_data.append(item)
-
-            logger.debug(f"[{self.agent_id}] Completed processing of {len(decrypted_data)} items.")
-            return decrypted_data
+            allowed_data = filter_data_by_clearance_level(clearance_level)
+            logger.debug("[%s] Raw data fetched from database: %s", self.agent_id, allowed_data)
+
+            encrypted_items = [item for item in allowed_data if item.get("clearance_level", 0) > 0]
+            logger.debug("[%s] Decrypting %s of %s items.", self.agent_id, len(encrypted_items), len(allowed_data))
+            return allowed_data, encrypted_items
 
         except Exception as e:
             # Catch and log any unexpected errors
-            log_action(self.agent_id, f"Error fetching data: {e}")
-            logger.error(f"[{self.agent_id}] Unexpected error occurred while fetching data. Error: {e}")
-            return []
\ No newline at end of file
+            log_action(self.agent_id, "Error fetching data: %s", e)
+            logger.error("[%s] Unexpected error occurred while fetching data. Error: %s", self.agent_id, e)
+            return None
+
+    def _apply_plaintexts(
+        self,
+        allowed_data: List[Dict[str, Any]],
+        encrypted_items: List[Dict[str, Any]],
+        plaintexts: List[Optional[str]]
+    ) -> List[Dict[str, Any]]:
+        """Substitute decrypted contents and drop items that failed to decrypt."""
+        failed = set()
+        for item, plaintext in zip(encrypted_items, plaintexts):
+            if plaintext is None:
+                failed.add(id(item))
+            else:
+                item["content"] = plaintext
+
+        # Skip items that failed decryption, keeping the original order
+        decrypted_data = [item for item in allowed_data if id(item) not in failed]
+        failed_ids = [item.get("id") for item in encrypted_items if id(item) in failed]
+
+        log_action(self.agent_id, "Decrypted %s data items.", len(encrypted_items) - len(failed_ids))
+        if failed_ids:
+            log_action(self.agent_id, "Failed to decrypt data items: %s", failed_ids)
+            logger.error("[%s] Decryption failed for item IDs: %s", self.agent_id, failed_ids)
+
+        logger.debug("[%s] Completed processing of %s items.", self.agent_id, len(decrypted_data))
+        return decrypted_data
@@ -0,0 +1,309 @@
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import ChatCompletionClient, CreateResult, RequestUsage
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for the model response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(Path(os.getenv("DATA_DIR", "data/data_store")) / "llm_cache.sqlite"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 1024))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 600))
+# Per-agent TTL overrides in seconds, e.g. "auditor_agent=3600,edge_agent=0"; 0 turns caching off for that agent
+LLM_CACHE_TTLS = os.getenv("LLM_CACHE_TTLS", "auditor_agent=3600")
+# Disk entries are Fernet-encrypted with the key encryption_tools derives for this name at clearance 3,
+# since CoreAgent responses are built from decrypted clearance 3 records
+LLM_CACHE_KEY_NAME = os.getenv("LLM_CACHE_KEY_NAME", "llm_cache")
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse "agent=seconds,agent=seconds" into a dict."""
+    ttls = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        agent_name, seconds = entry.split("=", 1)
+        ttls[agent_name.strip()] = float(seconds)
+    return ttls
+
+
+def _jsonable(value: Any) -> Any:
+    """Canonical JSON-compatible form of messages, schemas and create args for hashing."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {"__type__": type(value).__name__, **{k: _jsonable(v) for k, v in dataclasses.asdict(value).items()}}
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return {"__schema__": value.__name__, "schema": value.model_json_schema()}
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, Mapping):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def cache_key(**parts: Any) -> str:
+    """SHA-256 over the canonical JSON of the request parts (model, messages, response format, ...)."""
+    payload = json.dumps(_jsonable(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier store of model responses: an in-memory LRU in front of a SQLite table.
+
+    Entries carry an absolute expiry; expired entries are treated as misses and removed lazily.
+    Values are JSON strings. Safe to use from several threads and, through SQLite, several processes.
+
+    Values are encrypted before they reach SQLite, like the data store's classified records, so the
+    cache file never holds model output in plaintext. An entry that no longer decrypts (e.g. after
+    SALT_VALUE was rotated) is a miss. Without a usable key the cache keeps to memory.
+    """
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_SIZE, key_name: str = LLM_CACHE_KEY_NAME):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        self._fernet = None
+        if path:
+            from security.encryption_tools import get_fernet
+
+            try:
+                self._fernet = get_fernet(3, key_name)
+            except Exception as e:
+                logger.warning("No key for the LLM cache (%s); responses are cached in memory only.", e)
+                path = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, agent TEXT, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT expires_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = self._decrypt(row[1]) if row[0] > now else None
+                    if value is not None:
+                        self._remember(key, row[0], value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    # Expired, or written under another key
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, ttl: float, agent_name: Optional[str] = None) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, agent, expires_at, value) VALUES (?, ?, ?, ?)",
+                    (key, agent_name, expires_at, self._fernet.encrypt(value.encode()).decode()),
+                )
+
+    def _decrypt(self, token: str) -> Optional[str]:
+        try:
+            return self._fernet.decrypt(token.encode()).decode()
+        except Exception:
+            return None
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers; returns the number of rows removed on disk."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            return self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+def _dump_create_result(result: CreateResult) -> str:
+    return json.dumps({
+        "finish_reason": result.finish_reason,
+        "content": result.content,
+        "usage": dataclasses.asdict(result.usage),
+    })
+
+
+def _load_create_result(value: str) -> CreateResult:
+    data = json.loads(value)
+    return CreateResult(
+        finish_reason=data["finish_reason"],
+        content=data["content"],
+        usage=RequestUsage(**data["usage"]),
+        cached=True,
+    )
+
+
+class _CachedCompletions:
+    """`beta.chat.completions` of the wrapped client, with `parse` answered from the cache."""
+
+    def __init__(self, owner: "CachedChatCompletionClient"):
+        self._owner = owner
+
+    async def parse(self, *, model: str, messages: Sequence[Any], response_format: Any = None, use_cache: bool = True, **kwargs):
+        owner = self._owner
+        completions = owner.client.beta.chat.completions
+        ttl = owner.ttl
+        if not use_cache or ttl <= 0 or response_format is None:
+            return await completions.parse(model=model, messages=messages, response_format=response_format, **kwargs)
+
+        key = cache_key(call="parse", model=model, messages=messages, response_format=response_format, args=kwargs)
+        cached = owner.cache.get(key)
+        if cached is not None:
+            data = json.loads(cached)
+            message = SimpleNamespace(
+                parsed=response_format.model_validate(data["parsed"]),
+                content=data["content"],
+                refusal=None,
+            )
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], cached=True)
+
+        completion = await completions.parse(model=model, messages=messages, response_format=response_format, **kwargs)
+        message = completion.choices[0].message
+        # Refusals and unparsed answers are not cached
+        if getattr(message, "parsed", None) is not None and not getattr(message, "refusal", None):
+            value = json.dumps({"parsed": message.parsed.model_dump(), "content": message.content})
+            owner.cache.put(key, value, ttl, owner.agent_name)
+        return completion
+
+
+class CachedChatCompletionClient:
+    """
+    ChatCompletionClient wrapper that answers repeated requests from a ResponseCache.
+
+    The key is a hash of the model name, every message (system prompts included), tools, JSON
+    mode, extra create args and, for `beta.chat.completions.parse`, the response format's schema.
+    Only plain-text results are cached; hits come back with `CreateResult.cached` set.
+
+    `for_agent(name)` returns a view using that agent's TTL (LLM_CACHE_TTLS, falling back to
+    LLM_CACHE_TTL); a TTL of 0 disables caching for the agent. Pass `use_cache=False` to `create`
+    or `parse` for calls that must not be cached, e.g. sampled or time-dependent ones.
+    Everything else (create_stream, usage, capabilities, ...) is delegated to the wrapped client.
+    """
+
+    def __init__(
+        self,
+        client: ChatCompletionClient,
+        cache: Optional[ResponseCache] = None,
+        agent_name: Optional[str] = None,
+        ttl: float = LLM_CACHE_TTL,
+        agent_ttls: Optional[Dict[str, float]] = None
+    ):
+        self.client = client
+        self.cache = cache if cache is not None else ResponseCache()
+        self.agent_name = agent_name
+        self.agent_ttls = agent_ttls if agent_ttls is not None else parse_ttls(LLM_CACHE_TTLS)
+        self.default_ttl = ttl
+        self.ttl = self.agent_ttls.get(agent_name, ttl) if agent_name else ttl
+
+    def for_agent(self, agent_name: str) -> "CachedChatCompletionClient":
+        """A view of this client that shares the cache but uses the agent's TTL."""
+        return CachedChatCompletionClient(self.client, self.cache, agent_name, self.default_ttl, self.agent_ttls)
+
+    @property
+    def model(self) -> Optional[str]:
+        return getattr(self.client, "_create_args", {}).get("model")
+
+    async def create(
+        self,
+        messages: Sequence[Any],
+        tools: Sequence[Any] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+        use_cache: bool = True
+    ) -> CreateResult:
+        if not use_cache or self.ttl <= 0:
+            return await self.client.create(messages, tools, json_output, extra_create_args, cancellation_token)
+
+        key = cache_key(
+            call="create",
+            model=self.model,
+            messages=messages,
+            tools=tools,
+            json_output=json_output,
+            args=extra_create_args,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _load_create_result(cached)
+
+        result = await self.client.create(messages, tools, json_output, extra_create_args, cancellation_token)
+        if isinstance(result.content, str) and result.content:
+            self.cache.put(key, _dump_create_result(result), self.ttl, self.agent_name)
+        return result
+
+    @property
+    def beta(self):
+        return SimpleNamespace(chat=SimpleNamespace(completions=_CachedCompletions(self)))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+def wrap_model_client(client: ChatCompletionClient) -> CachedChatCompletionClient:
+    """Wrap a model client in the response cache unless LLM_CACHE is off."""
+    if not LLM_CACHE_ENABLED:
+        # TTL 0 passes every call straight through, and `for_agent` keeps working
+        return CachedChatCompletionClient(client, ResponseCache(path=None, max_entries=0), ttl=0, agent_ttls={})
+    return CachedChatCompletionClient(client)
@@ -0,0 +1,183 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+# Defaults for the structured logging layer
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # or "text"
+LOG_FILE = os.getenv("LOG_FILE")  # JSON lines go to stderr unless a file is given
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Per-module sampling of records below WARNING, e.g. "utils.fetch=0.01,agents=0.5"; longest prefix wins
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            prefix, rate = entry.split("=", 1)
+            rates[prefix.strip()] = float(rate)
+    return rates
+
+
+_sampling_rates = parse_sampling(LOG_SAMPLING)
+
+
+def _sample_rate(name: str) -> float:
+    best, rate = -1, 1.0
+    for prefix, prefix_rate in _sampling_rates.items():
+        if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+            best, rate = len(prefix), prefix_rate
+    return rate
+
+
+class StructuredLogger:
+    """
+    Thin wrapper over a stdlib logger that does no work for records nobody will see.
+
+    The level is checked before anything is built: messages use lazy %-style arguments, and
+    keyword fields may be zero-argument callables that are only called once the record passes
+    the level and sampling checks. Fields end up as top-level keys of the JSON line.
+
+        logger.debug("Loaded %d items", len(items), items=lambda: [item["id"] for item in items])
+    """
+
+    __slots__ = ("_logger", "_sample_rate")
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+        self._sample_rate = _sample_rate(name)
+
+    @property
+    def name(self) -> str:
+        return self._logger.name
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, msg: str, args: tuple, fields: Dict[str, Any]) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self._sample_rate < 1.0 and random.random() >= self._sample_rate:
+            return
+        exc_info = fields.pop("exc_info", None)
+        stacklevel = fields.pop("stacklevel", 1)
+        if fields:
+            fields = {key: value() if callable(value) else value for key, value in fields.items()}
+        self._logger.log(level, msg, *args, exc_info=exc_info, stacklevel=stacklevel + 2, extra={"fields": fields})
+
+    def debug(self, msg: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg: str, *args: Any, **fields: Any) -> None:
+        self._log(logging.ERROR, msg, args, fields)
+
+    def exception(self, msg: str, *args: Any, **fields: Any) -> None:
+        fields.setdefault("exc_info", True)
+        self._log(logging.ERROR, msg, args, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, any structured fields and the traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    Only the %-interpolation happens in the calling thread (so later mutations of the arguments do
+    not leak into the record); JSON encoding and I/O happen on the listener thread. When the queue
+    is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, path: Optional[str] = LOG_FILE) -> None:
+    """
+    Route the root logger through a non-blocking queue to a background writer thread.
+
+    Safe to call more than once; only the first call installs the handlers.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        target = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+        if log_format == "json":
+            target.setFormatter(JsonFormatter())
+        else:
+            target.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(NonBlockingQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
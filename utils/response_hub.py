@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for per-client mailboxes
+MAILBOX_SIZE = int(os.getenv("MAILBOX_SIZE", 100))
+MAILBOX_TTL = float(os.getenv("MAILBOX_TTL", 600))
+
+
+class Mailbox:
+    """Bounded backlog of responses for one client, plus its push subscribers."""
+
+    def __init__(self, size: int):
+        self.responses = deque(maxlen=size)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_seen = time.monotonic()
+
+
+class ResponseHub:
+    """
+    Routes agent responses to the client that sent the originating message.
+
+    Every external message gets a correlation id that the agents carry through ExternalMessage,
+    InstructionMessage and DataMessage. `register(correlation_id, client_id)` records who asked;
+    `put(response, correlation_id)` then delivers only to that client's mailbox and push
+    subscribers (SSE / WebSocket). Mailboxes are bounded, and mailboxes and correlation ids that
+    have been idle for longer than `ttl` seconds expire.
+
+    `put` is safe to call from any thread; subscribe/unsubscribe must be called on the hub's loop.
+    """
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        mailbox_size: int = MAILBOX_SIZE,
+        ttl: float = MAILBOX_TTL,
+        subscriber_queue_size: int = 100
+    ):
+        self.loop = loop or asyncio.get_running_loop()
+        self.mailbox_size = mailbox_size
+        self.ttl = ttl
+        self.subscriber_queue_size = subscriber_queue_size
+        self._lock = threading.Lock()
+        self._mailboxes: Dict[str, Mailbox] = {}
+        self._owners: Dict[str, tuple] = {}  # correlation id -> (client id, registered at)
+        self._last_expiry = time.monotonic()
+
+    def _mailbox(self, client_id: str) -> Mailbox:
+        mailbox = self._mailboxes.get(client_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[client_id] = Mailbox(self.mailbox_size)
+        mailbox.last_seen = time.monotonic()
+        return mailbox
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        if now - self._last_expiry < min(self.ttl, 60):
+            return
+        self._last_expiry = now
+        for client_id, mailbox in list(self._mailboxes.items()):
+            if not mailbox.subscribers and now - mailbox.last_seen > self.ttl:
+                del self._mailboxes[client_id]
+        for correlation_id, (_, registered_at) in list(self._owners.items()):
+            if now - registered_at > self.ttl:
+                del self._owners[correlation_id]
+
+    def register(self, correlation_id: str, client_id: str) -> None:
+        """Record which client a correlation id belongs to."""
+        with self._lock:
+            self._expire()
+            self._owners[correlation_id] = (client_id, time.monotonic())
+            self._mailbox(client_id)
+
+    def unregister(self, correlation_id: str) -> None:
+        """Forget a correlation id, e.g. when its message could not be queued."""
+        with self._lock:
+            self._owners.pop(correlation_id, None)
+
+    def owner(self, correlation_id: str) -> Optional[str]:
+        """Return the client id that registered a correlation id, if it has not expired."""
+        with self._lock:
+            owner = self._owners.get(correlation_id)
+            return owner[0] if owner else None
+
+    def put(self, response: Any, correlation_id: Optional[str] = None) -> None:
+        """Deliver a response to the client that owns the correlation id."""
+        with self._lock:
+            self._expire()
+            owner = self._owners.get(correlation_id) if correlation_id else None
+            if owner is None:
+                logger.warning("Dropping response with unknown correlation id %s.", correlation_id)
+                return
+            mailbox = self._mailbox(owner[0])
+            item = {"id": correlation_id, "response": response}
+            subscribers = list(mailbox.subscribers)
+            if not subscribers:
+                # Nobody is listening for pushes; keep it for the polling endpoint
+                mailbox.responses.append(item)
+                return
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._publish(subscribers, item)
+        else:
+            self.loop.call_soon_threadsafe(self._publish, subscribers, item)
+
+    @staticmethod
+    def _publish(subscribers: List[asyncio.Queue], *items: dict) -> None:
+        for subscriber in subscribers:
+            for item in items:
+                if subscriber.full():
+                    # Slow consumer: drop its oldest response rather than block everyone else
+                    subscriber.get_nowait()
+                subscriber.put_nowait(item)
+
+    def subscribe(self, client_id: str) -> asyncio.Queue:
+        """
+        Register a push subscriber for a client.
+
+        Responses are only kept in the polling backlog while a client has no push subscribers,
+        so a client never receives the same response twice. Any backlog is flushed to the new subscriber.
+        """
+        subscriber = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            mailbox = self._mailbox(client_id)
+            mailbox.subscribers.add(subscriber)
+            backlog = list(mailbox.responses)
+            mailbox.responses.clear()
+        if backlog:
+            self._publish([subscriber], *backlog)
+        return subscriber
+
+    def unsubscribe(self, client_id: str, subscriber: asyncio.Queue) -> None:
+        with self._lock:
+            mailbox = self._mailboxes.get(client_id)
+            if mailbox is not None:
+                mailbox.subscribers.discard(subscriber)
+                mailbox.last_seen = time.monotonic()
+
+    def drain(self, client_id: str) -> List[dict]:
+        """Pop every backlog response ({"id", "response"}) for a client."""
+        with self._lock:
+            self._expire()
+            mailbox = self._mailbox(client_id)
+            responses = list(mailbox.responses)
+            mailbox.responses.clear()
+            return responses
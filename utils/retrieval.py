@@ -0,0 +1,119 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into alphanumeric terms."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Incremental BM25 index over decrypted data item content.
+
+    Documents are rows; each term keeps posting lists of (row, term frequency) that are appended
+    to as documents are added and scored as NumPy arrays at query time. Removing or replacing a document marks its row dead,
+    and the index is rebuilt once dead rows outnumber live ones.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._row_of: Dict[str, int] = {}
+        self._doc_ids: List[str] = []
+        self._doc_terms: List[Dict[str, int]] = []
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._doc_freq: Dict[str, int] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _grow(self) -> None:
+        capacity = max(16, 2 * len(self._lengths))
+        self._lengths = np.resize(self._lengths, capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a document, replacing any previous version with the same id."""
+        self.remove(doc_id)
+        terms: Dict[str, int] = {}
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+        self._add_terms(doc_id, terms)
+
+    def _add_terms(self, doc_id: str, terms: Dict[str, int]) -> None:
+        row = len(self._doc_ids)
+        if row >= len(self._lengths):
+            self._grow()
+        self._doc_ids.append(doc_id)
+        self._doc_terms.append(terms)
+        self._row_of[doc_id] = row
+        length = float(sum(terms.values()))
+        self._lengths[row] = length
+        self._alive[row] = True
+        self._total_length += length
+
+        for term, frequency in terms.items():
+            rows, frequencies = self._postings.setdefault(term, ([], []))
+            rows.append(row)
+            frequencies.append(frequency)
+            self._doc_freq[term] = self._doc_freq.get(term, 0) + 1
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document from the index, if present."""
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return
+        self._alive[row] = False
+        self._total_length -= self._lengths[row]
+        for term in self._doc_terms[row]:
+            self._doc_freq[term] -= 1
+        self._doc_terms[row] = {}
+
+        dead = len(self._doc_ids) - len(self._row_of)
+        if dead > 64 and dead > len(self._row_of):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        live = [(self._doc_ids[row], terms) for row, terms in enumerate(self._doc_terms) if self._alive[row]]
+        self.__init__(self.k1, self.b)
+        for doc_id, terms in live:
+            self._add_terms(doc_id, terms)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Return up to k (doc_id, score) pairs with a positive BM25 score, best first."""
+        n_docs = len(self._row_of)
+        if n_docs == 0 or k <= 0:
+            return []
+
+        n_rows = len(self._doc_ids)
+        scores = np.zeros(n_rows, dtype=np.float64)
+        lengths = self._lengths[:n_rows]
+        average_length = self._total_length / n_docs or 1.0
+        norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+
+        for term in set(tokenize(query)):
+            doc_freq = self._doc_freq.get(term, 0)
+            if doc_freq <= 0:
+                continue
+            rows, frequencies = self._postings[term]
+            rows = np.asarray(rows)
+            frequencies = np.asarray(frequencies, dtype=np.float64)
+            idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            np.add.at(scores, rows, idf * frequencies * (self.k1 + 1) / (frequencies + norms[rows]))
+
+        scores[~self._alive[:n_rows]] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._doc_ids[row], float(scores[row])) for row in ranked]
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults for coalescing identical external messages
+EDGE_COALESCING = os.getenv("EDGE_COALESCING", "on").lower() not in ("0", "off", "false", "no")
+# Seconds a finished chain's result is still handed to identical messages (0: only while in flight)
+EDGE_COALESCE_WINDOW = float(os.getenv("EDGE_COALESCE_WINDOW", 2))
+
+
+class Flight:
+    """One in-flight chain and the correlation ids waiting on its result."""
+
+    __slots__ = ("key", "leader", "followers", "done", "result", "has_result", "abandoned", "finished_at")
+
+    def __init__(self, key: str, leader: str):
+        self.key = key
+        self.leader = leader
+        self.followers: List[str] = []
+        self.done = asyncio.Event()
+        self.result: Any = None
+        self.has_result = False
+        self.abandoned = False
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """
+    Coalesces identical external messages onto one agent chain.
+
+    The first message for a content hash leads a flight and runs the chain; identical messages that
+    arrive while it is in flight (or within `window` seconds after it produced a result) join as
+    followers. `resolve(leader_correlation_id, result)` records the result and returns every
+    correlation id it must be delivered to. If the leader abandons its flight (cancelled or failed
+    before a result), waiting followers retry and one of them leads a new flight.
+
+    Instances are shared by every EdgeAgent in a process, since the agent that receives a message
+    need not be the pool member that executes its instruction. Must be used from one event loop.
+    """
+
+    def __init__(self, window: float = EDGE_COALESCE_WINDOW, enabled: bool = EDGE_COALESCING):
+        self.window = window
+        self.enabled = enabled
+        self._flights: Dict[str, Flight] = {}
+        self._by_leader: Dict[str, Flight] = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def key(content: str, sender: str = "") -> str:
+        return hashlib.sha256(f"{sender}\x00{content.strip()}".encode()).hexdigest()
+
+    def _prune(self, now: float) -> None:
+        for key, flight in list(self._flights.items()):
+            if flight.done.is_set() and now - flight.finished_at > self.window:
+                del self._flights[key]
+
+    def acquire(self, key: str, correlation_id: Optional[str]) -> Tuple[Flight, bool]:
+        """
+        Lead a new flight for the key or join the current one.
+
+        Returns:
+            Tuple[Flight, bool]: The flight and whether the caller leads it. A joined flight that
+            already has its result will not fan out to the caller; deliver `flight.result` directly.
+        """
+        now = time.monotonic()
+        self._prune(now)
+        flight = self._flights.get(key)
+        if self.enabled and correlation_id and flight is not None and not flight.abandoned:
+            if not flight.has_result:
+                flight.followers.append(correlation_id)
+            self.coalesced += 1
+            return flight, False
+
+        flight = Flight(key, correlation_id)
+        if self.enabled and correlation_id:
+            self._flights[key] = flight
+            self._by_leader[correlation_id] = flight
+        return flight, True
+
+    def detach(self, flight: Flight, correlation_id: str) -> None:
+        """Stop delivering a flight's result to a follower, e.g. when its request was cancelled."""
+        if correlation_id in flight.followers:
+            flight.followers.remove(correlation_id)
+
+    def resolve(self, correlation_id: Optional[str], result: Any) -> List[Optional[str]]:
+        """Record the result of the flight led by `correlation_id`; returns the ids to deliver it to."""
+        flight = self._by_leader.get(correlation_id) if correlation_id else None
+        if flight is None:
+            return [correlation_id]
+        flight.result = result
+        flight.has_result = True
+        recipients = [flight.leader, *flight.followers]
+        flight.followers = []
+        return recipients
+
+    def finish(self, flight: Flight, abandoned: bool = False) -> None:
+        """Mark the leader's chain as over and wake its followers."""
+        flight.abandoned = abandoned and not flight.has_result
+        flight.finished_at = time.monotonic()
+        self._by_leader.pop(flight.leader, None)
+        if self._flights.get(flight.key) is flight and (flight.abandoned or not flight.has_result or self.window <= 0):
+            del self._flights[flight.key]
+        flight.done.set()
+
+
+_default_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide coalescer shared by the EdgeAgents."""
+    global _default_single_flight
+    if _default_single_flight is None:
+        _default_single_flight = SingleFlight()
+    return _default_single_flight
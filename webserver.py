@@ -1,33 +1,74 @@
 from flask import Flask, request, jsonify, render_template
-import logging
+import uuid
+from utils.log import get_logger
 
-def start_flask_app(incoming_queue, outgoing_queue):
-    app = Flask(__name__)
+logger = get_logger(__name__)
+
+# Clients are identified by this cookie (or the X-Client-Id header) so responses reach only their sender
+CLIENT_COOKIE = "client_id"
+
+
+def _client_id():
+    """Return (client id, whether it was newly assigned) for the current request."""
+    client_id = request.headers.get("X-Client-Id") or request.cookies.get(CLIENT_COOKIE)
+    if client_id:
+        return client_id, False
+    return uuid.uuid4().hex, True
+
+
+def _with_client_cookie(response, client_id, is_new):
+    if is_new:
+        response.set_cookie(CLIENT_COOKIE, client_id, httponly=True, samesite="Strict")
+    return response
 
-    # Set up logging for debugging
-    logging.basicConfig(level=logging.INFO)
+def start_flask_app(dispatcher, outgoing_queue):
+    """
+    Run the Flask front-end.
+
+    Args:
+        dispatcher (MessageDispatcher): Queues incoming messages for the agent runtime and cancels them.
+        outgoing_queue (ResponseHub): Routes agent responses into per-client mailboxes.
+    """
+    app = Flask(__name__)
 
     @app.route('/', methods=['GET'])
     def index():
-        return render_template('index.html')
+        client_id, is_new = _client_id()
+        return _with_client_cookie(app.make_response(render_template('index.html')), client_id, is_new)
 
     @app.route('/send_message', methods=['POST'])
     def send_message():
         data = request.get_json()
         user_message = data.get('message')
         if user_message:
-            logging.info(f"Received message: {user_message}")
-            incoming_queue.put(user_message)
-            return jsonify({"status": "ok"})
+            logger.info("Received message: %s", user_message)
+            client_id, is_new = _client_id()
+            message_id = dispatcher.submit(user_message, client_id)
+            if message_id is None:
+                # Backpressure: the pending queue is full
+                return jsonify({"status": "busy", "error": "Too many pending messages, retry later"}), 503, {"Retry-After": "1"}
+            return _with_client_cookie(jsonify({"status": "ok", "id": message_id}), client_id, is_new)
         return jsonify({"status": "error", "error": "No message provided"}), 400
 
+    @app.route('/cancel_message', methods=['POST'])
+    def cancel_message():
+        data = request.get_json()
+        message_id = data.get('id')
+        if not message_id:
+            return jsonify({"status": "error", "error": "No message id provided"}), 400
+        client_id, _ = _client_id()
+        # Clients may only cancel their own messages
+        if outgoing_queue.owner(message_id) == client_id and dispatcher.cancel(message_id):
+            return jsonify({"status": "ok"})
+        return jsonify({"status": "error", "error": "Unknown or finished message"}), 404
+
     @app.route('/get_responses', methods=['GET'])
     def get_responses():
-        responses = []
-        while not outgoing_queue.empty():
-            response = outgoing_queue.get()
-            logging.info(f"Sending response to client: {response}")
-            responses.append(response)
-        return jsonify({"responses": responses})
+        client_id, is_new = _client_id()
+        items = outgoing_queue.drain(client_id)
+        for item in items:
+            logger.info("Sending response %s to client %s", item['id'], client_id)
+        responses = [item["response"] for item in items]
+        return _with_client_cookie(jsonify({"responses": responses, "items": items}), client_id, is_new)
 
     app.run(host='0.0.0.0', port=8000, debug=False)
\ No newline at end of file